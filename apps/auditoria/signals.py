@@ -14,7 +14,8 @@ logger = logging.getLogger('CH_AUDITORIA')
 # 1. Configuración de exclusión (AÑADIMOS 'recibos')
 APPS_IGNORADAS = [
     'auditoria', 'admin', 'sessions', 'contenttypes', 'migrations', 
-    'admin_interface', 'recibos'  # <--- RECIBOS AHORA ESTÁ BLOQUEADO
+    'admin_interface', 'recibos',  # <--- RECIBOS AHORA ESTÁ BLOQUEADO
+    'reportes'
 ]
 
 def limpiar_datos_auditoria(instance):
@@ -1,10 +1,10 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse
 from django.utils import timezone
 from django.db.models import Count
 from django.core.paginator import Paginator
 from .models import LogAuditoria
+from apps.reportes.views import encolar_reporte
 
 # Librerías para Excel
 import openpyxl
@@ -20,12 +20,12 @@ def es_administrador(user):
     """ Verifica si el usuario tiene permisos de auditoría """
     return user.is_superuser or user.groups.filter(name='Auditores').exists()
 
-def obtener_logs_filtrados(request):
-    """ Lógica unificada de filtrado con exclusión de ruido de Recibos """
-    usuario_id = request.GET.get('usuario')
-    modulo = request.GET.get('modulo')
-    fecha_inicio = request.GET.get('desde')
-    fecha_fin = request.GET.get('hasta')
+def obtener_logs_filtrados(parametros):
+    """ Lógica unificada de filtrado con exclusión de ruido de Recibos (request.GET o parámetros de un reporte) """
+    usuario_id = parametros.get('usuario')
+    modulo = parametros.get('modulo')
+    fecha_inicio = parametros.get('desde')
+    fecha_fin = parametros.get('hasta')
 
     # Base del queryset
     logs = LogAuditoria.objects.all().select_related('usuario').order_by('-timestamp')
@@ -51,7 +51,7 @@ def obtener_logs_filtrados(request):
 @user_passes_test(es_administrador)
 def lista_auditoria(request):
     """ Muestra la tabla de bitácora con paginación de 10 registros """
-    logs_filtrados = obtener_logs_filtrados(request)
+    logs_filtrados = obtener_logs_filtrados(request.GET)
     # Filtramos también los módulos disponibles en el select para no mostrar 'RECIBOS'
     modulos = LogAuditoria.objects.exclude(modulo__icontains='RECIBOS').values_list('modulo', flat=True).distinct()
     
@@ -65,13 +65,9 @@ def lista_auditoria(request):
         'total_logs': logs_filtrados.count()
     })
 
-@login_required
-@user_passes_test(es_administrador)
-def exportar_auditoria_excel(request):
-    """ Genera y descarga el reporte en formato Excel .xlsx (Sin ruido de Recibos) """
-    logs = obtener_logs_filtrados(request)
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="Auditoria_{timezone.now().strftime("%Y%m%d")}.xlsx"'
+def escribir_excel_auditoria(parametros, usuario, destino):
+    """ Generador del reporte Excel .xlsx de la bitácora (Sin ruido de Recibos) """
+    logs = obtener_logs_filtrados(parametros)
     
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -109,25 +105,20 @@ def exportar_auditoria_excel(request):
             except: pass
         ws.column_dimensions[column].width = max_length + 2
 
-    wb.save(response)
-    return response
+    wb.save(destino)
+    return f"Auditoria_{timezone.now().strftime('%Y%m%d')}.xlsx"
 
-@login_required
-@user_passes_test(es_administrador)
-def exportar_auditoria_pdf(request):
-    """ Genera y descarga el reporte en formato PDF horizontal (Sin ruido de Recibos) """
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Auditoria_{timezone.now().strftime("%Y%m%d")}.pdf"'
-    
-    doc = SimpleDocTemplate(response, pagesize=landscape(letter), topMargin=30)
+def escribir_pdf_auditoria(parametros, usuario, destino):
+    """ Generador del reporte PDF horizontal de la bitácora (Sin ruido de Recibos) """
+    doc = SimpleDocTemplate(destino, pagesize=landscape(letter), topMargin=30)
     elements = []
     styles = getSampleStyleSheet()
     
     elements.append(Paragraph(f"<b>REPORTE DE AUDITORÍA - SICSI INTU</b>", styles['Title']))
-    elements.append(Paragraph(f"Generado por: {request.user.username} | Fecha: {timezone.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+    elements.append(Paragraph(f"Generado por: {usuario.username if usuario else 'SISTEMA'} | Fecha: {timezone.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
     elements.append(Spacer(1, 20))
     
-    logs = obtener_logs_filtrados(request)[:500] 
+    logs = obtener_logs_filtrados(parametros)[:500] 
     data = [['FECHA/HORA', 'USUARIO', 'MÓDULO', 'ACCIÓN', 'DESCRIPCIÓN', 'IP']]
     
     for log in logs:
@@ -155,7 +146,23 @@ def exportar_auditoria_pdf(request):
     
     elements.append(table)
     doc.build(elements)
-    return response
+    return f"Auditoria_{timezone.now().strftime('%Y%m%d')}.pdf"
+
+def bitacora_modificada_desde(parametros, momento):
+    """ True si desde `momento` entraron registros que el reporte de bitácora incluiría """
+    return obtener_logs_filtrados(parametros).filter(timestamp__gte=momento).exists()
+
+@login_required
+@user_passes_test(es_administrador)
+def exportar_auditoria_excel(request):
+    """ Encola el reporte Excel de la bitácora; se descarga desde "Mis reportes" """
+    return encolar_reporte(request, 'auditoria_excel')
+
+@login_required
+@user_passes_test(es_administrador)
+def exportar_auditoria_pdf(request):
+    """ Encola el reporte PDF de la bitácora; se descarga desde "Mis reportes" """
+    return encolar_reporte(request, 'auditoria_pdf')
 
 @login_required
 @user_passes_test(es_administrador)
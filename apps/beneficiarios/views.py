@@ -6,14 +6,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.db.models import Q, Count
 from django.contrib import messages
 from django.utils import timezone
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import IntegrityError
 
 # Importación de modelos locales
 from .models import Beneficiario, DocumentoExpediente, Visita
 # Importación de modelos de territorio
-from apps.territorio.models import Estado, Municipio, Parroquia, Ciudad, Comuna, UnidadAdscrita
+from apps.territorio.models import Municipio, Parroquia, Ciudad, Comuna, UnidadAdscrita
+from sistema_gestion.cache_consultas import estados_territorio, unidades_adscritas
+from apps.reportes.views import encolar_reporte
 
 # Configuración del Logger vinculado a la configuración de settings.py
 logger_beneficiarios = logging.getLogger('CH_BENEFICIARIOS')
@@ -76,7 +78,7 @@ def lista_beneficiarios(request):
         'query': query,
         'f_inicio': f_inicio,
         'f_fin': f_fin,
-        'estados': Estado.objects.all().order_by('nombre'),
+        'estados': estados_territorio(),
         'total_beneficiarios': total_beneficiarios,
         'visitas_hoy_count': visitas_hoy_count,
         'ha_filtrado': ha_filtrado,
@@ -92,7 +94,7 @@ def crear_beneficiario(request):
         if Beneficiario.objects.filter(documento_identidad=doc_id).exists():
             messages.error(request, f"Error: Ya existe un ciudadano registrado con el documento {doc_id}.")
             context = {
-                'estados': Estado.objects.all().order_by('nombre'),
+                'estados': estados_territorio(),
                 'TIPO_DOC_CHOICES': Beneficiario.TIPO_DOC_CHOICES,
                 'GENERO_CHOICES': Beneficiario.GENERO_CHOICES,
                 'boton': 'Registrar Ciudadano',
@@ -143,7 +145,7 @@ def crear_beneficiario(request):
             messages.error(request, f"Error inesperado al guardar: {e}")
 
     context = {
-        'estados': Estado.objects.all().order_by('nombre'),
+        'estados': estados_territorio(),
         'TIPO_DOC_CHOICES': Beneficiario.TIPO_DOC_CHOICES,
         'GENERO_CHOICES': Beneficiario.GENERO_CHOICES,
         'boton': 'Registrar Ciudadano',
@@ -195,7 +197,7 @@ def editar_beneficiario(request, id):
         'titulo': 'Editar Beneficiario',
         'boton': 'Guardar Cambios',
         'beneficiario': beneficiario,
-        'estados': Estado.objects.all().order_by('nombre'),
+        'estados': estados_territorio(),
         'TIPO_DOC_CHOICES': Beneficiario.TIPO_DOC_CHOICES,
         'GENERO_CHOICES': Beneficiario.GENERO_CHOICES,
     })
@@ -245,7 +247,7 @@ def registrar_visita(request):
     return render(request, 'beneficiarios/form_visita.html', {
         'motivos': Visita.MOTIVO_CHOICES,
         'current_time': timezone.now(),
-        'unidades': UnidadAdscrita.objects.all().order_by('nombre')
+        'unidades': unidades_adscritas()
     })
 
 @login_required
@@ -332,105 +334,127 @@ def beneficiarios_estadisticas(request):
 from django.db.models import Q
 from django.utils.timezone import now
 
-@login_required
-def exportar_excel(request):
-    try:
-        # 1. Capturar los parámetros con los nombres EXACTOS del HTML
-        f_inicio = request.GET.get('fecha_inicio', '').strip()
-        f_fin = request.GET.get('fecha_fin', '').strip()
-        tipo = request.GET.get('tipo', 'parcial')
-
-        # Verificar permisos para reporte completo
-        if tipo == 'completo' and not es_administrador(request.user):
-            messages.error(request, "No tienes permisos para exportar el reporte completo de ciudadanos.")
-            return redirect('beneficiarios:lista')
+def escribir_excel_beneficiarios(parametros, usuario, destino):
+    """Generador del reporte de visitas y ciudadanos (ver apps.reportes)."""
+    # 1. Parámetros con los nombres EXACTOS del HTML
+    f_inicio = parametros.get('fecha_inicio', '')
+    f_fin = parametros.get('fecha_fin', '')
+    tipo = parametros.get('tipo', 'parcial')
 
-        # 2. Construir filtros dinámicos (Igual que en estadísticas)
-        filtros_visita = Q()
-        filtros_beneficiario = Q()
-
-        if f_inicio and f_inicio != 'None':
-            filtros_visita &= Q(fecha_registro__date__gte=f_inicio)
-            filtros_beneficiario &= Q(fecha_creacion__date__gte=f_inicio)
-        if f_fin and f_fin != 'None':
-            filtros_visita &= Q(fecha_registro__date__lte=f_fin)
-            filtros_beneficiario &= Q(fecha_creacion__date__lte=f_fin)
-
-        # 3. Crear el libro de Excel
-        wb = openpyxl.Workbook()
-        header_fill = PatternFill(start_color="1E293B", end_color="1E293B", fill_type="solid")
-        white_font = Font(color="FFFFFF", bold=True, size=11)
-
-        # --- HOJA 1: RESUMEN Y FILTROS ---
-        ws_resumen = wb.active
-        ws_resumen.title = "Control de Reporte"
-        ws_resumen["A1"] = f"SICSI INTU - REPORTE {'COMPLETO' if tipo == 'completo' else 'PARCIAL'}"
-        ws_resumen["A1"].font = Font(bold=True, size=14)
-        ws_resumen.append([])
-        ws_resumen.append(["RANGO DESDE:", f_inicio if f_inicio else "HISTÓRICO"])
-        ws_resumen.append(["RANGO HASTA:", f_fin if f_fin else "HOY"])
-        ws_resumen.append([])
-        ws_resumen.append(["FECHA DE GENERACIÓN:", now().strftime("%d/%m/%Y %H:%M")])
-
-        # --- HOJA 2: VISITAS (EL DETALLE QUE NECESITAS) ---
-        ws_vis = wb.create_sheet(title="Detalle de Visitas")
-        ws_vis.append(['FECHA REGISTRO', 'CEDULA/RIF', 'NOMBRE COMPLETO', 'TRÁMITE / MOTIVO'])
-        
-        # Filtramos visitas con la lógica de Q
-        visitas_qs = Visita.objects.filter(filtros_visita).select_related('beneficiario').order_by('-fecha_registro')
-        
-        for v in visitas_qs:
-            ws_vis.append([
-                v.fecha_registro.strftime('%d/%m/%Y %H:%M'),
-                f"{v.beneficiario.tipo_documento}-{v.beneficiario.documento_identidad}",
-                v.beneficiario.nombre_completo.upper(),
-                v.motivo.upper() if v.motivo else "N/A"
+    # El permiso se vuelve a verificar al generar: la solicitud pudo quedar encolada
+    if tipo == 'completo' and not es_administrador(usuario):
+        raise PermissionError("No tiene permisos para exportar el reporte completo de ciudadanos.")
+
+    # 2. Construir filtros dinámicos (Igual que en estadísticas)
+    filtros_visita = Q()
+    filtros_beneficiario = Q()
+
+    if f_inicio:
+        filtros_visita &= Q(fecha_registro__date__gte=f_inicio)
+        filtros_beneficiario &= Q(fecha_creacion__date__gte=f_inicio)
+    if f_fin:
+        filtros_visita &= Q(fecha_registro__date__lte=f_fin)
+        filtros_beneficiario &= Q(fecha_creacion__date__lte=f_fin)
+
+    # 3. Crear el libro de Excel
+    wb = openpyxl.Workbook()
+    header_fill = PatternFill(start_color="1E293B", end_color="1E293B", fill_type="solid")
+    white_font = Font(color="FFFFFF", bold=True, size=11)
+
+    # --- HOJA 1: RESUMEN Y FILTROS ---
+    ws_resumen = wb.active
+    ws_resumen.title = "Control de Reporte"
+    ws_resumen["A1"] = f"SICSI INTU - REPORTE {'COMPLETO' if tipo == 'completo' else 'PARCIAL'}"
+    ws_resumen["A1"].font = Font(bold=True, size=14)
+    ws_resumen.append([])
+    ws_resumen.append(["RANGO DESDE:", f_inicio if f_inicio else "HISTÓRICO"])
+    ws_resumen.append(["RANGO HASTA:", f_fin if f_fin else "HOY"])
+    ws_resumen.append([])
+    ws_resumen.append(["FECHA DE GENERACIÓN:", now().strftime("%d/%m/%Y %H:%M")])
+
+    # --- HOJA 2: VISITAS (EL DETALLE QUE NECESITAS) ---
+    ws_vis = wb.create_sheet(title="Detalle de Visitas")
+    ws_vis.append(['FECHA REGISTRO', 'CEDULA/RIF', 'NOMBRE COMPLETO', 'TRÁMITE / MOTIVO'])
+
+    # Filtramos visitas con la lógica de Q
+    visitas_qs = Visita.objects.filter(filtros_visita).select_related('beneficiario').order_by('-fecha_registro')
+
+    for v in visitas_qs:
+        ws_vis.append([
+            v.fecha_registro.strftime('%d/%m/%Y %H:%M'),
+            f"{v.beneficiario.tipo_documento}-{v.beneficiario.documento_identidad}",
+            v.beneficiario.nombre_completo.upper(),
+            v.motivo.upper() if v.motivo else "N/A"
+        ])
+
+    # --- HOJA 3: BENEFICIARIOS (Solo para reporte completo) ---
+    if tipo == 'completo':
+        ws_ben = wb.create_sheet(title="Base de Ciudadanos")
+        ws_ben.append(['FECHA REGISTRO', 'IDENTIDAD', 'NOMBRE COMPLETO', 'TELÉFONO'])
+
+        beneficiarios_qs = Beneficiario.objects.filter(filtros_beneficiario).order_by('-fecha_creacion')
+        for b in beneficiarios_qs:
+            ws_ben.append([
+                b.fecha_creacion.strftime('%d/%m/%Y') if b.fecha_creacion else "N/A",
+                f"{b.tipo_documento}-{b.documento_identidad}",
+                b.nombre_completo.upper(),
+                b.telefono or "N/A"
             ])
 
-        # --- HOJA 3: BENEFICIARIOS (Solo para reporte completo) ---
-        if tipo == 'completo':
-            ws_ben = wb.create_sheet(title="Base de Ciudadanos")
-            ws_ben.append(['FECHA REGISTRO', 'IDENTIDAD', 'NOMBRE COMPLETO', 'TELÉFONO'])
-            
-            beneficiarios_qs = Beneficiario.objects.filter(filtros_beneficiario).order_by('-fecha_creacion')
-            for b in beneficiarios_qs:
-                ws_ben.append([
-                    b.fecha_creacion.strftime('%d/%m/%Y') if b.fecha_creacion else "N/A",
-                    f"{b.tipo_documento}-{b.documento_identidad}",
-                    b.nombre_completo.upper(),
-                    b.telefono or "N/A"
-                ])
-
-        # 4. Estilos y Ajuste de columnas
-        for sheet in wb.worksheets:
-            for row in sheet.iter_rows(min_row=1, max_row=1):
-                if sheet.title != "Control de Reporte":
-                    for cell in row:
-                        cell.fill = header_fill
-                        cell.font = white_font
-            
-            for col in sheet.columns:
-                max_length = 0
-                column = col[0].column_letter
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except: pass
-                sheet.column_dimensions[column].width = max_length + 4
-
-        # 5. Envío de respuesta
-        tipo_str = "COMPLETO" if tipo == "completo" else "PARCIAL"
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="Reporte_INTU_{tipo_str}_{now().strftime("%d%m%Y")}.xlsx"'
-        wb.save(response)
-        return response
-
-    except Exception as e:
-        logger_beneficiarios.error(f"Error en Excel: {str(e)}")
-        messages.error(request, f"Error al generar Excel: {str(e)}")
+    # 4. Estilos y Ajuste de columnas
+    for sheet in wb.worksheets:
+        for row in sheet.iter_rows(min_row=1, max_row=1):
+            if sheet.title != "Control de Reporte":
+                for cell in row:
+                    cell.fill = header_fill
+                    cell.font = white_font
+
+        for col in sheet.columns:
+            max_length = 0
+            column = col[0].column_letter
+            for cell in col:
+                try:
+                    if len(str(cell.value)) > max_length:
+                        max_length = len(str(cell.value))
+                except: pass
+            sheet.column_dimensions[column].width = max_length + 4
+
+    wb.save(destino)
+    tipo_str = "COMPLETO" if tipo == "completo" else "PARCIAL"
+    return f"Reporte_INTU_{tipo_str}_{now().strftime('%d%m%Y')}.xlsx"
+
+def beneficiarios_modificados_desde(parametros, momento):
+    """True si desde `momento` se registraron visitas (o ciudadanos, en el completo) del rango del reporte."""
+    f_inicio = parametros.get('fecha_inicio')
+    f_fin = parametros.get('fecha_fin')
+
+    visitas = Visita.objects.filter(fecha_registro__gte=momento)
+    if f_inicio:
+        visitas = visitas.filter(fecha_registro__date__gte=f_inicio)
+    if f_fin:
+        visitas = visitas.filter(fecha_registro__date__lte=f_fin)
+    if visitas.exists():
+        return True
+
+    if parametros.get('tipo') != 'completo':
+        return False
+    beneficiarios = Beneficiario.objects.filter(fecha_creacion__gte=momento)
+    if f_inicio:
+        beneficiarios = beneficiarios.filter(fecha_creacion__date__gte=f_inicio)
+    if f_fin:
+        beneficiarios = beneficiarios.filter(fecha_creacion__date__lte=f_fin)
+    return beneficiarios.exists()
+
+@login_required
+def exportar_excel(request):
+    # Verificar permisos para reporte completo
+    if request.GET.get('tipo') == 'completo' and not es_administrador(request.user):
+        messages.error(request, "No tienes permisos para exportar el reporte completo de ciudadanos.")
         return redirect('beneficiarios:lista')
 
+    # El libro se arma en segundo plano; se descarga desde "Mis reportes"
+    return encolar_reporte(request, 'beneficiarios_excel')
+
 # APIs TERRITORIALES PARA CARGA DINÁMICA (AJAX)
 def api_get_municipios(request, estado_id):
     municipios = Municipio.objects.filter(estado_id=estado_id).values('id', 'nombre').order_by('nombre')
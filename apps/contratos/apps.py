@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class ContratosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.contratos'  
\ No newline at end of file
+    name = 'apps.contratos'
+
+    def ready(self):
+        # Conecta la invalidación de los catálogos cacheados (ConfiguracionInstitucional) también fuera del servidor web
+        import sistema_gestion.cache_consultas
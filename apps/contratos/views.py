@@ -2,14 +2,16 @@ import io, openpyxl, os
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import FileResponse, HttpResponse
+from django.http import FileResponse
 from django.utils import timezone
 from django.db.models import Count
 from django.conf import settings
 from django.core.paginator import Paginator
 from django.db import transaction
-from .models import Contrato, ConfiguracionInstitucional, HistorialContrato
+from .models import Contrato, HistorialContrato
+from sistema_gestion.cache_consultas import configuracion_institucional
 from apps.beneficiarios.models import Beneficiario
+from apps.reportes.views import encolar_reporte
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -259,7 +261,7 @@ def crear_contrato(request):
             return redirect('contratos:nuevo')
 
         beneficiarios = Beneficiario.objects.filter(id__in=ids)
-        config = ConfiguracionInstitucional.objects.first()
+        config = configuracion_institucional()
         tipo_seleccionado = request.POST.get('tipo_contrato')
 
         # 2. Limpieza de datos técnicos
@@ -407,8 +409,8 @@ def estadisticas_contratos(request):
     
     return render(request, 'contratos/estadisticas.html', context)
 
-@login_required
-def exportar_excel(request):
+def escribir_excel_contratos(parametros, usuario, destino):
+    """Generador del informe de gestión de contratos (ver apps.reportes)."""
     wb = openpyxl.Workbook()
     
     # --- 1. HOJA DE ESTADÍSTICAS (RESUMEN) ---
@@ -500,11 +502,13 @@ def exportar_excel(request):
                 except: pass
             sheet.column_dimensions[column].width = min(max_length + 3, 60)
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="Reporte_Gestion_INTU.xlsx"'
-    wb.save(response)
-    
-    return response
+    wb.save(destino)
+    return "Reporte_Gestion_INTU.xlsx"
+
+@login_required
+def exportar_excel(request):
+    # El libro se arma en segundo plano; se descarga desde "Mis reportes"
+    return encolar_reporte(request, 'contratos_excel')
 
 @login_required
 def importar_contrato_existente(request):
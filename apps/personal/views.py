@@ -8,7 +8,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 
 from .models import Personal, DocumentoPersonal
 from .forms import PersonalForm
-from apps.territorio.models import Estado, UnidadAdscrita
+from sistema_gestion.cache_consultas import estados_territorio, unidades_adscritas
 import logging
 
 logger_personal = logging.getLogger('CH_PERSONAL')
@@ -57,8 +57,8 @@ class PersonalListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['unidades'] = UnidadAdscrita.objects.all()
-        context['estados'] = Estado.objects.all()
+        context['unidades'] = unidades_adscritas()
+        context['estados'] = estados_territorio()
         context['unidad_selected'] = self.request.GET.get('unidad', '')
         context['estado_selected'] = self.request.GET.get('estado_f', '')
         context['q_value'] = self.request.GET.get('q', '')
@@ -1,12 +1,14 @@
 from django.contrib import admin
-from .models import Recibo
+from .models import Recibo, ImportacionRecibos
 from django.core.exceptions import PermissionDenied
 
 @admin.register(Recibo)
 class ReciboAdmin(admin.ModelAdmin):
     list_display = ('numero_recibo', 'nombre', 'fecha', 'usuario', 'anulado')
     search_fields = ('numero_recibo', 'nombre')
-    exclude = ('usuario',)
+    exclude = ('usuario', 'importacion')
+    # El número lo asigna ConsecutivoRecibo al crear; editarlo desincronizaría el contador
+    readonly_fields = ('numero_recibo',)
 
     # 1. VER TODOS: Eliminamos el filtro de queryset para que TODOS vean TODO
     def get_queryset(self, request):
@@ -42,4 +44,13 @@ class ReciboAdmin(admin.ModelAdmin):
             if obj.usuario != request.user:
                 # Todos los campos serán de solo lectura (no podrá guardar cambios)
                 return [f.name for f in self.model._meta.fields]
-        return super().get_readonly_fields(request, obj)
\ No newline at end of file
+        return super().get_readonly_fields(request, obj)
+
+
+@admin.register(ImportacionRecibos)
+class ImportacionRecibosAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre_archivo', 'usuario', 'estado', 'filas_leidas', 'filas_insertadas', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado',)
+    search_fields = ('nombre_archivo',)
+    readonly_fields = ('estado', 'filas_leidas', 'filas_insertadas', 'errores', 'mensaje',
+                       'fecha_inicio', 'fecha_fin')
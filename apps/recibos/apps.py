@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class RecibosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.recibos' 
+    name = 'apps.recibos'
+
+    def ready(self):
+        import apps.recibos.signals
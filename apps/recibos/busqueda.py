@@ -0,0 +1,87 @@
+"""Búsqueda de recibos: igualdad indexada para lo que parece exacto y trigramas para el resto.
+
+Un número, un RIF o una referencia de transferencia se buscan primero por igualdad
+(índices B-tree). Si no aparecen, o si el texto es libre, se usa icontains sobre
+nombre, RIF, transferencia y estado. En PostgreSQL esas condiciones se resuelven
+con los índices GIN gin_trgm_ops sobre UPPER(columna) de la migración 0009, que es
+la misma expresión que compara icontains. Los resultados se ordenan por similitud.
+"""
+import re
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .models import Recibo
+
+CAMPOS_TEXTO = ('nombre', 'rif_cedula_identidad', 'numero_transferencia', 'estado')
+CAMPOS_BUSQUEDA = CAMPOS_TEXTO + ('numero_recibo',)
+# Con menos caracteres no hay trigramas que consultar en el índice: sólo se intenta la vía exacta
+MINIMO_TRIGRAMAS = 3
+MAXIMO_ENTERO = 2 ** 31 - 1
+PREFIJOS_RIF = 'VEJGP'
+PATRON_RIF = re.compile(r'^[VEJGP][-. ]?\d[\d.\- ]{4,}$', re.IGNORECASE)
+PATRON_REFERENCIA = re.compile(r'^(?=.*\d)[A-Z0-9\-/]{4,}$')
+
+
+def normalizar_rif(texto):
+    """Misma forma con la que se guarda el RIF: sin puntos, guiones ni espacios, en mayúsculas."""
+    return re.sub(r'[.\- ]', '', texto).upper()
+
+
+def q_exacta(texto, campo='todos'):
+    """Condición de igualdad si el texto parece un número, RIF o referencia; si no, None."""
+    texto = texto.strip()
+    condicion = Q()
+    if texto.isdigit():
+        if campo in ('todos', 'numero_recibo') and int(texto) <= MAXIMO_ENTERO:
+            condicion |= Q(numero_recibo=int(texto))
+        if campo in ('todos', 'rif_cedula_identidad'):
+            # Una cédula escrita sin letra: se prueban las letras posibles
+            condicion |= Q(rif_cedula_identidad__in=[texto] + [prefijo + texto for prefijo in PREFIJOS_RIF])
+        if campo in ('todos', 'numero_transferencia'):
+            condicion |= Q(numero_transferencia=texto)
+        return condicion or None
+
+    if campo in ('todos', 'rif_cedula_identidad') and PATRON_RIF.match(texto):
+        condicion |= Q(rif_cedula_identidad=normalizar_rif(texto))
+    if campo in ('todos', 'numero_transferencia') and PATRON_REFERENCIA.match(texto.upper()):
+        condicion |= Q(numero_transferencia=texto.upper())
+    return condicion or None
+
+
+def q_aproximada(texto, campo='todos'):
+    """icontains sobre los campos de texto (con índice de trigramas en PostgreSQL)."""
+    condicion = Q()
+    for nombre in (CAMPOS_TEXTO if campo == 'todos' else (campo,)):
+        condicion |= Q(**{f'{nombre}__icontains': texto})
+    return condicion
+
+
+def q_busqueda(texto, campo='todos'):
+    """Condición de búsqueda: la exacta si encuentra algo; si no, la aproximada.
+
+    El número de recibo sólo se busca por igualdad: compararlo como texto obliga a
+    convertir la columna en cada fila y a recorrer la tabla completa.
+    """
+    texto = texto.strip()
+    if campo not in CAMPOS_BUSQUEDA:
+        campo = 'todos'
+
+    exacta = q_exacta(texto, campo)
+    if exacta is not None and Recibo.objects.filter(exacta).exists():
+        return exacta
+    if campo == 'numero_recibo' or len(texto) < MINIMO_TRIGRAMAS:
+        return exacta if exacta is not None else Q(pk__in=[])
+    return q_aproximada(texto, campo)
+
+
+def ordenar_por_relevancia(queryset, texto, campo='todos'):
+    """Ordena por similitud de trigramas (pg_trgm) y luego por fecha; fuera de PostgreSQL no cambia el orden."""
+    texto = texto.strip()
+    if connection.vendor != 'postgresql' or len(texto) < MINIMO_TRIGRAMAS or campo == 'numero_recibo':
+        return queryset
+    campos = CAMPOS_TEXTO if campo not in CAMPOS_TEXTO else (campo,)
+    similitudes = [TrigramSimilarity(nombre, texto) for nombre in campos]
+    relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+    return queryset.annotate(relevancia=relevancia).order_by('-relevancia', '-fecha_creacion', '-id')
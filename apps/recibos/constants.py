@@ -11,6 +11,8 @@ CATEGORY_CHOICES = (
     ('categoria10', '10.Arrendamiento Terrenos'),
 )
 CATEGORY_CHOICES_MAP = dict(CATEGORY_CHOICES)
+# Bit de cada categoría en Recibo.categorias: categoria1 -> 1, categoria2 -> 2, categoria3 -> 4...
+BITS_CATEGORIAS = {codigo: 1 << indice for indice, (codigo, _) in enumerate(CATEGORY_CHOICES)}
 
 
 ESTADO_PAGADO = 'PAGADO'
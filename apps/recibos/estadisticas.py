@@ -0,0 +1,162 @@
+"""Métricas del panel de estadísticas en dos consultas agregadas, más usuarios y estados.
+
+Con filtros de fechas, estado y categorías (los del panel) las consultas leen el
+resumen diario (ResumenDiario, unas pocas filas por día); con búsqueda, rango de
+números o lote, que el resumen no guarda, leen recibos_pago. En ambos casos:
+
+1. Por estado y máscara de categorías, con agregación condicional: cantidad y monto
+   del filtro y cantidad de hoy. De ahí salen los totales, el top de estados, la
+   distribución de hoy y las categorías.
+2. Por día (hora de Caracas) y usuario: historial diario y ranking de usuarios.
+3. Los usuarios del ranking, de una sola vez (in_bulk).
+4. Los estados del selector, del resumen (cacheados, ver resumen.py).
+
+Cada consulta se cronometra; los tiempos van al log y al encabezado Server-Timing.
+"""
+import time
+import logging
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+
+from .constants import BITS_CATEGORIAS
+from .filtros import ZONA_RECIBOS, rango_dia
+from .models import Recibo, ResumenDiario
+from .resumen import estados_registrados
+
+log_rec = logging.getLogger('CH_RECIBOS')
+
+CATEGORIAS_ESTADISTICAS = [
+    ('categoria1', 'Título Tierra Urbana'), ('categoria2', 'Título + Vivienda'),
+    ('categoria3', 'Municipal'), ('categoria4', 'Tierra Privada'),
+    ('categoria5', 'Tierra INAVI'), ('categoria6', 'Excedentes Título'),
+    ('categoria7', 'Excedentes INAVI'), ('categoria8', 'Estudio Técnico'),
+    ('categoria9', 'Locales Comerciales'), ('categoria10', 'Arrendamiento Terrenos'),
+]
+
+
+class Cronometro:
+    """Duración en milisegundos de cada consulta, en el orden en que se ejecutaron."""
+
+    def __init__(self, origen=''):
+        self.origen = origen
+        self.tiempos = []
+
+    @contextmanager
+    def medir(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos.append((nombre, (time.perf_counter() - inicio) * 1000))
+
+    def server_timing(self):
+        metricas = [f'{nombre};dur={ms:.1f}' for nombre, ms in self.tiempos]
+        if self.origen:
+            metricas.append(f'origen;desc="{self.origen}"')
+        return ', '.join(metricas)
+
+
+def _fuente(filtro, hoy):
+    """(queryset, condición, condición de hoy, día, cantidad(filter), monto(filter)) según el filtro."""
+    condicion = filtro.q_resumen()
+    if condicion is not None:
+        return (
+            ResumenDiario.objects.all(), condicion, Q(dia=hoy), F('dia'),
+            lambda filtro_q=None: Sum('total', filter=filtro_q),
+            lambda filtro_q=None: Sum('monto', filter=filtro_q),
+        )
+    desde_hoy, hasta_hoy = rango_dia(hoy)
+    return (
+        Recibo.objects.filter(anulado=False), filtro.q(),
+        Q(fecha_creacion__gte=desde_hoy, fecha_creacion__lt=hasta_hoy),
+        TruncDate('fecha_creacion', tzinfo=ZONA_RECIBOS),
+        lambda filtro_q=None: Count('pk', filter=filtro_q),
+        lambda filtro_q=None: Sum('total_monto_bs', filter=filtro_q),
+    )
+
+
+def metricas_estadisticas(filtro, hoy):
+    """Contexto de métricas para `FiltroRecibos` y el día `hoy`, más el Cronometro usado."""
+    base, condicion, de_hoy, expresion_dia, cantidad, monto = _fuente(filtro, hoy)
+    cronometro = Cronometro('resumen' if base.model is ResumenDiario else 'recibos')
+
+    # 1. Por estado y categorías. La base une lo filtrado con lo de hoy (hoy no depende del filtro)
+    with cronometro.medir('estados'):
+        por_grupo = list(
+            (base.filter(condicion | de_hoy) if condicion else base)
+            .values('estado', 'categorias')
+            .annotate(filtrados=cantidad(condicion), suma=monto(condicion), de_hoy=cantidad(de_hoy))
+            .order_by()
+        )
+
+    por_estado, hoy_por_estado = {}, {}
+    for fila in por_grupo:
+        por_estado[fila['estado']] = por_estado.get(fila['estado'], 0) + (fila['filtrados'] or 0)
+        hoy_por_estado[fila['estado']] = hoy_por_estado.get(fila['estado'], 0) + (fila['de_hoy'] or 0)
+
+    total_recibos = sum(por_estado.values())
+    monto_total = sum(fila['suma'] or 0 for fila in por_grupo)
+    recibos_hoy_total = sum(hoy_por_estado.values())
+    top_estados = sorted(
+        ({'estado': estado, 'total': total} for estado, total in por_estado.items() if total),
+        key=lambda fila: -fila['total']
+    )[:10]
+    datos_estados_hoy = sorted(
+        ({'estado': estado, 'total': total} for estado, total in hoy_por_estado.items() if total),
+        key=lambda fila: -fila['total']
+    )
+
+    categorias = []
+    for codigo, nombre in CATEGORIAS_ESTADISTICAS:
+        total = sum(fila['filtrados'] or 0 for fila in por_grupo if fila['categorias'] & BITS_CATEGORIAS[codigo])
+        if total > 0:
+            categorias.append({
+                'nombre': nombre, 'total': total,
+                'porcentaje': (total / total_recibos * 100) if total_recibos > 0 else 0
+            })
+
+    # 2. Por día y usuario
+    with cronometro.medir('dias_usuarios'):
+        por_dia_usuario = list(
+            base.filter(condicion).annotate(dia_local=expresion_dia)
+            .values('dia_local', 'usuario').annotate(cantidad=cantidad()).order_by()
+        )
+
+    por_dia, por_usuario = {}, {}
+    for fila in por_dia_usuario:
+        por_dia[fila['dia_local']] = por_dia.get(fila['dia_local'], 0) + fila['cantidad']
+        if fila['usuario']:
+            por_usuario[fila['usuario']] = por_usuario.get(fila['usuario'], 0) + fila['cantidad']
+
+    max_dia = max(por_dia.values(), default=0)
+    historial_dias = [
+        {'fecha': dia, 'total': total, 'porcentaje': (total / max_dia * 100) if max_dia > 0 else 0}
+        for dia, total in sorted(por_dia.items()) if dia and total
+    ]
+
+    # 3. Usuarios del ranking en una sola consulta
+    with cronometro.medir('usuarios'):
+        usuarios = get_user_model().objects.in_bulk(list(por_usuario))
+    ranking_usuarios = [
+        {'usuario': usuarios[pk], 'total': total}
+        for pk, total in sorted(por_usuario.items(), key=lambda item: -item[1]) if pk in usuarios
+    ]
+
+    # 4. Estados disponibles para el filtro
+    with cronometro.medir('estados_disponibles'):
+        estados_db = estados_registrados()
+
+    log_rec.debug(f"Estadísticas ({cronometro.origen}): {cronometro.server_timing()}")
+    return {
+        'total_recibos': total_recibos,
+        'recibos_hoy_total': recibos_hoy_total,
+        'monto_total': monto_total,
+        'categorias': categorias,
+        'top_estados': top_estados,
+        'datos_estados_hoy': datos_estados_hoy,
+        'historial_dias': historial_dias,
+        'ranking_usuarios': ranking_usuarios,
+        'estados_db': estados_db,
+    }, cronometro
@@ -0,0 +1,144 @@
+"""Filtros de recibos compartidos por el listado, los reportes y las estadísticas.
+
+Las fechas se traducen a rangos semiabiertos de fecha_creacion, [inicio, fin + 1 día),
+en hora de Caracas, y el estado se compara ya normalizado por igualdad. Así ninguna
+condición envuelve la columna en una función (__date, UPPER) y todas usan su índice.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from .busqueda import q_busqueda, ordenar_por_relevancia
+from .constants import CATEGORY_CHOICES, BITS_CATEGORIAS
+from .models import con_categoria, normalizar_estado
+
+ZONA_RECIBOS = ZoneInfo('America/Caracas')
+
+
+def inicio_del_dia(dia):
+    """Primer instante del día `dia` en hora de Caracas."""
+    return datetime.combine(dia, time.min, tzinfo=ZONA_RECIBOS)
+
+
+def rango_dia(dia):
+    """(desde, hasta) semiabierto con los instantes del día `dia`."""
+    return inicio_del_dia(dia), inicio_del_dia(dia + timedelta(days=1))
+
+
+def _fecha(valor):
+    if not valor:
+        return None
+    if hasattr(valor, 'isoformat'):
+        return valor
+    try:
+        return parse_date(str(valor).strip())
+    except ValueError:
+        return None
+
+
+def _entero(valor):
+    valor = str(valor or '').strip()
+    return int(valor) if valor.isdigit() else None
+
+
+class FiltroRecibos:
+    """Filtros de recibos leídos de un mapeo (request.GET o los parámetros de un reporte).
+
+    Reconoce q/field, estado, fecha_inicio/fecha_fin (AAAA-MM-DD), numero_desde/numero_hasta,
+    lote y las casillas categoria1..categoria10 ('on'). Los valores vacíos o inválidos se ignoran.
+    """
+    def __init__(self, parametros):
+        self.busqueda = (parametros.get('q') or '').strip()
+        self.campo = parametros.get('field') or 'todos'
+        estado = (parametros.get('estado') or '').strip()
+        self.estado = normalizar_estado(estado) if estado and estado != 'Todos' else ''
+        self.fecha_inicio = _fecha(parametros.get('fecha_inicio'))
+        self.fecha_fin = _fecha(parametros.get('fecha_fin'))
+        self.numero_desde = _entero(parametros.get('numero_desde'))
+        self.numero_hasta = _entero(parametros.get('numero_hasta'))
+        self.lote = _entero(parametros.get('lote'))
+        self.categorias = [(codigo, nombre) for codigo, nombre in CATEGORY_CHOICES if parametros.get(codigo) == 'on']
+
+    def q_fechas(self):
+        condicion = Q()
+        if self.fecha_inicio:
+            condicion &= Q(fecha_creacion__gte=inicio_del_dia(self.fecha_inicio))
+        if self.fecha_fin:
+            condicion &= Q(fecha_creacion__lt=inicio_del_dia(self.fecha_fin + timedelta(days=1)))
+        return condicion
+
+    def q_busqueda(self):
+        return q_busqueda(self.busqueda, self.campo) if self.busqueda else Q()
+
+    def _q_estado_categorias(self):
+        # Mismos nombres de columna en Recibo y en ResumenDiario
+        condicion = Q()
+        if self.estado:
+            condicion &= Q(estado=self.estado)
+        if self.categorias:
+            # Alguna de las categorías marcadas: un bit de la máscara por categoría (índice parcial de cada bit)
+            alguna = Q()
+            for codigo, _ in self.categorias:
+                alguna |= con_categoria(BITS_CATEGORIAS[codigo])
+            condicion &= alguna
+        return condicion
+
+    def q(self):
+        condicion = self.q_fechas() & self.q_busqueda() & self._q_estado_categorias()
+        if self.numero_desde is not None:
+            condicion &= Q(numero_recibo__gte=self.numero_desde)
+        if self.numero_hasta is not None:
+            condicion &= Q(numero_recibo__lte=self.numero_hasta)
+        if self.lote is not None:
+            condicion &= Q(importacion_id=self.lote)
+        return condicion
+
+    def q_resumen(self):
+        """La misma condición sobre ResumenDiario, o None si usa algo que el resumen no guarda."""
+        if self.busqueda or self.numero_desde is not None or self.numero_hasta is not None or self.lote is not None:
+            return None
+        condicion = self._q_estado_categorias()
+        if self.fecha_inicio:
+            condicion &= Q(dia__gte=self.fecha_inicio)
+        if self.fecha_fin:
+            condicion &= Q(dia__lte=self.fecha_fin)
+        return condicion
+
+    def aplicar(self, queryset):
+        return queryset.filter(self.q())
+
+    def ordenar(self, queryset):
+        """Con búsqueda, los resultados más parecidos primero."""
+        return ordenar_por_relevancia(queryset, self.busqueda, self.campo) if self.busqueda else queryset
+
+    def filtros_aplicados(self):
+        """Descripción legible de los filtros para el encabezado de los reportes."""
+        if self.fecha_inicio and self.fecha_fin:
+            periodo = f"Desde: {self.fecha_inicio.isoformat()} Hasta: {self.fecha_fin.isoformat()}"
+        elif self.fecha_inicio:
+            periodo = f"Desde: {self.fecha_inicio.isoformat()}"
+        elif self.fecha_fin:
+            periodo = f"Hasta: {self.fecha_fin.isoformat()}"
+        else:
+            periodo = 'Todas las fechas'
+
+        if self.numero_desde is not None and self.numero_hasta is not None:
+            rango = f"Desde Nº {self.numero_desde} Hasta Nº {self.numero_hasta}"
+        elif self.numero_desde is not None:
+            rango = f"Desde Nº {self.numero_desde}"
+        elif self.numero_hasta is not None:
+            rango = f"Hasta Nº {self.numero_hasta}"
+        else:
+            rango = "Todos"
+
+        filtros = {
+            'estado': self.estado or 'Todos los estados',
+            'periodo': periodo,
+            'rango_recibos': rango,
+            'categorias': ', '.join(nombre for _, nombre in self.categorias) or 'Todas las categorías',
+            'busqueda': self.busqueda or 'Ninguna',
+        }
+        if self.lote is not None:
+            filtros['importacion'] = f"Importación #{self.lote}"
+        return filtros
@@ -54,7 +54,7 @@ class ReciboForm(forms.ModelForm):
         model = Recibo
         
         fields = [
-            'numero_recibo', 'estado', 'nombre', 'rif_cedula_identidad',
+            'estado', 'nombre', 'rif_cedula_identidad',
             'direccion_inmueble', 'ente_liquidado', 'categoria1', 'categoria2',
             'categoria3', 'categoria4', 'categoria5', 'categoria6',
             'categoria7', 'categoria8', 'categoria9', 'categoria10',
@@ -80,11 +80,6 @@ class ReciboForm(forms.ModelForm):
         }
         
         widgets = {
-            'numero_recibo': forms.TextInput(attrs={
-                'readonly': 'readonly', 
-                'class': 'mt-1 block w-full rounded-xl border border-gray-100 bg-gray-50 shadow-inner text-intu-blue font-black' 
-            }),
-
             'estado': forms.TextInput(attrs={'class': TAILWIND_CLASS}),
             'nombre': forms.TextInput(attrs={'class': TAILWIND_CLASS}),
             'rif_cedula_identidad': forms.TextInput(attrs={'class': TAILWIND_CLASS}),
@@ -0,0 +1,239 @@
+import io
+import hashlib
+import re
+import random
+import time
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_LEFT, TA_CENTER
+from reportlab.platypus import Paragraph
+from apps.recibos.models import Recibo
+from apps.recibos.utils import (
+    HEADER_IMAGE, CATEGORY_DESCRIPTIONS, FIRMANTE_INSTITUCION, TEXTOS_LEGALES_FIRMA,
+    dibujar_recibo_pdf, limpiar_plantilla_recibo, obtener_plantilla_recibo,
+    format_currency, draw_centered_text_right_unit,
+)
+
+NOMBRES = ['josé pérez', 'MARÍA DE LOS ÁNGELES RODRÍGUEZ DE LA SANTÍSIMA TRINIDAD', 'Ente Liquidado C.A.']
+DIRECCIONES = ['calle 5, casa 2', 'AV. BOLÍVAR, SECTOR LA HOYADA, EDIFICIO RESIDENCIAS DEL ESTE, PISO 12, APTO 12-B', '']
+
+
+# --- RUTA ORIGINAL: todo se recalcula en cada recibo (imagen, estilos y párrafos) ---
+
+def _encabezado_original(c, width, height):
+    current_y = height - 50
+    img = ImageReader(HEADER_IMAGE)
+    img_width, img_height = img.getSize()
+    scale = min(1.0, 480 / img_width)
+    draw_width, draw_height = img_width * scale, img_height * scale
+    y_top = height - draw_height - 20
+    c.drawImage(HEADER_IMAGE, x=(width - draw_width) / 2, y=y_top, width=draw_width, height=draw_height)
+    current_y = y_top - 25
+    c.setFont("Helvetica-Bold", 13)
+    titulo_x = (width - c.stringWidth("RECIBO DE PAGO", "Helvetica-Bold", 13)) / 2
+    c.drawString(titulo_x, current_y, "RECIBO DE PAGO")
+    return current_y - 25
+
+
+def _cuerpo_original(c, recibo, y_start, X1_TITLE, X1_DATA, X2_TITLE, X2_DATA):
+    styles = getSampleStyleSheet()
+    style_dato = ParagraphStyle('DatoStyle', parent=styles['Normal'], fontName='Helvetica', fontSize=8, leading=9, alignment=TA_LEFT)
+    ancho_col1, ancho_col2 = X2_TITLE - X1_DATA - 10, 550 - X2_DATA
+
+    def dibujar_campo(label, texto, x_label, x_dato, y, ancho_max):
+        c.setFont("Helvetica-Bold", 9)
+        c.drawString(x_label, y, label)
+        p = Paragraph(str(texto), style_dato)
+        w, h = p.wrap(ancho_max, 100)
+        p.drawOn(c, x_dato, y - h + 7)
+        return h
+
+    filas = [
+        (("Estado:", recibo.estado), ("Nº Recibo:", str(recibo.numero_recibo).zfill(9) if recibo.numero_recibo else 'N/A')),
+        (("Recibí de:", recibo.nombre), ("Monto Recibido (Bs.):", format_currency(recibo.total_monto_bs))),
+        (("Rif/C.I:", recibo.rif_cedula_identidad), ("Nº Transferencia:", recibo.numero_transferencia or 'N/A')),
+        (("Dirección:", recibo.direccion_inmueble), ("Fecha:", recibo.fecha.strftime("%d/%m/%Y"))),
+    ]
+    y_line = y_start
+    for (l1, t1), (l2, t2) in filas:
+        h1 = dibujar_campo(l1, t1, X1_TITLE, X1_DATA, y_line, ancho_col1)
+        h2 = dibujar_campo(l2, t2, X2_TITLE, X2_DATA, y_line, ancho_col2)
+        y_line -= max(h1, h2, 15) + 5
+    h_concepto = dibujar_campo("Concepto:", recibo.concepto, X1_TITLE, X1_DATA, y_line, 550 - X1_DATA)
+    return y_line - h_concepto - 20
+
+
+def _categorias_original(c, recibo, y_start, X1_TITLE):
+    styles = getSampleStyleSheet()
+    style_titulo_cat = ParagraphStyle('CatTitulo', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=8, leading=9)
+    style_detalle_cat = ParagraphStyle('CatDetalle', parent=styles['Normal'], fontName='Helvetica', fontSize=7, leading=9, leftIndent=10)
+    categorias = {f'categoria{i}': getattr(recibo, f'categoria{i}') for i in range(1, 11)}
+    current_y = y_start
+    if any(categorias.values()):
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(X1_TITLE, current_y, "FORMA DE PAGO Y DESCRIPCIÓN DE LA REGULARIZACIÓN")
+        current_y -= 20
+        for key, (title, detail) in CATEGORY_DESCRIPTIONS.items():
+            if categorias.get(key, False):
+                p_title = Paragraph(title.replace(":", ":<br/>"), style_titulo_cat)
+                w_t, h_t = p_title.wrap(450, 100)
+                if current_y - h_t < 100:
+                    c.showPage()
+                    current_y = 750
+                p_title.drawOn(c, X1_TITLE, current_y - h_t)
+                c.setFont("Helvetica-Bold", 10)
+                c.drawString(520, current_y - 8, "X")
+                current_y -= (h_t + 2)
+                p_detail = Paragraph(detail, style_detalle_cat)
+                w_d, h_d = p_detail.wrap(440, 100)
+                if current_y - h_d < 50:
+                    c.showPage()
+                    current_y = 750
+                p_detail.drawOn(c, X1_TITLE, current_y - h_d)
+                current_y -= (h_d + 10)
+    return current_y - 70
+
+
+def _firmas_original(c, recibo, current_y, width):
+    line_width = 180
+    left_line_x = (width / 4) - (line_width / 2)
+    right_line_x = (3 * width / 4) - (line_width / 2)
+    c.setLineWidth(1)
+    c.line(left_line_x, current_y, left_line_x + line_width, current_y)
+    c.line(right_line_x, current_y, right_line_x + line_width, current_y)
+    y_sig = current_y - 12
+    draw_centered_text_right_unit(c, y_sig, "Firma", left_line_x, line_width, font_size=8)
+    nombre_style = ParagraphStyle('NombreStyle', fontName='Helvetica-Bold', fontSize=9, leading=10, alignment=TA_CENTER)
+    p_nombre = Paragraph(recibo.nombre.upper(), nombre_style)
+    w_p, h_p = p_nombre.wrap(line_width, 100)
+    y_pos_nombre = y_sig - h_p - 5
+    p_nombre.drawOn(c, left_line_x, y_pos_nombre)
+    draw_centered_text_right_unit(c, y_pos_nombre - 12, f"C.I./RIF: {recibo.rif_cedula_identidad}", left_line_x, line_width, font_size=8)
+    y_sig_inst = current_y - 12
+    draw_centered_text_right_unit(c, y_sig_inst, "Recibido por:", right_line_x, line_width, font_size=8)
+    y_sig_inst -= 14
+    draw_centered_text_right_unit(c, y_sig_inst, FIRMANTE_INSTITUCION[0], right_line_x, line_width, is_bold=True, font_size=9)
+    y_sig_inst -= 12
+    draw_centered_text_right_unit(c, y_sig_inst, FIRMANTE_INSTITUCION[1], right_line_x, line_width, font_size=9)
+    y_sig_inst -= 14
+    for linea in TEXTOS_LEGALES_FIRMA:
+        draw_centered_text_right_unit(c, y_sig_inst, linea, right_line_x, line_width, font_size=7)
+        y_sig_inst -= 9
+
+
+def dibujar_recibo_original(c, recibo):
+    width, height = letter
+    current_y = _encabezado_original(c, width, height)
+    current_y = _cuerpo_original(c, recibo, current_y, 60, 160, 310, 470)
+    current_y = _categorias_original(c, recibo, current_y, 60)
+    if current_y < 150:
+        c.showPage()
+        current_y = height - 100
+    _firmas_original(c, recibo, current_y, width)
+    c.showPage()
+
+
+# --- COMPARACIÓN DEL CONTENIDO DIBUJADO ---
+
+OBJETO_PDF = re.compile(rb'\d+ 0 obj(.*?)endobj', re.S)
+FLUJO_PDF = re.compile(rb'stream\r?\n(.*?)endstream', re.S)
+# Envoltorios que cambian al pasar el encabezado a un form XObject sin alterar lo que se ve
+OPERADORES_ENVOLTORIO = re.compile(rb'^(q|Q|/\S+ Do|1 0 0 1 0 0 cm  BT /F\d+ 12 Tf 14\.4 TL ET)$')
+
+
+def operaciones_dibujo(pdf):
+    """Operaciones de dibujo de páginas y formularios, más la huella de cada imagen, como multiconjunto."""
+    operaciones = Counter()
+    for objeto in OBJETO_PDF.findall(pdf):
+        flujo = FLUJO_PDF.search(objeto)
+        if not flujo:
+            continue
+        if b'/Subtype /Image' in objeto:
+            operaciones[b'imagen ' + hashlib.sha1(flujo.group(1)).hexdigest().encode()] += 1
+            continue
+        for linea in flujo.group(1).splitlines():
+            linea = linea.strip()
+            if linea and not OPERADORES_ENVOLTORIO.match(linea):
+                operaciones[linea] += 1
+    return operaciones
+
+
+class Command(BaseCommand):
+    help = 'Compara el PDF unitario original vs la plantilla precompilada (recibos/segundo y equivalencia)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recibos', type=int, default=300, help='Recibos sintéticos a renderizar')
+        parser.add_argument('--semilla', type=int, default=2024)
+
+    def generar_recibos(self, cantidad, semilla):
+        rnd = random.Random(semilla)
+        recibos = []
+        for i in range(cantidad):
+            recibo = Recibo(
+                pk=i + 1, numero_recibo=i + 1, estado=rnd.choice(['MERIDA', 'ZULIA', 'DISTRITO CAPITAL']),
+                nombre=f"{rnd.choice(NOMBRES)} {i}", rif_cedula_identidad=f"V{rnd.randint(1000000, 30000000)}",
+                direccion_inmueble=rnd.choice(DIRECCIONES), ente_liquidado='Intu',
+                total_monto_bs=Decimal(rnd.randint(100, 10_000_000)) / 100,
+                numero_transferencia=rnd.choice([f"REF{i}", None]), fecha=date(2025, 3, rnd.randint(1, 28)),
+                concepto=rnd.choice(['Pago De Título', 'Regularización de tierra urbana ' * 6]),
+            )
+            for n in rnd.sample(range(1, 11), rnd.randint(0, 10)):
+                setattr(recibo, f'categoria{n}', True)
+            recibos.append(recibo)
+        return recibos
+
+    def renderizar(self, dibujar, recibo, comprimir=1):
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=letter, pageCompression=comprimir)
+        dibujar(c, recibo)
+        c.save()
+        return buffer.getvalue(), c.getPageNumber() - 1
+
+    def medir(self, dibujar, recibos):
+        inicio = time.perf_counter()
+        for recibo in recibos:
+            self.renderizar(dibujar, recibo)
+        segundos = time.perf_counter() - inicio
+        return segundos, len(recibos) / segundos if segundos else 0
+
+    def handle(self, *args, **options):
+        recibos = self.generar_recibos(options['recibos'], options['semilla'])
+        self.stdout.write(self.style.WARNING(f'>>> {len(recibos)} recibos sintéticos generados.'))
+
+        t_original, rps_original = self.medir(dibujar_recibo_original, recibos)
+        limpiar_plantilla_recibo()
+        inicio = time.perf_counter()
+        obtener_plantilla_recibo()
+        t_plantilla_init = time.perf_counter() - inicio
+        t_plantilla, rps_plantilla = self.medir(dibujar_recibo_pdf, recibos)
+
+        diferencias = 0
+        for recibo in recibos:
+            esperado, paginas_esperadas = self.renderizar(dibujar_recibo_original, recibo, comprimir=0)
+            obtenido, paginas_obtenidas = self.renderizar(dibujar_recibo_pdf, recibo, comprimir=0)
+            faltan = operaciones_dibujo(esperado) - operaciones_dibujo(obtenido)
+            sobran = operaciones_dibujo(obtenido) - operaciones_dibujo(esperado)
+            if paginas_esperadas != paginas_obtenidas or faltan or sobran:
+                diferencias += 1
+                if diferencias <= 5:
+                    self.stdout.write(self.style.ERROR(
+                        f"Recibo {recibo.numero_recibo}: páginas {paginas_esperadas} vs {paginas_obtenidas}; "
+                        f"faltan {list(faltan)[:3]} sobran {list(sobran)[:3]}"
+                    ))
+
+        self.stdout.write(
+            f'\nRESUMEN:\n'
+            f'- Original:              {t_original:.3f} s ({rps_original:.1f} recibos/s)\n'
+            f'- Plantilla (armado):    {t_plantilla_init:.3f} s, una vez por proceso\n'
+            f'- Plantilla precompilada: {t_plantilla:.3f} s ({rps_plantilla:.1f} recibos/s)\n'
+            f'- Aceleración:           {rps_plantilla / rps_original if rps_original else 0:.1f}x'
+        )
+        if diferencias:
+            raise CommandError(f'Equivalencia fallida: {diferencias} recibos dibujan distinto.')
+        self.stdout.write(self.style.SUCCESS('Mismas operaciones de dibujo y páginas en todos los recibos.'))
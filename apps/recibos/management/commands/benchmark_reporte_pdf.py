@@ -0,0 +1,102 @@
+import random
+import tempfile
+import time
+import resource
+import multiprocessing
+from datetime import date
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table
+from apps.recibos.utils import (
+    escribir_pdf_reporte, format_currency, ESTILO_TABLA_REPORTE,
+    ENCABEZADO_REPORTE_PDF, ANCHOS_REPORTE_PDF
+)
+
+NOMBRES = ['José Pérez', 'María De Los Ángeles Rodríguez De La Santísima Trinidad', 'Ente Liquidado C.A.']
+ESTADOS = ['MERIDA', 'ZULIA', 'DISTRITO CAPITAL', 'NUEVA ESPARTA']
+CONCEPTOS = ['Pago De Título', 'Regularización de tierra urbana, gastos administrativos y estudios técnicos']
+
+
+def filas_sinteticas(cantidad, semilla):
+    rnd = random.Random(semilla)
+    for i in range(cantidad):
+        yield (
+            i + 1, f"{rnd.choice(NOMBRES)} {i}", f"V{rnd.randint(1000000, 30000000)}",
+            Decimal(rnd.randint(100, 10_000_000)) / 100, date(2025, rnd.randint(1, 12), rnd.randint(1, 28)),
+            rnd.choice(ESTADOS), rnd.choice([f"REF-{i}", None]), rnd.choice(CONCEPTOS),
+        )
+
+
+def reporte_original(filas, destino):
+    """Ruta original: una sola Table con todas las filas como Paragraph."""
+    estilo = ParagraphStyle(name='CustomCellStyle', fontSize=8, leading=10, wordWrap='LTR')
+    estilo_monto = ParagraphStyle(name='AmountCellStyle', fontSize=8, leading=10, alignment=TA_RIGHT)
+
+    def celda(texto, max_chars, est=estilo):
+        texto = str(texto or '').strip()
+        if max_chars and len(texto) > max_chars:
+            texto = texto[:max_chars] + "..."
+        return Paragraph(texto, est)
+
+    datos = [ENCABEZADO_REPORTE_PDF]
+    for numero, nombre, rif, monto, fecha, estado, transf, concepto in filas:
+        datos.append([
+            "{:04d}".format(numero), celda(nombre, 60), celda(rif, None), celda(format_currency(monto), None, estilo_monto),
+            fecha.strftime('%d/%m/%Y'), celda(estado, 15), celda(transf, 40), celda(concepto, 70),
+        ])
+    tabla = Table(datos, colWidths=ANCHOS_REPORTE_PDF, repeatRows=1)
+    tabla.setStyle(ESTILO_TABLA_REPORTE)
+    doc = SimpleDocTemplate(destino, pagesize=landscape(letter), leftMargin=30, rightMargin=30, topMargin=110, bottomMargin=40)
+    doc.build([tabla])
+
+
+class Command(BaseCommand):
+    help = 'Mide el reporte PDF de recibos por tramos (tiempo y memoria pico) frente a la tabla única original'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10000, 50000, 100000],
+                            help='Tamaños de reporte a medir')
+        parser.add_argument('--filas-original', type=int, default=3000,
+                            help='Tamaño para la ruta original (0 para omitirla)')
+        parser.add_argument('--semilla', type=int, default=2024)
+
+    def medir(self, generar, filas):
+        """Corre la generación en un proceso hijo para medir su memoria pico por separado."""
+        contexto = multiprocessing.get_context('fork')
+        resultados = contexto.Queue()
+
+        def ejecutar():
+            base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            inicio = time.perf_counter()
+            with tempfile.TemporaryFile() as destino:
+                generar(filas, destino)
+                tamano = destino.tell()
+            segundos = time.perf_counter() - inicio
+            pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+            resultados.put((segundos, pico / 1024, tamano / (1024 * 1024)))
+
+        proceso = contexto.Process(target=ejecutar)
+        proceso.start()
+        resultado = resultados.get()
+        proceso.join()
+        return resultado
+
+    def handle(self, *args, **options):
+        semilla = options['semilla']
+        por_tramos = lambda filas, destino: escribir_pdf_reporte(filas, 0, Decimal(0), {}, destino)
+
+        self.stdout.write('\nRESUMEN:')
+        if options['filas_original']:
+            n = options['filas_original']
+            for nombre, generar in (('Original (tabla única)', reporte_original), ('Por tramos', por_tramos)):
+                segundos, pico, tamano = self.medir(generar, filas_sinteticas(n, semilla))
+                self.stdout.write(f'- {nombre:<24} {n:>7} filas: {segundos:7.2f} s, '
+                                  f'{n / segundos:8.0f} filas/s, +{pico:7.1f} MB RSS, PDF {tamano:6.1f} MB')
+
+        for n in options['filas']:
+            segundos, pico, tamano = self.medir(por_tramos, filas_sinteticas(n, semilla))
+            self.stdout.write(f'- {"Por tramos":<24} {n:>7} filas: {segundos:7.2f} s, '
+                              f'{n / segundos:8.0f} filas/s, +{pico:7.1f} MB RSS, PDF {tamano:6.1f} MB')
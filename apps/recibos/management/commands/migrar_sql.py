@@ -1,159 +1,555 @@
+import os
 import re
+import json
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.utils.timezone import make_aware
-from django.db import transaction, IntegrityError
-from apps.recibos.models import Recibo
+from django.db import connection, transaction, IntegrityError, DatabaseError
+from apps.recibos.constants import BITS_CATEGORIAS
+from apps.recibos.models import Recibo, ConsecutivoRecibo, normalizar_estado
+from apps.recibos.resumen import ajuste_resumen_sql, descartar_filas_vacias, registrar_cambio, valores_resumen
+from apps.reportes.tareas import descartar_pregenerados
 
 User = get_user_model()
 
+ENCABEZADO_COPY = re.compile(r'^COPY public\.recibos_pago \((?P<columnas>[^)]*)\) FROM stdin;')
+# Columnas mínimas del dump (mismas posiciones que usa la carga línea a línea)
+COLUMNAS_MINIMAS_DUMP = 29
+
+# Funciones temporales (pg_temp) con la misma limpieza que clean_decimal y parse_datetime_custom
+SQL_FUNCIONES_LIMPIEZA = r"""
+CREATE FUNCTION pg_temp.limpiar_decimal(valor text) RETURNS numeric
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+        WHEN v IS NULL OR v = '' OR upper(v) = 'X' THEN 0
+        WHEN n ~ '^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$' THEN n::numeric
+        ELSE 0
+    END
+    FROM (
+        SELECT v, CASE
+            WHEN v LIKE '%,%' AND v LIKE '%.%' THEN replace(replace(v, '.', ''), ',', '.')
+            WHEN v LIKE '%,%' THEN replace(v, ',', '.')
+            ELSE v
+        END AS n
+        FROM (SELECT replace(btrim(valor), ' ', '') AS v) AS crudo
+    ) AS normalizado
+$$;
+
+CREATE FUNCTION pg_temp.fecha_legado(valor text, zona text) RETURNS timestamptz
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+    IF valor IS NULL OR btrim(valor) !~ '^\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2}(\.\d{1,6})?)?$' THEN
+        RETURN NULL;
+    END IF;
+    BEGIN
+        RETURN btrim(valor)::timestamp AT TIME ZONE zona;
+    EXCEPTION WHEN datetime_field_overflow OR invalid_datetime_format THEN
+        RETURN NULL;
+    END;
+END
+$$;
+"""
+
+COLUMNAS_CATEGORIAS = [f'categoria{i}' for i in range(1, 11)]
+# Máscara Recibo.categorias calculada en SQL con los mismos bits que BITS_CATEGORIAS
+MASCARA_CATEGORIAS_SQL = ' + '.join(
+    f'(CASE WHEN {col} THEN {BITS_CATEGORIAS[col]} ELSE 0 END)' for col in COLUMNAS_CATEGORIAS
+)
+COLUMNAS_UPSERT = [
+    'numero_recibo', 'fecha_creacion', 'usuario_id', 'anulado', 'fecha_anulacion',
+    'estado', 'nombre', 'rif_cedula_identidad', 'direccion_inmueble', 'ente_liquidado',
+    *COLUMNAS_CATEGORIAS, 'categorias',
+    'gastos_administrativos', 'tasa_dia', 'total_monto_bs',
+    'numero_transferencia', 'conciliado', 'fecha', 'concepto',
+]
+
+
+class LectorBloqueCopy:
+    """Expone como archivo (read) las líneas del bloque COPY para copy_expert, sin cargarlo en memoria."""
+
+    def __init__(self, lineas):
+        self.lineas = lineas
+        self.buffer = ''
+        self.filas = 0
+        self.terminado = False
+
+    def read(self, size=-1):
+        while not self.terminado and (size < 0 or len(self.buffer) < size):
+            linea = next(self.lineas, None)
+            if linea is None or linea.strip() == '\\.' or linea.startswith('setval'):
+                self.terminado = True
+                break
+            self.filas += 1
+            self.buffer += linea if linea.endswith('\n') else linea + '\n'
+        if size < 0:
+            size = len(self.buffer)
+        fragmento, self.buffer = self.buffer[:size], self.buffer[size:]
+        return fragmento
+
+
+def clean_decimal(value):
+    if not value or value == '\\N' or value.strip() == '' or value.strip().upper() == 'X':
+        return Decimal('0.00')
+
+    raw_val = value.strip().replace(' ', '')
+    # Si tiene punto y coma, es formato europeo/latino (1.234,56)
+    if ',' in raw_val and '.' in raw_val:
+        clean_val = raw_val.replace('.', '').replace(',', '.')
+    # Si solo tiene coma, es el decimal (73431,13)
+    elif ',' in raw_val:
+        clean_val = raw_val.replace(',', '.')
+    # Si tiene un punto y no es separador de miles (73431.13)
+    else:
+        clean_val = raw_val
+
+    try:
+        return Decimal(clean_val)
+    except (InvalidOperation, ValueError):
+        return Decimal('0.00')
+
+
+def parse_datetime_naive(value):
+    """Fecha del dump sin zona horaria (make_aware se aplica en el proceso principal)."""
+    if not value or value == '\\N' or value.strip() == '':
+        return None
+    value = value.strip()
+
+    formatos = [
+        '%Y-%m-%d %H:%M:%S.%f', # Con microsegundos
+        '%Y-%m-%d %H:%M:%S',    # Estándar
+        '%Y-%m-%d',             # Solo fecha
+    ]
+
+    for formato in formatos:
+        try:
+            return datetime.strptime(value, formato)
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def parsear_bloque(primera_linea, lineas):
+    """Limpia un bloque de líneas del COPY (se ejecuta en los procesos del pool).
+
+    Devuelve (filas, errores, segundos); cada fila trae el número de recibo, la
+    transferencia ya depurada, las fechas sin zona y los campos para update_or_create.
+    """
+    inicio = time.perf_counter()
+    filas, errores = [], []
+
+    for numero_linea, linea in enumerate(lineas, start=primera_linea):
+        cols = linea.replace('\n', '').split('\t')
+
+        # Verificación de integridad de columnas (basado en tu dump)
+        if len(cols) < COLUMNAS_MINIMAS_DUMP:
+            errores.append(f"Línea {numero_linea} incompleta (Columnas: {len(cols)})")
+            continue
+
+        try:
+            num_recibo = cols[1].strip()
+            if not num_recibo.isdigit():
+                continue
+
+            # Fechas: La clave para no fusionarlas es tomarlas crudas primero
+            dt_fecha = parse_datetime_naive(cols[22].strip())
+            anulacion_raw = cols[27].strip() if len(cols) > 27 else None
+
+            filas.append({
+                'linea': numero_linea,
+                'numero_recibo': num_recibo,
+                'numero_transferencia': re.sub(r'[^0-9]', '', cols[20]) or None,
+                'fecha_creacion': parse_datetime_naive(cols[25].strip()),
+                'fecha_anulacion': parse_datetime_naive(anulacion_raw),
+                'defaults': {
+                    'estado': normalizar_estado(cols[2]),
+                    'nombre': cols[3].strip().upper()[:255],
+                    'rif_cedula_identidad': cols[4].strip().upper(),
+                    'direccion_inmueble': cols[5].strip(),
+                    'ente_liquidado': cols[6].strip().upper(),
+                    **{f'categoria{i}': cols[6 + i].strip().lower() == 't' for i in range(1, 11)},
+                    'gastos_administrativos': clean_decimal(cols[17]),
+                    'tasa_dia': clean_decimal(cols[18]),
+                    'total_monto_bs': clean_decimal(cols[19]),
+                    'conciliado': cols[21].strip().upper() == 'SI',
+                    'fecha': dt_fecha.date() if dt_fecha else None,
+                    'concepto': cols[23].strip(),
+                    'anulado': cols[26].lower() == 't',
+                },
+            })
+        except Exception as e:
+            errores.append(f"Error en Recibo {cols[1]}: {str(e)}")
+
+    return filas, errores, time.perf_counter() - inicio
+
+
+def bloques_del_dump(archivo, tamano_bloque):
+    """Recorre el bloque COPY de recibos_pago y lo entrega en trozos (indice, primera_linea, lineas)."""
+    en_bloque = False
+    lineas, indice, total = [], 0, 0
+    for linea in archivo:
+        if not en_bloque:
+            en_bloque = 'COPY public.recibos_pago' in linea
+            continue
+        if linea.strip() == '\\.' or linea.startswith('setval'):
+            break
+        lineas.append(linea)
+        total += 1
+        if len(lineas) == tamano_bloque:
+            yield indice, total - len(lineas) + 1, lineas
+            lineas, indice = [], indice + 1
+    if lineas:
+        yield indice, total - len(lineas) + 1, lineas
+
+
 class Command(BaseCommand):
     help = 'Migración de Recibos: Integridad Total y Carga sin Pérdida'
 
     def add_arguments(self, parser):
         parser.add_argument('sql_file', type=str, help='Ruta al archivo .sql')
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Carga rápida (solo PostgreSQL): COPY a tabla temporal y upsert por conjuntos'
+        )
+        parser.add_argument('--tamano-bloque', type=int, default=2000, help='Líneas por bloque (una transacción por bloque)')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos para el parseo')
+        parser.add_argument('--checkpoint', type=str, help='Archivo de avance (por defecto: <sql_file>.checkpoint.json)')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignora el checkpoint y comienza desde el inicio')
 
     def clean_decimal(self, value):
-        if not value or value == '\\N' or value.strip() == '' or value.strip().upper() == 'X':
-            return Decimal('0.00')
-        
-        raw_val = value.strip().replace(' ', '')
-        # Si tiene punto y coma, es formato europeo/latino (1.234,56)
-        if ',' in raw_val and '.' in raw_val:
-            clean_val = raw_val.replace('.', '').replace(',', '.')
-        # Si solo tiene coma, es el decimal (73431,13)
-        elif ',' in raw_val:
-            clean_val = raw_val.replace(',', '.')
-        # Si tiene un punto y no es separador de miles (73431.13)
-        else:
-            clean_val = raw_val
-
-        try:
-            return Decimal(clean_val)
-        except (InvalidOperation, ValueError):
-            return Decimal('0.00')
+        return clean_decimal(value)
 
     def parse_datetime_custom(self, value):
-        if not value or value == '\\N' or value.strip() == '':
-            return None
-        value = value.strip()
-        
-        formatos = [
-            '%Y-%m-%d %H:%M:%S.%f', # Con microsegundos
-            '%Y-%m-%d %H:%M:%S',    # Estándar
-            '%Y-%m-%d',             # Solo fecha
-        ]
-        
-        for formato in formatos:
-            try:
-                dt = datetime.strptime(value, formato)
-                return make_aware(dt)
-            except (ValueError, TypeError):
-                continue
-        return None
+        dt = parse_datetime_naive(value)
+        return make_aware(dt) if dt else None
 
-    def handle(self, *args, **options):
-        admin_user = User.objects.filter(is_superuser=True).first()
-        self.stdout.write(self.style.WARNING('>>> Iniciando carga de integridad total...'))
-        
-        total_lineas = 0
-        exitos = 0
-        errores = 0
-        en_bloque = False
-
-        with open(options['sql_file'], 'r', encoding='utf-8') as f:
-            for linea in f:
-                if 'COPY public.recibos_pago' in linea:
-                    en_bloque = True
-                    continue
-                if en_bloque and (linea.strip() == '\\.' or linea.startswith('setval')):
-                    en_bloque = False
-                    break
-                
-                if en_bloque:
-                    total_lineas += 1
-                    cols = linea.replace('\n', '').split('\t')
-                    
-                    # Verificación de integridad de columnas (basado en tu dump)
-                    if len(cols) < 29:
-                        self.stdout.write(self.style.ERROR(f"Línea {total_lineas} incompleta (Columnas: {len(cols)})"))
-                        errores += 1
-                        continue
+    # --- Checkpoint: bloques confirmados en BD, para retomar tras un fallo ---
+
+    def identidad_dump(self, sql_file, tamano_bloque):
+        stat = os.stat(sql_file)
+        return {
+            'archivo': os.path.abspath(sql_file), 'tamano_archivo': stat.st_size,
+            'modificado': int(stat.st_mtime), 'tamano_bloque': tamano_bloque,
+        }
+
+    def leer_checkpoint(self, ruta, identidad):
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('identidad') != identidad:
+            raise CommandError(
+                f'El checkpoint {ruta} corresponde a otro archivo o tamaño de bloque. '
+                f'Use --reiniciar para descartarlo.'
+            )
+        return checkpoint
 
-                    try:
-                        # --- EXTRACCIÓN DE DATOS ---
-                        num_recibo = cols[1].strip()
-                        if not num_recibo.isdigit():
-                            continue
-                        
-                        # Fechas: La clave para no fusionarlas es tomarlas crudas primero
-                        fecha_raw = cols[22].strip() # fecha
-                        creacion_raw = cols[25].strip() # fecha_creacion
-                        anulacion_raw = cols[27].strip() if len(cols) > 27 else None
-
-                        dt_fecha = self.parse_datetime_custom(fecha_raw)
-                        dt_creacion = self.parse_datetime_custom(creacion_raw)
-                        dt_anulacion = self.parse_datetime_custom(anulacion_raw)
+    def guardar_checkpoint(self, ruta, checkpoint):
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(temporal, ruta)
 
+    def guardar_bloque(self, filas, admin_user):
+        """Escribe un bloque en su propia transacción; cada fila en un savepoint para aislar errores."""
+        exitos, errores = 0, []
+        with transaction.atomic():
+            for fila in filas:
+                num_recibo = fila['numero_recibo']
+                try:
+                    with transaction.atomic():
                         # Transferencia con sufijo para evitar colisiones de unicidad
-                        num_transf = re.sub(r'[^0-9]', '', cols[20])
+                        num_transf = fila['numero_transferencia']
                         if num_transf:
                             if Recibo.objects.filter(numero_transferencia=num_transf).exclude(numero_recibo=num_recibo).exists():
                                 num_transf = f"{num_transf}-{num_recibo}"
-                        else:
-                            num_transf = None
 
-                        # --- GUARDADO ---
-                        # Usamos update_or_create para no duplicar si el script corre dos veces
+                        # Usamos update_or_create para no duplicar si el script corre dos veces.
+                        # Pasa por Recibo.save(): la máscara categorias se recalcula y se guarda con los booleanos
                         obj, created = Recibo.objects.update_or_create(
                             numero_recibo=num_recibo,
                             defaults={
-                                'estado': cols[2].strip().upper(),
-                                'nombre': cols[3].strip().upper()[:255],
-                                'rif_cedula_identidad': cols[4].strip().upper(),
-                                'direccion_inmueble': cols[5].strip(),
-                                'ente_liquidado': cols[6].strip().upper(),
-                                'categoria1': cols[7].strip().lower() == 't',
-                                'categoria2': cols[8].strip().lower() == 't',
-                                'categoria3': cols[9].strip().lower() == 't',
-                                'categoria4': cols[10].strip().lower() == 't',
-                                'categoria5': cols[11].strip().lower() == 't',
-                                'categoria6': cols[12].strip().lower() == 't',
-                                'categoria7': cols[13].strip().lower() == 't',
-                                'categoria8': cols[14].strip().lower() == 't',
-                                'categoria9': cols[15].strip().lower() == 't',
-                                'categoria10': cols[16].strip().lower() == 't',
-                                'gastos_administrativos': self.clean_decimal(cols[17]),
-                                'tasa_dia': self.clean_decimal(cols[18]),
-                                'total_monto_bs': self.clean_decimal(cols[19]),
+                                **fila['defaults'],
                                 'numero_transferencia': num_transf,
-                                'conciliado': cols[21].strip().upper() == 'SI',
-                                'fecha': dt_fecha.date() if dt_fecha else None,
-                                'concepto': cols[23].strip(),
                                 'usuario': admin_user,
-                                'anulado': cols[26].lower() == 't',
-                                'fecha_anulacion': dt_anulacion,
+                                'fecha_anulacion': make_aware(fila['fecha_anulacion']) if fila['fecha_anulacion'] else None,
                             }
                         )
 
                         # Forzar fecha de creación histórica (evita que Django ponga 'hoy')
-                        if dt_creacion:
-                            Recibo.objects.filter(pk=obj.pk).update(fecha_creacion=dt_creacion)
-                        
-                        exitos += 1
+                        if fila['fecha_creacion']:
+                            anterior = valores_resumen(obj)
+                            obj.fecha_creacion = make_aware(fila['fecha_creacion'])
+                            Recibo.objects.filter(pk=obj.pk).update(fecha_creacion=obj.fecha_creacion)
+                            # update() no pasa por las señales: el recibo cambia de día en el resumen
+                            registrar_cambio(anterior, obj)
+                    exitos += 1
+                except Exception as e:
+                    errores.append(f"Error en Recibo {num_recibo} (línea {fila['linea']}): {str(e)}")
+        return exitos, errores
+
+    def handle(self, *args, **options):
+        admin_user = User.objects.filter(is_superuser=True).first()
+        if options['copy']:
+            return self.cargar_con_copy(options['sql_file'], admin_user)
+        self.stdout.write(self.style.WARNING('>>> Iniciando carga de integridad total...'))
+
+        sql_file = options['sql_file']
+        tamano_bloque = max(1, options['tamano_bloque'])
+        procesos = max(1, options['procesos'])
+        ruta_checkpoint = options['checkpoint'] or f'{sql_file}.checkpoint.json'
+        identidad = self.identidad_dump(sql_file, tamano_bloque)
 
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f"Error en Recibo {cols[1]}: {str(e)}"))
-                        errores += 1
+        checkpoint = None if options['reiniciar'] else self.leer_checkpoint(ruta_checkpoint, identidad)
+        if checkpoint is None:
+            checkpoint = {'identidad': identidad, 'bloques_confirmados': 0, 'lineas': 0, 'exitos': 0, 'errores': 0}
+        elif checkpoint['bloques_confirmados']:
+            self.stdout.write(self.style.WARNING(
+                f">>> Retomando desde el bloque {checkpoint['bloques_confirmados']} "
+                f"({checkpoint['lineas']} líneas ya confirmadas)."
+            ))
+        saltar = checkpoint['bloques_confirmados']
 
-                    if total_lineas % 500 == 0:
-                        self.stdout.write(f">>> Procesadas {total_lineas} líneas...")
+        # Tiempos por fase: lectura del archivo, parseo (suma de los procesos) y escritura en BD
+        tiempos = {'lectura': 0.0, 'parseo': 0.0, 'escritura': 0.0}
+        lineas_sesion = 0
+        inicio_total = time.perf_counter()
+
+        # Las conexiones abiertas no deben heredarse en los procesos del pool
+        connection.close()
+        pool = ProcessPoolExecutor(max_workers=procesos) if procesos > 1 else None
+        en_curso = deque()
+
+        def enviar(primera_linea, lineas):
+            if pool:
+                return pool.submit(parsear_bloque, primera_linea, lineas)
+            futuro = Future()
+            futuro.set_result(parsear_bloque(primera_linea, lineas))
+            return futuro
+
+        def confirmar_siguiente():
+            nonlocal lineas_sesion
+            indice, total_bloque, futuro = en_curso.popleft()
+            filas, errores_parseo, segundos_parseo = futuro.result()
+            tiempos['parseo'] += segundos_parseo
+
+            inicio = time.perf_counter()
+            exitos, errores_guardado = self.guardar_bloque(filas, admin_user)
+            segundos_escritura = time.perf_counter() - inicio
+            tiempos['escritura'] += segundos_escritura
+
+            for mensaje in errores_parseo + errores_guardado:
+                self.stdout.write(self.style.ERROR(mensaje))
+
+            checkpoint['bloques_confirmados'] = indice + 1
+            checkpoint['lineas'] += total_bloque
+            checkpoint['exitos'] += exitos
+            checkpoint['errores'] += len(errores_parseo) + len(errores_guardado)
+            self.guardar_checkpoint(ruta_checkpoint, checkpoint)
+            lineas_sesion += total_bloque
+
+            self.stdout.write(
+                f">>> Bloque {indice + 1}: {checkpoint['lineas']} líneas confirmadas "
+                f"(parseo {total_bloque / segundos_parseo if segundos_parseo else 0:,.0f} filas/s, "
+                f"escritura {total_bloque / segundos_escritura if segundos_escritura else 0:,.0f} filas/s)"
+            )
+
+        try:
+            with open(sql_file, 'r', encoding='utf-8') as f:
+                bloques = bloques_del_dump(f, tamano_bloque)
+                while True:
+                    inicio = time.perf_counter()
+                    siguiente = next(bloques, None)
+                    tiempos['lectura'] += time.perf_counter() - inicio
+                    if siguiente is None:
+                        break
+                    indice, primera_linea, lineas = siguiente
+                    if indice < saltar:
+                        continue
+
+                    en_curso.append((indice, len(lineas), enviar(primera_linea, lineas)))
+                    # Ventana acotada: parseo adelantado sin acumular el archivo en memoria
+                    if len(en_curso) > procesos * 2:
+                        confirmar_siguiente()
+                while en_curso:
+                    confirmar_siguiente()
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        # Los números vienen del sistema anterior: el contador debe quedar por encima del mayor
+        ConsecutivoRecibo.sincronizar()
+        descartar_filas_vacias()
+        # Las fechas de legado no delatan la carga: los reportes pre-generados quedan viejos
+        descartar_pregenerados('recibos_')
+        if os.path.exists(ruta_checkpoint):
+            os.remove(ruta_checkpoint)
+
+        total = time.perf_counter() - inicio_total
+
+        def tasa(segundos):
+            return f'{lineas_sesion / segundos:,.0f} filas/s' if segundos else '-'
 
         self.stdout.write(self.style.SUCCESS(
             f'\nRESUMEN FINAL:\n'
-            f'- Líneas leídas: {total_lineas}\n'
-            f'- Éxitos: {exitos}\n'
-            f'- Errores: {errores}'
-        ))
\ No newline at end of file
+            f'- Líneas leídas: {checkpoint["lineas"]}\n'
+            f'- Éxitos: {checkpoint["exitos"]}\n'
+            f'- Errores: {checkpoint["errores"]}\n'
+            f'- Lectura: {tiempos["lectura"]:.2f} s ({tasa(tiempos["lectura"])})\n'
+            f'- Parseo ({procesos} proceso(s), CPU acumulada): {tiempos["parseo"]:.2f} s ({tasa(tiempos["parseo"])} por proceso)\n'
+            f'- Escritura: {tiempos["escritura"]:.2f} s ({tasa(tiempos["escritura"])})\n'
+            f'- Total: {total:.2f} s ({tasa(total)})'
+        ))
+
+    def fase(self, nombre, inicio, filas=None):
+        duracion = time.perf_counter() - inicio
+        detalle = f' ({filas} filas, {filas / duracion:,.0f} filas/s)' if filas and duracion else ''
+        self.stdout.write(f'>>> {nombre}: {duracion:.2f} s{detalle}')
+        return time.perf_counter()
+
+    def cargar_con_copy(self, sql_file, admin_user):
+        """Modo rápido: el bloque COPY del dump va tal cual a una tabla temporal y se
+        limpia, deduplica e inserta/actualiza en recibos_pago con unas pocas sentencias."""
+        if connection.vendor != 'postgresql':
+            raise CommandError('El modo --copy requiere PostgreSQL.')
+
+        self.stdout.write(self.style.WARNING('>>> Iniciando carga rápida (COPY)...'))
+        zona = settings.TIME_ZONE
+        columnas_upsert = ', '.join(COLUMNAS_UPSERT)
+        actualizar = ', '.join(
+            f'{col} = EXCLUDED.{col}' for col in COLUMNAS_UPSERT if col not in ('numero_recibo', 'fecha_creacion')
+        )
+
+        with open(sql_file, 'r', encoding='utf-8') as f:
+            lineas = iter(f)
+            encabezado = next((ENCABEZADO_COPY.match(l) for l in lineas if 'COPY public.recibos_pago' in l), None)
+            if not encabezado:
+                raise CommandError('No se encontró el bloque "COPY public.recibos_pago ... FROM stdin;" en el archivo.')
+            total_columnas = len(encabezado.group('columnas').split(','))
+            if total_columnas < COLUMNAS_MINIMAS_DUMP:
+                raise CommandError(f'El dump tiene {total_columnas} columnas; se esperaban al menos {COLUMNAS_MINIMAS_DUMP}.')
+            columnas_crudas = [f'c{i}' for i in range(total_columnas)]
+
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    inicio = time.perf_counter()
+                    cursor.execute(SQL_FUNCIONES_LIMPIEZA)
+                    cursor.execute(
+                        f"CREATE TEMP TABLE migracion_recibos_crudo (linea bigserial, "
+                        f"{', '.join(f'{c} text' for c in columnas_crudas)}) ON COMMIT DROP"
+                    )
+                    lector = LectorBloqueCopy(lineas)
+                    cursor.copy_expert(
+                        f"COPY migracion_recibos_crudo ({', '.join(columnas_crudas)}) FROM STDIN", lector
+                    )
+                    inicio = self.fase('COPY a tabla temporal', inicio, lector.filas)
+
+                    # Limpieza por conjuntos; un mismo numero_recibo repetido conserva la última línea
+                    categorias = ', '.join(
+                        f"coalesce(lower(btrim(c{7 + i})) = 't', false) AS {col}"
+                        for i, col in enumerate(COLUMNAS_CATEGORIAS)
+                    )
+                    cursor.execute(f"""
+                        CREATE TEMP TABLE migracion_recibos_limpio ON COMMIT DROP AS
+                        SELECT DISTINCT ON (numero_recibo) * FROM (
+                            SELECT linea,
+                                   btrim(c1)::integer AS numero_recibo,
+                                   coalesce(upper(btrim(c2)), '') AS estado,
+                                   coalesce(left(upper(btrim(c3)), 255), '') AS nombre,
+                                   coalesce(upper(btrim(c4)), '') AS rif_cedula_identidad,
+                                   coalesce(btrim(c5), '') AS direccion_inmueble,
+                                   coalesce(upper(btrim(c6)), '') AS ente_liquidado,
+                                   {categorias},
+                                   pg_temp.limpiar_decimal(c17) AS gastos_administrativos,
+                                   pg_temp.limpiar_decimal(c18) AS tasa_dia,
+                                   pg_temp.limpiar_decimal(c19) AS total_monto_bs,
+                                   nullif(regexp_replace(coalesce(c20, ''), '[^0-9]', '', 'g'), '') AS numero_transferencia,
+                                   coalesce(upper(btrim(c21)) = 'SI', false) AS conciliado,
+                                   (pg_temp.fecha_legado(c22, %s) AT TIME ZONE %s)::date AS fecha,
+                                   coalesce(btrim(c23), '') AS concepto,
+                                   pg_temp.fecha_legado(c25, %s) AS fecha_creacion,
+                                   coalesce(lower(c26) = 't', false) AS anulado,
+                                   pg_temp.fecha_legado(c27, %s) AS fecha_anulacion
+                            FROM migracion_recibos_crudo
+                            WHERE btrim(c1) ~ '^[0-9]+$'
+                        ) AS filas
+                        ORDER BY numero_recibo, linea DESC
+                    """, [zona, zona, zona, zona])
+                    cursor.execute("SELECT count(*) FROM migracion_recibos_crudo WHERE btrim(c1) !~ '^[0-9]+$' OR c1 IS NULL")
+                    omitidas = cursor.fetchone()[0]
+                    cursor.execute("DELETE FROM migracion_recibos_limpio WHERE fecha IS NULL")
+                    sin_fecha = cursor.rowcount
+                    cursor.execute("CREATE INDEX ON migracion_recibos_limpio (numero_transferencia)")
+                    cursor.execute("ANALYZE migracion_recibos_limpio")
+                    inicio = self.fase('Limpieza y deduplicación', inicio, lector.filas)
+
+                    # Transferencias en colisión (repetidas en el dump o ya usadas por otro recibo): sufijo -numero
+                    cursor.execute("""
+                        UPDATE migracion_recibos_limpio AS l
+                        SET numero_transferencia = l.numero_transferencia || '-' || l.numero_recibo
+                        WHERE l.numero_transferencia IS NOT NULL AND (
+                            EXISTS (
+                                SELECT 1 FROM migracion_recibos_limpio AS o
+                                WHERE o.numero_transferencia = l.numero_transferencia AND o.linea < l.linea
+                            )
+                            OR EXISTS (
+                                SELECT 1 FROM recibos_pago AS r
+                                WHERE r.numero_transferencia = l.numero_transferencia
+                                  AND r.numero_recibo IS DISTINCT FROM l.numero_recibo
+                            )
+                        )
+                    """)
+                    colisiones = cursor.rowcount
+                    inicio = self.fase('Resolución de transferencias', inicio)
+
+                    # Resumen diario: se restan las versiones actuales de los recibos que se van a sobrescribir
+                    ajuste_resumen_sql(cursor, 'migracion_recibos_limpio', -1)
+
+                    # Upsert en una sola pasada. now() es constante dentro de la transacción: identifica
+                    # las filas sin fecha de creación histórica, que conservan la existente al actualizar.
+                    cursor.execute(f"""
+                        WITH upsert AS (
+                            INSERT INTO recibos_pago ({columnas_upsert})
+                            SELECT numero_recibo, coalesce(fecha_creacion, now()), %s, anulado, fecha_anulacion,
+                                   estado, nombre, rif_cedula_identidad, direccion_inmueble, ente_liquidado,
+                                   {', '.join(COLUMNAS_CATEGORIAS)}, {MASCARA_CATEGORIAS_SQL},
+                                   gastos_administrativos, tasa_dia, total_monto_bs,
+                                   numero_transferencia, conciliado, fecha, concepto
+                            FROM migracion_recibos_limpio
+                            ORDER BY numero_recibo
+                            ON CONFLICT (numero_recibo) DO UPDATE SET {actualizar},
+                                fecha_creacion = CASE WHEN EXCLUDED.fecha_creacion = now()
+                                                      THEN recibos_pago.fecha_creacion
+                                                      ELSE EXCLUDED.fecha_creacion END
+                            RETURNING (xmax = 0) AS insertado
+                        )
+                        SELECT count(*) FILTER (WHERE insertado), count(*) FILTER (WHERE NOT insertado) FROM upsert
+                    """, [admin_user.pk if admin_user else None])
+                    insertados, actualizados = cursor.fetchone()
+                    inicio = self.fase('Upsert en recibos_pago', inicio, insertados + actualizados)
+
+                    ConsecutivoRecibo.sincronizar()
+                    # upper() de SQL no quita acentos: se unifican con la forma de la aplicación
+                    Recibo.normalizar_estados()
+                    # ...y se suman las nuevas, ya con el estado normalizado
+                    ajuste_resumen_sql(cursor, 'migracion_recibos_limpio', 1)
+                    descartar_filas_vacias()
+                    self.fase('Resumen diario', inicio)
+                    descartar_pregenerados('recibos_')
+            except DatabaseError as e:
+                raise CommandError(f'Carga COPY revertida: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nRESUMEN FINAL (COPY):\n'
+            f'- Líneas leídas: {lector.filas}\n'
+            f'- Insertados: {insertados}\n'
+            f'- Actualizados: {actualizados}\n'
+            f'- Transferencias con sufijo: {colisiones}\n'
+            f'- Omitidas (número no válido): {omitidas}\n'
+            f'- Errores (sin fecha válida): {sin_fecha}'
+        ))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.recibos.tareas import procesar_pendientes
+
+
+class Command(BaseCommand):
+    """Worker de importaciones. Debe quedar corriendo bajo un supervisor (systemd, supervisord)
+    o ejecutarse con --una-vez desde cron cada pocos minutos, aun con
+    RECIBOS_IMPORTACION_EN_PROCESO = True: es lo que retoma las importaciones que quedaron
+    PENDIENTES o PROCESANDO cuando se reinició el servidor (ver tareas.reclamar_vencidas).
+    """
+    help = ('Worker de importaciones de recibos: procesa las cargas de Excel PENDIENTES y reintenta '
+            'las interrumpidas. Debe correr bajo un supervisor o desde cron (--una-vez).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre consultas')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('>>> Worker de importaciones iniciado.'))
+        while True:
+            procesadas = procesar_pendientes()
+            if procesadas:
+                self.stdout.write(self.style.SUCCESS(f'Importaciones procesadas: {procesadas}'))
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,91 @@
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils.dateparse import parse_date
+from apps.recibos.filtros import ZONA_RECIBOS, inicio_del_dia, rango_dia
+from apps.recibos.models import Recibo, ResumenDiario
+from apps.recibos.resumen import descartar_filas_vacias, reconstruir_resumen
+
+
+def fecha_argumento(valor):
+    try:
+        fecha = parse_date(valor) if valor else None
+    except ValueError:
+        fecha = None
+    if valor and fecha is None:
+        raise CommandError(f'Fecha no válida: {valor} (se espera AAAA-MM-DD)')
+    return fecha
+
+
+def centimos(monto):
+    return Decimal(monto or 0).quantize(Decimal('0.01'))
+
+
+class Command(BaseCommand):
+    """Programar cada noche (cron) con --solo-vacias: las filas que las anulaciones y los
+    borrados dejan en cero sólo se eliminan aquí.
+    """
+    help = 'Recalcula el resumen diario de recibos (recibos_resumen_diario) de un rango de días'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=str, help='Primer día (AAAA-MM-DD); por defecto, el primero con recibos')
+        parser.add_argument('--hasta', type=str, help='Último día (AAAA-MM-DD); por defecto, el último con recibos')
+        parser.add_argument('--verificar', action='store_true',
+                            help='Sólo compara el resumen con recibos_pago y lista los días con diferencias')
+        parser.add_argument('--solo-vacias', action='store_true',
+                            help='Sólo elimina las filas del resumen que quedaron en cero (limpieza nocturna)')
+
+    def handle(self, *args, **options):
+        desde, hasta = fecha_argumento(options['desde']), fecha_argumento(options['hasta'])
+        if desde and hasta and desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta.')
+
+        if options['verificar']:
+            return self.verificar(desde, hasta)
+        if options['solo_vacias']:
+            self.stdout.write(self.style.SUCCESS(f'Filas vacías eliminadas: {descartar_filas_vacias()}'))
+            return
+
+        inicio = time.perf_counter()
+        filas, vacias = reconstruir_resumen(desde, hasta)
+        rango = f"{desde or 'el inicio'} a {hasta or 'el final'}"
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen reconstruido de {rango}: {filas} filas en {time.perf_counter() - inicio:.2f} s '
+            f'({vacias} filas vacías eliminadas)'
+        ))
+
+    def verificar(self, desde, hasta):
+        recibos = Recibo.objects.filter(anulado=False)
+        resumen = ResumenDiario.objects.all()
+        if desde:
+            recibos = recibos.filter(fecha_creacion__gte=inicio_del_dia(desde))
+            resumen = resumen.filter(dia__gte=desde)
+        if hasta:
+            recibos = recibos.filter(fecha_creacion__lt=rango_dia(hasta)[1])
+            resumen = resumen.filter(dia__lte=hasta)
+
+        reales = {
+            fila['dia']: (fila['total'], centimos(fila['monto']))
+            for fila in recibos.annotate(dia=TruncDate('fecha_creacion', tzinfo=ZONA_RECIBOS))
+            .values('dia').annotate(total=Count('pk'), monto=Sum('total_monto_bs')).order_by()
+        }
+        resumidos = {
+            fila['dia']: (fila['cantidad'], centimos(fila['suma']))
+            for fila in resumen.values('dia').annotate(cantidad=Sum('total'), suma=Sum('monto')).order_by()
+        }
+
+        diferencias = [
+            dia for dia in sorted(set(reales) | set(resumidos))
+            if reales.get(dia, (0, 0)) != resumidos.get(dia, (0, 0))
+        ]
+        for dia in diferencias:
+            self.stdout.write(self.style.ERROR(
+                f'{dia}: recibos {reales.get(dia, (0, 0))} / resumen {resumidos.get(dia, (0, 0))}'
+            ))
+        if diferencias:
+            raise CommandError(
+                f'{len(diferencias)} día(s) con diferencias; corríjalos con --desde {diferencias[0]} --hasta {diferencias[-1]}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Resumen al día: {len(reales)} día(s) verificados.'))
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.recibos.busqueda import q_exacta
+from apps.recibos.filtros import FiltroRecibos
+from apps.recibos.models import Recibo
+from apps.recibos.paginacion import condicion_cursor
+
+
+def casos(hoy):
+    """(nombre, condición, columna que debe resolverse por índice)."""
+    por_filtro = [
+        ('Rango de fechas', {'fecha_inicio': (hoy - timedelta(days=30)).isoformat(), 'fecha_fin': hoy.isoformat()}, 'fecha_creacion'),
+        ('Desde una fecha', {'fecha_inicio': hoy.isoformat()}, 'fecha_creacion'),
+        ('Estado', {'estado': 'Mérida'}, 'estado'),
+        ('Rango de números', {'numero_desde': '1000', 'numero_hasta': '2000'}, 'numero_recibo'),
+        ('Lote de importación', {'lote': '1'}, 'importacion_id'),
+        # Índices parciales por bit: la condición está en el índice, el plan lo nombra (recibos_pago_categoriaN)
+        ('Categorías (bits)', {'categoria2': 'on', 'categoria5': 'on'}, 'recibos_pago_categoria'),
+        ('Búsqueda por nombre (trigramas)', {'q': 'perez', 'field': 'nombre'}, 'nombre'),
+        ('Búsqueda por RIF (trigramas)', {'q': '12345', 'field': 'rif_cedula_identidad'}, 'rif_cedula_identidad'),
+    ]
+    # La búsqueda exacta sólo se elige si encuentra algo: se verifica su condición directamente
+    busqueda_exacta = [
+        ('Búsqueda exacta por número', q_exacta('905039'), 'numero_recibo'),
+        ('Búsqueda exacta por RIF', q_exacta('V-12.345.678'), 'rif_cedula_identidad'),
+        ('Búsqueda exacta por referencia', q_exacta('REF-2024-001'), 'numero_transferencia'),
+    ]
+    # Página intermedia de los listados paginados por cursor
+    cursores = [
+        ('Página por cursor (listado)', condicion_cursor('fecha_creacion', 'id', timezone.now(), 1000, True), 'fecha_creacion'),
+        ('Página por cursor (anulados)', condicion_cursor('fecha_anulacion', 'id', timezone.now(), 1000, True), 'fecha_anulacion'),
+    ]
+    return [(nombre, FiltroRecibos(p).q(), columna) for nombre, p, columna in por_filtro] + busqueda_exacta + cursores
+
+
+def usa_indice(plan, columna):
+    """True si alguna línea del plan resuelve `columna` con un índice (no sólo la filtra).
+
+    `columna` también puede ser el prefijo del nombre de un índice parcial, cuya condición
+    no aparece como Index Cond.
+    """
+    for linea in plan.splitlines():
+        if connection.vendor == 'postgresql':
+            if ('Index Cond:' in linea or 'Recheck Cond:' in linea) and columna in linea:
+                return True
+            if 'Index' in linea and (f' on {columna}' in linea or f' using {columna}' in linea):
+                return True
+        elif 'USING' in linea and 'INDEX' in linea and '(' in linea:
+            if columna in linea[linea.index('(', linea.index('INDEX')):]:
+                return True
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Verifica con EXPLAIN que los filtros y la búsqueda de recibos usan los índices de recibos_pago'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comparar', action='store_true',
+                            help='Muestra también el plan de la forma anterior (__date / iexact)')
+
+    def explicar(self, queryset):
+        # En PostgreSQL se penaliza el seq scan: con tablas chicas el planificador lo preferiría
+        # aunque el predicado admita índice, y lo que se verifica es que lo admita.
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        fallos = []
+        for nombre, condicion, columna in casos(hoy):
+            queryset = Recibo.objects.filter(anulado=False).filter(condicion)
+            plan = self.explicar(queryset.values('pk'))
+            correcto = usa_indice(plan, columna)
+            estilo = self.style.SUCCESS if correcto else self.style.ERROR
+            self.stdout.write(estilo(f"{'OK   ' if correcto else 'FALLA'} {nombre} ({columna})"))
+            self.stdout.write('      ' + plan.replace('\n', '\n      '))
+            if not correcto:
+                fallos.append(nombre)
+
+        if options['comparar']:
+            anteriores = [
+                ('Rango de fechas (__date)', {'fecha_creacion__date__gte': hoy - timedelta(days=30),
+                                              'fecha_creacion__date__lte': hoy}, 'fecha_creacion'),
+                ('Estado (iexact)', {'estado__iexact': 'merida'}, 'estado'),
+            ]
+            self.stdout.write('\nFORMA ANTERIOR:')
+            for nombre, filtros, columna in anteriores:
+                plan = self.explicar(Recibo.objects.filter(anulado=False, **filtros).values('pk'))
+                self.stdout.write(f"{'índice' if usa_indice(plan, columna) else 'sin índice'}: {nombre}")
+                self.stdout.write('      ' + plan.replace('\n', '\n      '))
+
+        if fallos and connection.vendor != 'postgresql':
+            # Django escribe anulado=False como NOT anulado: PostgreSQL lo usa como condición
+            # de índice, SQLite no, y el índice compuesto que empieza por anulado queda en SCAN.
+            # Los índices de trigramas (pg_trgm) sólo existen en PostgreSQL.
+            self.stdout.write(self.style.WARNING(
+                f"\nLa verificación está pensada para PostgreSQL; en {connection.vendor} es sólo informativa."
+            ))
+        elif fallos:
+            raise CommandError(f"Filtros sin índice: {', '.join(fallos)}")
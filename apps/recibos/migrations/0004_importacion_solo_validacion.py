@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0003_importacionrecibos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacionrecibos',
+            name='solo_validacion',
+            field=models.BooleanField(default=False),
+        ),
+    ]
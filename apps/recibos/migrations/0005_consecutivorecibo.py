@@ -0,0 +1,35 @@
+# Generated by Django 6.0 on 2026-10-18 03:40
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def inicializar_consecutivo(apps, schema_editor):
+    Recibo = apps.get_model('recibos', 'Recibo')
+    ConsecutivoRecibo = apps.get_model('recibos', 'ConsecutivoRecibo')
+    maximo = Recibo.objects.aggregate(Max('numero_recibo'))['numero_recibo__max'] or 0
+    ConsecutivoRecibo.objects.update_or_create(serie='recibos', defaults={'ultimo_numero': maximo})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0004_importacion_solo_validacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsecutivoRecibo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie', models.CharField(default='recibos', max_length=50, unique=True)),
+                ('ultimo_numero', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Consecutivo de Recibos',
+                'verbose_name_plural': 'Consecutivos de Recibos',
+                'db_table': 'recibos_consecutivo',
+            },
+        ),
+        migrations.RunPython(inicializar_consecutivo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def vincular_recibos_importados(apps, schema_editor):
+    """Pasa los PKs guardados en cada importación al nuevo vínculo recibo -> importación."""
+    Recibo = apps.get_model('recibos', 'Recibo')
+    ImportacionRecibos = apps.get_model('recibos', 'ImportacionRecibos')
+    for importacion in ImportacionRecibos.objects.exclude(recibos_pks=[]).only('pk', 'recibos_pks').iterator():
+        pks = importacion.recibos_pks or []
+        for inicio in range(0, len(pks), 1000):
+            Recibo.objects.filter(pk__in=pks[inicio:inicio + 1000]).update(importacion_id=importacion.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0005_consecutivorecibo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='importacion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recibos', to='recibos.importacionrecibos', verbose_name='Importación'),
+        ),
+        migrations.RunPython(vincular_recibos_importados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 04:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0006_recibo_importacion'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='importacionrecibos',
+            name='recibos_pks',
+        ),
+    ]
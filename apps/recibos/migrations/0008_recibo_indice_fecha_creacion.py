@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 05:20
+
+from django.db import migrations, models
+from unidecode import unidecode
+
+
+def normalizar_estados(apps, schema_editor):
+    """Deja los estados en la forma que comparan los filtros: sin acentos y en mayúsculas."""
+    Recibo = apps.get_model('recibos', 'Recibo')
+    for estado in list(Recibo.objects.values_list('estado', flat=True).distinct()):
+        normalizado = unidecode(estado or '').strip().upper()
+        if normalizado != estado:
+            Recibo.objects.filter(estado=estado).update(estado=normalizado)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0007_remove_importacionrecibos_recibos_pks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['anulado', '-fecha_creacion', '-numero_recibo'], name='recibos_pag_anulado_515f6a_idx'),
+        ),
+        migrations.RunPython(normalizar_estados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 06:05
+
+from django.db import migrations
+
+# (índice, columna): GIN de trigramas sobre UPPER(columna), la expresión que compara icontains
+INDICES_TRIGRAMAS = [
+    ('recibos_pago_nombre_trgm', 'nombre'),
+    ('recibos_pago_rif_trgm', 'rif_cedula_identidad'),
+    ('recibos_pago_transferencia_trgm', 'numero_transferencia'),
+    ('recibos_pago_estado_trgm', 'estado'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for indice, columna in INDICES_TRIGRAMAS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {indice} ON recibos_pago USING gin (UPPER({columna}) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for indice, _ in INDICES_TRIGRAMAS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {indice}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0008_recibo_indice_fecha_creacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0009_recibo_indices_trigramas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['anulado', '-fecha_anulacion', '-numero_recibo'], name='recibos_pag_anulado_a19f9e_idx'),
+        ),
+    ]
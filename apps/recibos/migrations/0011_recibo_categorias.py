@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 07:30
+
+from functools import reduce
+from operator import add
+from django.db import migrations, models
+
+
+def calcular_categorias(apps, schema_editor):
+    """Llena la máscara desde los booleanos en un solo UPDATE (categoriaN -> bit N-1)."""
+    Recibo = apps.get_model('recibos', 'Recibo')
+    bits = [
+        models.Case(models.When(**{f'categoria{i}': True}, then=models.Value(1 << (i - 1))), default=models.Value(0))
+        for i in range(1, 11)
+    ]
+    Recibo.objects.update(categorias=reduce(add, bits))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0010_recibo_indice_fecha_anulacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recibo',
+            name='categorias',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_categorias, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-18 09:10
+
+from zoneinfo import ZoneInfo
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def llenar_resumen(apps, schema_editor):
+    """Primera carga del resumen con los recibos no anulados existentes."""
+    Recibo = apps.get_model('recibos', 'Recibo')
+    ResumenDiario = apps.get_model('recibos', 'ResumenDiario')
+    filas = (
+        Recibo.objects.filter(anulado=False)
+        .annotate(dia=TruncDate('fecha_creacion', tzinfo=ZoneInfo('America/Caracas')))
+        .values('dia', 'estado', 'usuario', 'categorias')
+        .annotate(cantidad=models.Count('pk'), suma=models.Sum('total_monto_bs'))
+        .order_by()
+    )
+    ResumenDiario.objects.bulk_create(
+        [
+            ResumenDiario(
+                dia=fila['dia'], estado=fila['estado'], usuario_id=fila['usuario'],
+                categorias=fila['categorias'], total=fila['cantidad'], monto=fila['suma'] or 0
+            )
+            for fila in filas.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0011_recibo_categorias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('estado', models.CharField(max_length=150)),
+                ('categorias', models.PositiveSmallIntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=21)),
+                ('usuario', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Recibos',
+                'verbose_name_plural': 'Resúmenes Diarios de Recibos',
+                'db_table': 'recibos_resumen_diario',
+                'constraints': [models.UniqueConstraint(fields=('dia', 'estado', 'usuario', 'categorias'), name='recibos_resumen_diario_clave', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(llenar_resumen, migrations.RunPython.noop),
+    ]
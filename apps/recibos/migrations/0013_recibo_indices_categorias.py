@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 12:40
+
+import django.db.models.expressions
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+def indice_categoria(i):
+    """Índice parcial de los recibos con el bit de categoria{i}: (categorias & bit) > 0."""
+    bit = models.Value(1 << (i - 1))
+    return models.Index(
+        condition=models.Q(django.db.models.lookups.GreaterThan(
+            django.db.models.expressions.CombinedExpression(models.F('categorias'), '&', bit), 0
+        )),
+        fields=['anulado', '-fecha_creacion', '-numero_recibo'], name=f'recibos_pago_categoria{i}',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0012_resumendiario'),
+    ]
+
+    operations = [
+        # categorias IN (...) se reemplaza por la condición de bits: el índice de la columna ya no se usa
+        migrations.AlterField(
+            model_name='recibo',
+            name='categorias',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        *(migrations.AddIndex(model_name='recibo', index=indice_categoria(i)) for i in range(1, 11)),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-18 13:05
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0013_recibo_indices_categorias'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # nulls_distinct=False no se crea en PostgreSQL < 15 ni en SQLite (Django la omite) y
+    # ON CONFLICT se quedaba sin destino: índice único sobre COALESCE(usuario_id, 0) en su lugar
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='resumendiario',
+            name='recibos_resumen_diario_clave',
+        ),
+        migrations.AddConstraint(
+            model_name='resumendiario',
+            constraint=models.UniqueConstraint(models.F('dia'), models.F('estado'), django.db.models.functions.comparison.Coalesce('usuario', 0, output_field=models.BigIntegerField()), models.F('categorias'), name='recibos_resumen_diario_clave'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 16:10
+
+import django.db.models.expressions
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+def indice_categoria(i):
+    """Índice parcial de los recibos con el bit de categoria{i}: (categorias & bit) > 0."""
+    bit = models.Value(1 << (i - 1))
+    return models.Index(
+        condition=models.Q(django.db.models.lookups.GreaterThan(
+            django.db.models.expressions.CombinedExpression(models.F('categorias'), '&', bit), 0
+        )),
+        fields=['anulado', '-fecha_creacion', '-id'], name=f'recibos_pago_categoria{i}',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recibos', '0014_resumendiario_clave_coalesce'),
+    ]
+
+    # El cursor desempata por id (numero_recibo admite NULL): los índices del orden se rehacen
+    operations = [
+        migrations.RemoveIndex(model_name='recibo', name='recibos_pag_anulado_515f6a_idx'),
+        migrations.RemoveIndex(model_name='recibo', name='recibos_pag_anulado_a19f9e_idx'),
+        *(migrations.RemoveIndex(model_name='recibo', name=f'recibos_pago_categoria{i}') for i in range(1, 11)),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['anulado', '-fecha_creacion', '-id'], name='recibos_pag_anulado_641b2b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recibo',
+            index=models.Index(fields=['anulado', '-fecha_anulacion', '-id'], name='recibos_pag_anulado_c88b62_idx'),
+        ),
+        *(migrations.AddIndex(model_name='recibo', index=indice_categoria(i)) for i in range(1, 11)),
+    ]
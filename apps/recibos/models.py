@@ -1,7 +1,38 @@
 import io
-from django.db import models
-from .constants import CATEGORY_CHOICES, CATEGORY_CHOICES_MAP
+from django.db import models, connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models import F, Max, Q
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import GreaterThan
+from .constants import CATEGORY_CHOICES, CATEGORY_CHOICES_MAP, BITS_CATEGORIAS
 from django.conf import settings
+from unidecode import unidecode
+
+
+def normalizar_estado(valor):
+    """Forma guardada del estado: sin acentos, en mayúsculas y sin espacios extremos."""
+    return unidecode(valor or '').strip().upper()
+
+
+def alias_autonomo():
+    """Alias 'autonomo' (settings.DATABASES) si está configurado; si no, 'default'.
+
+    Lo que se escribe por esa conexión se confirma por su cuenta, sin esperar a la
+    transacción que esté abierta en 'default'. En SQLite no se usa: una segunda
+    conexión que escribe espera a que la primera libere la base completa.
+    """
+    if 'autonomo' in settings.DATABASES and connections['autonomo'].vendor != 'sqlite':
+        return 'autonomo'
+    return DEFAULT_DB_ALIAS
+
+
+def con_categoria(bit):
+    """Condición "tiene el bit `bit` de Recibo.categorias": (categorias & bit) > 0.
+
+    Cada bit tiene su índice parcial en recibos_pago con esta misma condición (Meta.indexes),
+    y varias categorías se combinan con OR: el planificador une los índices (BitmapOr).
+    """
+    return Q(GreaterThan(F('categorias').bitand(bit), 0))
+
 
 class Recibo(models.Model):
     # 1. CAMPOS DE CONTROL Y SEGUIMIENTO
@@ -26,6 +57,17 @@ class Recibo(models.Model):
         db_index=True
     )
 
+    # Carga masiva que generó el recibo (None: alta manual o migración desde SQL)
+    importacion = models.ForeignKey(
+        'ImportacionRecibos',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='recibos',
+        verbose_name="Importación",
+        db_index=True
+    )
+
     anulado = models.BooleanField(
         default=False, 
         db_index=True 
@@ -71,6 +113,9 @@ class Recibo(models.Model):
     categoria8 = models.BooleanField(default=False)
     categoria9 = models.BooleanField(default=False)
     categoria10 = models.BooleanField(default=False)
+    # Las diez categorías como máscara de bits (BITS_CATEGORIAS), sincronizada en save()
+    # y en las cargas masivas; es la columna que usan los filtros y los conteos.
+    categorias = models.PositiveSmallIntegerField(default=0, editable=False)
 
     # 4. MONTOS Y FINANZAS
     gastos_administrativos = models.DecimalField(max_digits=19, decimal_places=2)
@@ -107,6 +152,19 @@ class Recibo(models.Model):
         db_table = 'recibos_pago'
         indexes = [
             models.Index(fields=['anulado', '-fecha', '-numero_recibo']),
+            # Listado y reportes: rango semiabierto de fecha_creacion y el mismo orden
+            # (desempate por id: numero_recibo admite NULL y no sirve de cursor)
+            models.Index(fields=['anulado', '-fecha_creacion', '-id']),
+            # Historial de anulados, paginado por cursor en este orden
+            models.Index(fields=['anulado', '-fecha_anulacion', '-id']),
+            # Filtro por categorías: un índice parcial por bit, con el orden del listado
+            *(
+                models.Index(
+                    fields=['anulado', '-fecha_creacion', '-id'],
+                    condition=con_categoria(bit), name=f'recibos_pago_{codigo}'
+                )
+                for codigo, bit in BITS_CATEGORIAS.items()
+            ),
         ]
         verbose_name = "Recibo de Pago"
         verbose_name_plural = "Recibos de Pago"
@@ -114,9 +172,197 @@ class Recibo(models.Model):
     def __str__(self):
         return f"Recibo N°{self.numero_recibo or self.pk} ({self.nombre})"
 
+    def save(self, *args, **kwargs):
+        # Los filtros comparan el estado por igualdad exacta (índice), no con iexact
+        self.estado = normalizar_estado(self.estado)
+        self.sincronizar_categorias()
+        campos = kwargs.get('update_fields')
+        if campos is not None and any(campo in BITS_CATEGORIAS for campo in campos):
+            kwargs['update_fields'] = {*campos, 'categorias'}
+        # Una sola transacción: el resumen diario (signals.py) se ajusta junto con la fila
+        with transaction.atomic():
+            # Alta manual (admin, formularios): el número sale del mismo contador que la carga masiva
+            if self._state.adding and self.numero_recibo is None:
+                self.numero_recibo = ConsecutivoRecibo.reservar(1)
+            return super().save(*args, **kwargs)
+
+    @classmethod
+    def normalizar_estados(cls):
+        """Normaliza los estados guardados por vías que no pasan por save() (SQL, bulk).
+
+        Recorre sólo los valores distintos, que son pocos. Devuelve las filas corregidas.
+        """
+        corregidos = 0
+        for estado in list(cls.objects.values_list('estado', flat=True).distinct()):
+            normalizado = normalizar_estado(estado)
+            if normalizado != estado:
+                corregidos += cls.objects.filter(estado=estado).update(estado=normalizado)
+        return corregidos
+
+    def sincronizar_categorias(self):
+        """Recalcula la máscara `categorias` desde los booleanos categoria1..categoria10."""
+        self.categorias = sum(bit for codigo, bit in BITS_CATEGORIAS.items() if getattr(self, codigo))
+        return self.categorias
+
     def tiene_categorias(self):
         """Verifica si al menos una categoría está marcada como True."""
-        for i in range(1, 11):
-            if getattr(self, f'categoria{i}'):
-                return True
-        return False
\ No newline at end of file
+        return self.categorias != 0
+
+
+class ResumenDiario(models.Model):
+    """Recibos no anulados agregados por día (hora de Caracas) × estado × usuario × categorías.
+
+    Guarda la cantidad y la suma de total_monto_bs de cada combinación; las estadísticas
+    leen estas filas en lugar de recorrer recibos_pago. Se mantiene en la misma transacción
+    que cada alta, edición, anulación o borrado (resumen.py) y se recalcula por rango con
+    `manage.py reconstruir_resumen_recibos`.
+    """
+    dia = models.DateField()
+    estado = models.CharField(max_length=150)
+    # Sin restricción de clave foránea: al eliminar un usuario su historial se conserva
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    # Máscara de categorías, igual que Recibo.categorias
+    categorias = models.PositiveSmallIntegerField(default=0)
+    total = models.IntegerField(default=0)
+    monto = models.DecimalField(max_digits=21, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'recibos_resumen_diario'
+        constraints = [
+            # Los recibos sin usuario también comparten una sola fila por clave: COALESCE en lugar
+            # de NULLS NOT DISTINCT, que sólo existe desde PostgreSQL 15 (y no en SQLite)
+            models.UniqueConstraint(
+                'dia', 'estado', Coalesce('usuario', 0, output_field=models.BigIntegerField()), 'categorias',
+                name='recibos_resumen_diario_clave'
+            ),
+        ]
+        verbose_name = "Resumen Diario de Recibos"
+        verbose_name_plural = "Resúmenes Diarios de Recibos"
+
+    def __str__(self):
+        return f"{self.dia} {self.estado}: {self.total}"
+
+
+class ConsecutivoRecibo(models.Model):
+    """Contador de numero_recibo (una fila por serie) compartido por todas las vías de alta.
+
+    `reservar(n)` incrementa la fila en una sola sentencia; el bloqueo de fila que
+    toma el UPDATE se mantiene hasta el fin de la transacción, así que las altas
+    concurrentes esperan su turno en lugar de leer el mismo MAX(numero_recibo).
+    """
+    SERIE_RECIBOS = 'recibos'
+
+    serie = models.CharField(max_length=50, unique=True, default=SERIE_RECIBOS)
+    ultimo_numero = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'recibos_consecutivo'
+        verbose_name = "Consecutivo de Recibos"
+        verbose_name_plural = "Consecutivos de Recibos"
+
+    def __str__(self):
+        return f"{self.serie}: {self.ultimo_numero}"
+
+    @classmethod
+    def reservar(cls, cantidad, serie=SERIE_RECIBOS, using=DEFAULT_DB_ALIAS):
+        """Reserva `cantidad` números contiguos y devuelve el primero del bloque.
+
+        Por 'default', dentro de la transacción que inserta los recibos: si ésta se
+        revierte, la reserva también, y la numeración queda sin huecos. Con
+        `using=alias_autonomo()` la reserva se confirma en su propia transacción
+        corta: el contador no queda bloqueado mientras dura una carga larga, a
+        cambio de que una carga fallida deje sin usar los números que reservó.
+        """
+        if cantidad < 1:
+            raise ValueError("La cantidad a reservar debe ser positiva.")
+
+        conexion = connections[using]
+        with transaction.atomic(using=using):
+            if conexion.vendor == 'postgresql':
+                with conexion.cursor() as cursor:
+                    cursor.execute(
+                        f"UPDATE {cls._meta.db_table} SET ultimo_numero = ultimo_numero + %s "
+                        f"WHERE serie = %s RETURNING ultimo_numero",
+                        [cantidad, serie]
+                    )
+                    fila = cursor.fetchone()
+                ultimo = fila[0] if fila else None
+            else:
+                actualizadas = cls.objects.using(using).filter(serie=serie).update(ultimo_numero=F('ultimo_numero') + cantidad)
+                ultimo = cls.objects.using(using).get(serie=serie).ultimo_numero if actualizadas else None
+
+            if ultimo is None:
+                # Serie aún no inicializada: parte del mayor número existente
+                cls.objects.using(using).get_or_create(serie=serie, defaults={'ultimo_numero': 0})
+                cls.sincronizar(serie, using)
+                return cls.reservar(cantidad, serie, using)
+
+        return ultimo - cantidad + 1
+
+    @classmethod
+    def sincronizar(cls, serie=SERIE_RECIBOS, using=DEFAULT_DB_ALIAS):
+        """Lleva el contador al menos hasta MAX(numero_recibo) (tras cargas con números explícitos)."""
+        maximo = Recibo.objects.using(using).aggregate(Max('numero_recibo'))['numero_recibo__max'] or 0
+        cls.objects.using(using).filter(serie=serie, ultimo_numero__lt=maximo).update(ultimo_numero=maximo)
+
+
+class ImportacionRecibos(models.Model):
+    """Carga masiva de Excel procesada en segundo plano, con su avance consultable."""
+    PENDIENTE = 'PENDIENTE'
+    PROCESANDO = 'PROCESANDO'
+    COMPLETADA = 'COMPLETADA'
+    FALLIDA = 'FALLIDA'
+
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    archivo = models.FileField(upload_to='importaciones/recibos/%Y/%m/')
+    nombre_archivo = models.CharField(max_length=255)
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='importaciones_recibos',
+        verbose_name="Cargado por"
+    )
+
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, db_index=True)
+    # Modo verificación: revisa el archivo completo y reporta todos los errores sin guardar recibos
+    solo_validacion = models.BooleanField(default=False)
+
+    # Avance (se actualiza por bloque mientras el trabajo corre)
+    filas_leidas = models.PositiveIntegerField(default=0)
+    filas_insertadas = models.PositiveIntegerField(default=0)
+    # Problemas encontrados: [{'fila', 'columna', 'valor', 'error'}, ...]
+    errores = models.JSONField(default=list, blank=True)
+    mensaje = models.TextField(blank=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'recibos_importacion'
+        ordering = ['-fecha_creacion']
+        verbose_name = "Importación de Recibos"
+        verbose_name_plural = "Importaciones de Recibos"
+
+    def __str__(self):
+        return f"Importación #{self.pk} - {self.nombre_archivo} ({self.get_estado_display()})"
+
+    @property
+    def finalizada(self):
+        return self.estado in (self.COMPLETADA, self.FALLIDA)
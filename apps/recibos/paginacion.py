@@ -0,0 +1,147 @@
+"""Paginación por cursor (keyset) para los listados de recibos.
+
+En lugar de OFFSET, cada página continúa desde la última fila de la anterior:
+WHERE (campo, desempate) < (último campo, último desempate) ORDER BY campo DESC, desempate DESC LIMIT n.
+Con un índice en ese mismo orden el costo de la página 5.000 es el de la página 1.
+Los tokens siguiente/anterior son opacos y van firmados (django.core.signing); llevan
+también el total calculado en la primera página, que no se vuelve a contar.
+"""
+import json
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.db.models import F, Q
+
+SAL_CURSOR = 'recibos.cursor'
+
+
+class PaginaCursor:
+    """Página de un recorrido por cursor; expone lo que usan las plantillas."""
+    por_cursor = True
+
+    def __init__(self, object_list, token_anterior, token_siguiente, total, total_estimado):
+        self.object_list = object_list
+        self.token_anterior = token_anterior
+        self.token_siguiente = token_siguiente
+        self.total = total
+        self.total_estimado = total_estimado
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.token_anterior is not None
+
+    def has_next(self):
+        return self.token_siguiente is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+def estimar_total(queryset):
+    """(total, estimado): exacto hasta RECIBOS_CONTEO_EXACTO_MAXIMO; por encima, la estimación del planificador.
+
+    En PostgreSQL la estimación sale de EXPLAIN, que no recorre la tabla. En otros
+    motores siempre se cuenta.
+    """
+    maximo = getattr(settings, 'RECIBOS_CONTEO_EXACTO_MAXIMO', 100000)
+    queryset = queryset.order_by()
+    if connection.vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        estimado = int(plan[0]['Plan']['Plan Rows'])
+        if estimado > maximo:
+            return estimado, True
+    return queryset.count(), False
+
+
+def _token(direccion, fila, campos, total, total_estimado):
+    valores = [fila[campo] for campo in campos]
+    return signing.dumps(
+        {'d': direccion, 'v': [v.isoformat() if hasattr(v, 'isoformat') else v for v in valores],
+         't': [total, total_estimado]},
+        salt=SAL_CURSOR, compress=True
+    )
+
+
+def _leer_token(token, modelo, campos):
+    """(dirección, valores, (total, estimado)) del token, o (None, None, None) si falta o fue alterado."""
+    invalido = None, None, None
+    if not token:
+        return invalido
+    try:
+        datos = signing.loads(token, salt=SAL_CURSOR)
+        valores = [
+            None if valor is None else modelo._meta.get_field(campo).to_python(valor)
+            for campo, valor in zip(campos, datos['v'])
+        ]
+        total, total_estimado = int(datos['t'][0]), bool(datos['t'][1])
+    except (signing.BadSignature, KeyError, IndexError, TypeError, ValueError):
+        return invalido
+    if datos['d'] not in ('sig', 'ant') or len(valores) != len(campos):
+        return invalido
+    return datos['d'], valores, (total, total_estimado)
+
+
+def condicion_cursor(campo, desempate, valor, valor_desempate, hacia_adelante):
+    """Filas posteriores (o anteriores) al cursor en el orden campo DESC NULLS FIRST, desempate DESC.
+
+    La forma campo <= v AND (campo < v OR desempate < d) deja a `campo` como rango del índice.
+    """
+    if hacia_adelante:
+        if valor is None:
+            return Q(**{f'{campo}__isnull': True, f'{desempate}__lt': valor_desempate}) | Q(**{f'{campo}__isnull': False})
+        return Q(**{f'{campo}__lte': valor}) & (Q(**{f'{campo}__lt': valor}) | Q(**{f'{desempate}__lt': valor_desempate}))
+    if valor is None:
+        return Q(**{f'{campo}__isnull': True, f'{desempate}__gt': valor_desempate})
+    return (
+        Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, f'{desempate}__gt': valor_desempate})
+        | Q(**{f'{campo}__isnull': True})
+    )
+
+
+def paginar_por_cursor(queryset, campo, desempate, token, tamano):
+    """Página de `queryset` en orden `campo` DESC (nulos primero), `desempate` DESC.
+
+    `desempate` debe ser único y no nulo ('id'; numero_recibo admite NULL). El total se
+    calcula con estimar_total() sólo en la primera página; las demás lo toman del token.
+    """
+    direccion, valores, totales = _leer_token(token, queryset.model, [campo, desempate])
+    total, total_estimado = totales or estimar_total(queryset)
+
+    if direccion is None:
+        pagina = queryset.order_by(F(campo).desc(nulls_first=True), F(desempate).desc())
+    elif direccion == 'sig':
+        pagina = queryset.filter(condicion_cursor(campo, desempate, *valores, hacia_adelante=True)).order_by(
+            F(campo).desc(nulls_first=True), F(desempate).desc()
+        )
+    else:
+        pagina = queryset.filter(condicion_cursor(campo, desempate, *valores, hacia_adelante=False)).order_by(
+            F(campo).asc(nulls_last=True), F(desempate).asc()
+        )
+
+    # Una fila de más indica si hay otra página en esa dirección
+    filas = list(pagina[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    if direccion == 'ant':
+        filas.reverse()
+
+    if not filas:
+        return PaginaCursor([], None, None, total, total_estimado)
+
+    def claves(recibo):
+        return {campo: getattr(recibo, campo), desempate: getattr(recibo, desempate)}
+
+    primera, ultima = claves(filas[0]), claves(filas[-1])
+    hay_anterior = direccion == 'sig' or (direccion == 'ant' and hay_mas)
+    hay_siguiente = direccion == 'ant' or (direccion != 'ant' and hay_mas)
+    return PaginaCursor(
+        filas,
+        _token('ant', primera, [campo, desempate], total, total_estimado) if hay_anterior else None,
+        _token('sig', ultima, [campo, desempate], total, total_estimado) if hay_siguiente else None,
+        total, total_estimado
+    )
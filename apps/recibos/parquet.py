@@ -0,0 +1,276 @@
+"""Escritura de Parquet por grupos de filas, con pyarrow si está instalado.
+
+Sin pyarrow se usa un escritor local mínimo: páginas PLAIN sin compresión, todas las
+columnas opcionales (niveles de definición RLE) y metadatos Thrift en protocolo
+compacto. Cualquier lector de Parquet (pyarrow, DuckDB, Spark, pandas) lo abre.
+
+El esquema es una lista de (nombre, tipo) con tipo en: 'entero', 'texto',
+'booleano', 'fecha', 'marca_tiempo' o ('decimal', precision, escala).
+"""
+import struct
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+MAGIC = b'PAR1'
+EPOCA = date(1970, 1, 1)
+EPOCA_UTC = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSEGUNDO = timedelta(microseconds=1)
+
+# Constantes de parquet.thrift
+TIPO_BOOLEAN, TIPO_INT32, TIPO_INT64, TIPO_BYTE_ARRAY, TIPO_FIXED = 0, 1, 2, 6, 7
+CONVERTIDO_UTF8, CONVERTIDO_DECIMAL, CONVERTIDO_DATE, CONVERTIDO_TIMESTAMP_MICROS = 0, 5, 6, 10
+REPETICION_OPTIONAL = 1
+CODIFICACION_PLAIN, CODIFICACION_RLE = 0, 3
+
+# Tipos del protocolo compacto de Thrift
+T_I32, T_I64, T_BINARY, T_LIST, T_STRUCT = 5, 6, 8, 9, 12
+
+
+# --- Protocolo compacto de Thrift (sólo lo que usa el pie de Parquet) ---
+
+def _varint(n):
+    salida = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            salida.append(byte | 0x80)
+        else:
+            salida.append(byte)
+            return bytes(salida)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+class _Struct:
+    """Struct Thrift: lista de (id, tipo, valor) con ids crecientes."""
+
+    def __init__(self, *campos):
+        self.campos = [c for c in campos if c[2] is not None]
+
+    def codificar(self):
+        salida = bytearray()
+        ultimo = 0
+        for campo_id, tipo, valor in self.campos:
+            delta = campo_id - ultimo
+            if 0 < delta <= 15:
+                salida.append((delta << 4) | tipo)
+            else:
+                salida.append(tipo)
+                salida += _varint(_zigzag(campo_id))
+            ultimo = campo_id
+            salida += _valor_thrift(tipo, valor)
+        salida.append(0)
+        return bytes(salida)
+
+
+def _valor_thrift(tipo, valor):
+    if tipo in (T_I32, T_I64):
+        return _varint(_zigzag(valor))
+    if tipo == T_BINARY:
+        datos = valor.encode('utf-8') if isinstance(valor, str) else valor
+        return _varint(len(datos)) + datos
+    if tipo == T_STRUCT:
+        return valor.codificar()
+    if tipo == T_LIST:
+        tipo_elemento, elementos = valor
+        cabecera = (bytes([(len(elementos) << 4) | tipo_elemento]) if len(elementos) < 15
+                    else bytes([0xF0 | tipo_elemento]) + _varint(len(elementos)))
+        return cabecera + b''.join(_valor_thrift(tipo_elemento, e) for e in elementos)
+    raise ValueError(f'Tipo Thrift no soportado: {tipo}')
+
+
+# --- Codificación de columnas ---
+
+def _bytes_decimal(precision):
+    """Bytes mínimos para un decimal de esa precisión en complemento a dos."""
+    n = 1
+    while 2 ** (8 * n - 1) - 1 < 10 ** precision - 1:
+        n += 1
+    return n
+
+
+def _niveles_rle(presentes):
+    """Niveles de definición (0/1) en el híbrido RLE de ancho 1, con su prefijo de longitud."""
+    salida = bytearray()
+    i, total = 0, len(presentes)
+    while i < total:
+        valor, inicio = presentes[i], i
+        while i < total and presentes[i] == valor:
+            i += 1
+        salida += _varint((i - inicio) << 1)
+        salida.append(1 if valor else 0)
+    return struct.pack('<I', len(salida)) + bytes(salida)
+
+
+class _Columna:
+    def __init__(self, nombre, tipo):
+        self.nombre = nombre
+        self.tipo = tipo
+        if isinstance(tipo, tuple):
+            _, self.precision, self.escala = tipo
+            self.ancho = _bytes_decimal(self.precision)
+            self.fisico = TIPO_FIXED
+        else:
+            self.fisico = {
+                'entero': TIPO_INT64, 'texto': TIPO_BYTE_ARRAY, 'booleano': TIPO_BOOLEAN,
+                'fecha': TIPO_INT32, 'marca_tiempo': TIPO_INT64,
+            }[tipo]
+
+    def esquema(self):
+        convertido = escala = precision = ancho = None
+        if isinstance(self.tipo, tuple):
+            convertido, escala, precision, ancho = CONVERTIDO_DECIMAL, self.escala, self.precision, self.ancho
+        elif self.tipo == 'texto':
+            convertido = CONVERTIDO_UTF8
+        elif self.tipo == 'fecha':
+            convertido = CONVERTIDO_DATE
+        elif self.tipo == 'marca_tiempo':
+            convertido = CONVERTIDO_TIMESTAMP_MICROS
+        return _Struct(
+            (1, T_I32, self.fisico), (2, T_I32, ancho), (3, T_I32, REPETICION_OPTIONAL),
+            (4, T_BINARY, self.nombre), (6, T_I32, convertido), (7, T_I32, escala), (8, T_I32, precision),
+        )
+
+    def valores_plain(self, valores):
+        if self.fisico == TIPO_BOOLEAN:
+            salida = bytearray((len(valores) + 7) // 8)
+            for i, v in enumerate(valores):
+                if v:
+                    salida[i // 8] |= 1 << (i % 8)
+            return bytes(salida)
+        if self.tipo == 'entero':
+            return struct.pack(f'<{len(valores)}q', *valores)
+        if self.tipo == 'fecha':
+            return struct.pack(f'<{len(valores)}i', *((v - EPOCA).days for v in valores))
+        if self.tipo == 'marca_tiempo':
+            return struct.pack(f'<{len(valores)}q', *(
+                (v - EPOCA_UTC) // MICROSEGUNDO for v in valores
+            ))
+        if self.fisico == TIPO_BYTE_ARRAY:
+            partes = []
+            for v in valores:
+                datos = str(v).encode('utf-8')
+                partes.append(struct.pack('<I', len(datos)))
+                partes.append(datos)
+            return b''.join(partes)
+        # Decimal: valor sin escala, big-endian con signo y ancho fijo
+        factor = Decimal(10) ** self.escala
+        return b''.join(
+            int((Decimal(v) * factor).to_integral_value()).to_bytes(self.ancho, 'big', signed=True)
+            for v in valores
+        )
+
+
+class EscritorParquetLocal:
+    """Escribe el archivo grupo a grupo sobre `destino` (sólo necesita write)."""
+
+    def __init__(self, destino, esquema):
+        self.destino = destino
+        self.columnas = [_Columna(nombre, tipo) for nombre, tipo in esquema]
+        self.grupos = []
+        self.filas = 0
+        self.posicion = 0
+        self._escribir(MAGIC)
+
+    def _escribir(self, datos):
+        self.destino.write(datos)
+        self.posicion += len(datos)
+
+    def escribir_grupo(self, filas):
+        if not filas:
+            return
+        metadatos = []
+        total_grupo = 0
+        for indice, columna in enumerate(self.columnas):
+            valores = [fila[indice] for fila in filas]
+            presentes = [v is not None for v in valores]
+            cuerpo = _niveles_rle(presentes) + columna.valores_plain([v for v in valores if v is not None])
+            cabecera = _Struct(
+                (1, T_I32, 0),  # DATA_PAGE
+                (2, T_I32, len(cuerpo)),
+                (3, T_I32, len(cuerpo)),
+                (5, T_STRUCT, _Struct(
+                    (1, T_I32, len(valores)), (2, T_I32, CODIFICACION_PLAIN),
+                    (3, T_I32, CODIFICACION_RLE), (4, T_I32, CODIFICACION_RLE),
+                )),
+            ).codificar()
+            inicio = self.posicion
+            self._escribir(cabecera)
+            self._escribir(cuerpo)
+            tamano = len(cabecera) + len(cuerpo)
+            total_grupo += tamano
+            metadatos.append(_Struct(
+                (2, T_I64, inicio),
+                (3, T_STRUCT, _Struct(
+                    (1, T_I32, columna.fisico),
+                    (2, T_LIST, (T_I32, [CODIFICACION_PLAIN, CODIFICACION_RLE])),
+                    (3, T_LIST, (T_BINARY, [columna.nombre])),
+                    (4, T_I32, 0),  # UNCOMPRESSED
+                    (5, T_I64, len(valores)),
+                    (6, T_I64, tamano),
+                    (7, T_I64, tamano),
+                    (9, T_I64, inicio),
+                )),
+            ))
+        self.grupos.append(_Struct(
+            (1, T_LIST, (T_STRUCT, metadatos)), (2, T_I64, total_grupo), (3, T_I64, len(filas)),
+        ))
+        self.filas += len(filas)
+
+    def cerrar(self):
+        raiz = _Struct((4, T_BINARY, 'schema'), (5, T_I32, len(self.columnas)))
+        pie = _Struct(
+            (1, T_I32, 1),
+            (2, T_LIST, (T_STRUCT, [raiz] + [c.esquema() for c in self.columnas])),
+            (3, T_I64, self.filas),
+            (4, T_LIST, (T_STRUCT, self.grupos)),
+            (6, T_BINARY, 'sistema_gestion'),
+        ).codificar()
+        self._escribir(pie)
+        self._escribir(struct.pack('<I', len(pie)))
+        self._escribir(MAGIC)
+
+
+class EscritorParquetArrow:
+    """Mismo contrato que EscritorParquetLocal, delegando en pyarrow (con compresión)."""
+
+    def __init__(self, destino, esquema):
+        self.nombres = [nombre for nombre, _ in esquema]
+        self.esquema = pa.schema([(nombre, self._tipo_arrow(tipo)) for nombre, tipo in esquema])
+        self.escritor = pq.ParquetWriter(destino, self.esquema, compression='snappy')
+
+    @staticmethod
+    def _tipo_arrow(tipo):
+        if isinstance(tipo, tuple):
+            return pa.decimal128(tipo[1], tipo[2])
+        return {
+            'entero': pa.int64(), 'texto': pa.string(), 'booleano': pa.bool_(),
+            'fecha': pa.date32(), 'marca_tiempo': pa.timestamp('us', tz='UTC'),
+        }[tipo]
+
+    def escribir_grupo(self, filas):
+        if filas:
+            columnas = [list(columna) for columna in zip(*filas)]
+            self.escritor.write_table(pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, self.esquema)],
+                schema=self.esquema
+            ))
+
+    def cerrar(self):
+        self.escritor.close()
+
+
+def escritor_parquet(destino, esquema):
+    """Escritor con pyarrow si está disponible; si no, el local."""
+    if pq is not None:
+        return EscritorParquetArrow(destino, esquema)
+    return EscritorParquetLocal(destino, esquema)
@@ -0,0 +1,202 @@
+"""Mantenimiento del resumen diario de recibos (ResumenDiario).
+
+Cada escritura sobre recibos_pago se traduce en movimientos: la versión anterior del
+recibo resta su cantidad y monto de la fila (día, estado, usuario, categorías) que le
+corresponde y la nueva los suma en la suya. Un recibo anulado no cuenta, así que anular
+sólo resta. Los movimientos se aplican en la transacción de la escritura:
+
+- save() y delete(): señales de signals.py.
+- Carga masiva de Excel: importar_recibos_desde_excel, por bloque.
+- migrar_sql: save() por fila, o ajuste_resumen_sql() antes y después del upsert (--copy).
+
+`reconstruir_resumen` recalcula un rango de días desde cero (comando reconstruir_resumen_recibos).
+Restar deja filas en cero, que no se borran en cada escritura: `descartar_filas_vacias` las
+elimina al reconstruir y en la limpieza nocturna (reconstruir_resumen_recibos --solo-vacias).
+
+La lista de estados con recibos (`estados_registrados`) se cachea y se invalida cuando
+un movimiento suma recibos a un estado que no estaba en ella.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from sistema_gestion.cache_consultas import consulta_cacheada
+
+from .filtros import ZONA_RECIBOS, inicio_del_dia
+from .models import Recibo, ResumenDiario
+
+# Campos del recibo que determinan su fila del resumen y lo que aporta a ella
+CAMPOS_RESUMEN = ('fecha_creacion', 'estado', 'usuario', 'categorias', 'total_monto_bs', 'anulado')
+
+# Índice único recibos_resumen_diario_clave (ResumenDiario.Meta), como destino de ON CONFLICT
+CLAVE_CONFLICTO = '(dia, estado, COALESCE(usuario_id, 0), categorias)'
+
+
+@consulta_cacheada('recibos_estados')
+def estados_registrados():
+    """Estados con recibos no anulados, para los selectores de filtro (del resumen diario)."""
+    return list(
+        ResumenDiario.objects.filter(total__gt=0).exclude(estado='')
+        .values_list('estado', flat=True).distinct().order_by('estado')
+    )
+
+
+def valores_resumen(recibo):
+    """{campo: valor} de CAMPOS_RESUMEN de una instancia (usuario como id)."""
+    return {campo: getattr(recibo, Recibo._meta.get_field(campo).attname) for campo in CAMPOS_RESUMEN}
+
+
+def valores_guardados(pk):
+    """CAMPOS_RESUMEN tal como están en BD, con la fila bloqueada hasta el fin de la transacción."""
+    return Recibo.objects.select_for_update().filter(pk=pk).values(*CAMPOS_RESUMEN).first()
+
+
+def clave_resumen(valores):
+    """(dia, estado, usuario_id, categorias) del recibo, o None si no cuenta (anulado)."""
+    if valores['anulado'] or valores['fecha_creacion'] is None:
+        return None
+    dia = timezone.localtime(valores['fecha_creacion'], ZONA_RECIBOS).date()
+    return dia, valores['estado'], valores['usuario'], valores['categorias']
+
+
+def movimientos(anteriores=(), nuevos=()):
+    """{clave: [cantidad, monto]} para pasar de las versiones `anteriores` a las `nuevos`."""
+    cambios = defaultdict(lambda: [0, Decimal('0')])
+    for signo, filas in ((-1, anteriores), (1, nuevos)):
+        for valores in filas:
+            clave = clave_resumen(valores)
+            if clave is not None:
+                cambios[clave][0] += signo
+                cambios[clave][1] += signo * Decimal(valores['total_monto_bs'] or 0)
+    return {clave: cambio for clave, cambio in cambios.items() if cambio[0] or cambio[1]}
+
+
+def _orden(clave):
+    # Mismo orden de bloqueo en todas las transacciones (evita interbloqueos); NULL al final
+    dia, estado, usuario_id, categorias = clave
+    return dia, estado, usuario_id is None, usuario_id or 0, categorias
+
+
+def aplicar_movimientos(cambios):
+    """Suma los movimientos a sus filas del resumen, creando las que falten."""
+    if not cambios:
+        return
+    claves = sorted(cambios, key=_orden)
+    # Un estado que aparece por primera vez deja vieja la lista cacheada
+    estados_cacheados = estados_registrados.en_cache()
+    if estados_cacheados is not None and not {
+        estado for (_, estado, _, _), (cantidad, _) in cambios.items() if cantidad > 0 and estado
+    } <= set(estados_cacheados):
+        estados_registrados.invalidar()
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            tabla = ResumenDiario._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {tabla} (dia, estado, usuario_id, categorias, total, monto) "
+                    f"VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(claves))} "
+                    f"ON CONFLICT {CLAVE_CONFLICTO} DO UPDATE SET "
+                    f"total = {tabla}.total + EXCLUDED.total, monto = {tabla}.monto + EXCLUDED.monto",
+                    [valor for clave in claves for valor in (*clave, *cambios[clave])]
+                )
+            return
+
+        for clave in claves:
+            cantidad, monto = cambios[clave]
+            dia, estado, usuario_id, categorias = clave
+            fila = ResumenDiario.objects.filter(dia=dia, estado=estado, usuario_id=usuario_id, categorias=categorias)
+            if fila.update(total=F('total') + cantidad, monto=F('monto') + monto):
+                continue
+            try:
+                with transaction.atomic():
+                    ResumenDiario.objects.create(
+                        dia=dia, estado=estado, usuario_id=usuario_id, categorias=categorias, total=cantidad, monto=monto
+                    )
+            except IntegrityError:
+                # Otra transacción creó la fila entre el UPDATE y el INSERT
+                fila.update(total=F('total') + cantidad, monto=F('monto') + monto)
+
+
+def registrar_cambio(anterior, recibo, update_fields=None):
+    """Ajusta el resumen por una escritura: `anterior` (dict de BD o None) pasa a `recibo` (instancia o None).
+
+    Con `update_fields` sólo esos campos cambiaron en BD; el resto se toma de `anterior`.
+    """
+    nuevo = valores_resumen(recibo) if recibo is not None else None
+    if nuevo is not None and anterior is not None and update_fields is not None:
+        guardados = {campo for campo in CAMPOS_RESUMEN
+                     if campo in update_fields or Recibo._meta.get_field(campo).attname in update_fields}
+        nuevo = {campo: nuevo[campo] if campo in guardados else anterior[campo] for campo in CAMPOS_RESUMEN}
+    aplicar_movimientos(movimientos([anterior] if anterior else (), [nuevo] if nuevo else ()))
+
+
+def ajuste_resumen_sql(cursor, tabla_numeros, signo):
+    """Suma (signo=1) o resta (-1) del resumen los recibos cuyo número está en `tabla_numeros` (PostgreSQL).
+
+    Para cargas por conjuntos: se resta antes de sobrescribir los recibos y se suma después.
+    """
+    tabla = ResumenDiario._meta.db_table
+    cursor.execute(f"""
+        INSERT INTO {tabla} (dia, estado, usuario_id, categorias, total, monto)
+        SELECT (r.fecha_creacion AT TIME ZONE %s)::date, r.estado, r.usuario_id, r.categorias,
+               %s * count(*), %s * coalesce(sum(r.total_monto_bs), 0)
+        FROM {Recibo._meta.db_table} AS r
+        WHERE NOT r.anulado AND r.numero_recibo IN (SELECT numero_recibo FROM {tabla_numeros})
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+        ON CONFLICT {CLAVE_CONFLICTO} DO UPDATE SET
+            total = {tabla}.total + EXCLUDED.total, monto = {tabla}.monto + EXCLUDED.monto
+    """, [ZONA_RECIBOS.key, signo, signo])
+    if signo > 0:
+        estados_registrados.invalidar()
+
+
+def descartar_filas_vacias():
+    """Elimina las filas que quedaron en cero tras restar."""
+    return ResumenDiario.objects.filter(total=0, monto=0).delete()[0]
+
+
+def reconstruir_resumen(desde=None, hasta=None):
+    """Recalcula desde recibos_pago el resumen de los días [desde, hasta] (sin límites: todos).
+
+    Devuelve (filas creadas, filas vacías descartadas en todo el resumen). En PostgreSQL
+    bloquea las escrituras sobre recibos_pago mientras dura (las lecturas siguen), para no
+    perder movimientos.
+    """
+    condicion_recibos, condicion_resumen = Q(anulado=False), Q()
+    if desde:
+        condicion_recibos &= Q(fecha_creacion__gte=inicio_del_dia(desde))
+        condicion_resumen &= Q(dia__gte=desde)
+    if hasta:
+        condicion_recibos &= Q(fecha_creacion__lt=inicio_del_dia(hasta + timedelta(days=1)))
+        condicion_resumen &= Q(dia__lte=hasta)
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {Recibo._meta.db_table} IN SHARE MODE')
+        ResumenDiario.objects.filter(condicion_resumen).delete()
+        filas = (
+            Recibo.objects.filter(condicion_recibos)
+            .annotate(dia=TruncDate('fecha_creacion', tzinfo=ZONA_RECIBOS))
+            .values('dia', 'estado', 'usuario', 'categorias')
+            .annotate(cantidad=Count('pk'), suma=Sum('total_monto_bs'))
+            .order_by()
+        )
+        creadas = ResumenDiario.objects.bulk_create(
+            [
+                ResumenDiario(
+                    dia=fila['dia'], estado=fila['estado'], usuario_id=fila['usuario'],
+                    categorias=fila['categorias'], total=fila['cantidad'], monto=fila['suma'] or 0
+                )
+                for fila in filas.iterator()
+            ],
+            batch_size=1000
+        )
+        descartadas = descartar_filas_vacias()
+        estados_registrados.invalidar()
+    return len(creadas), descartadas
@@ -0,0 +1,39 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Recibo
+from .resumen import registrar_cambio, valores_guardados, valores_resumen
+from .utils import invalidar_pdf_recibo
+from apps.reportes.tareas import descartar_pregenerados
+
+
+# --- CACHÉ DE PDF Y REPORTES: cualquier edición o anulación descarta lo ya generado ---
+# (sólo escrituras de una instancia: el vaciado total va por utils.vaciar_recibos, sin señales)
+
+@receiver(post_save, sender=Recibo)
+def invalidar_pdf_al_guardar(sender, instance, created, **kwargs):
+    if not created:
+        invalidar_pdf_recibo(instance.pk)
+        # Las ediciones no dejan marca de tiempo: los reportes pre-generados dejan de servirse
+        descartar_pregenerados('recibos_')
+
+@receiver(post_delete, sender=Recibo)
+def invalidar_pdf_al_eliminar(sender, instance, **kwargs):
+    invalidar_pdf_recibo(instance.pk)
+    descartar_pregenerados('recibos_')
+
+
+# --- RESUMEN DIARIO: altas, ediciones, anulaciones y borrados, en la transacción de la escritura ---
+# (loaddata, raw=True, no lo ajusta: después se corre reconstruir_resumen_recibos)
+
+@receiver(pre_save, sender=Recibo)
+def leer_resumen_anterior(sender, instance, raw, **kwargs):
+    instance._resumen_anterior = None if raw or instance._state.adding else valores_guardados(instance.pk)
+
+@receiver(post_save, sender=Recibo)
+def ajustar_resumen_al_guardar(sender, instance, raw, update_fields, **kwargs):
+    if not raw:
+        registrar_cambio(getattr(instance, '_resumen_anterior', None), instance, update_fields)
+
+@receiver(post_delete, sender=Recibo)
+def ajustar_resumen_al_eliminar(sender, instance, **kwargs):
+    registrar_cambio(valores_resumen(instance), None)
@@ -52,6 +52,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const uploadStatus = document.getElementById('upload-status');
     const generationStatus = document.getElementById('generation-status');
     const triggerUploadButton = document.getElementById('trigger-upload-button');
+    const triggerValidateButton = document.getElementById('trigger-validate-button');
+    const uploadAction = document.getElementById('upload-action');
     const uploadForm = document.getElementById('upload-form');
     const logDisplay = document.getElementById('log-display');
     const confirmButton = document.getElementById('confirm-action-button');
@@ -76,6 +78,11 @@ document.addEventListener('DOMContentLoaded', function() {
             triggerUploadButton.className = 'mt-4 w-full py-3 bg-intu-blue text-white text-[10px] font-black uppercase tracking-widest rounded-xl transition-all flex justify-center items-center shadow-lg';
             triggerUploadButton.innerHTML = '<i class="fas fa-cloud-upload-alt mr-2"></i> Procesar Ahora';
         }
+        if (triggerValidateButton) {
+            triggerValidateButton.disabled = !(excelFileInput && excelFileInput.files.length > 0);
+            triggerValidateButton.classList.toggle('text-intu-blue', !triggerValidateButton.disabled);
+            triggerValidateButton.innerHTML = '<i class="fas fa-clipboard-check mr-2"></i> Solo Validar Archivo';
+        }
     }
 
     function setInitialUploadButtonState() {
@@ -84,6 +91,10 @@ document.addEventListener('DOMContentLoaded', function() {
             triggerUploadButton.className = 'mt-4 w-full py-3 bg-gray-100 text-gray-400 text-[10px] font-black uppercase tracking-widest rounded-xl transition-all flex justify-center items-center';
             triggerUploadButton.innerHTML = '<i class="fas fa-arrow-up mr-2"></i> Esperando Archivo';
         }
+        if (triggerValidateButton) {
+            triggerValidateButton.disabled = true;
+            triggerValidateButton.classList.remove('text-intu-blue');
+        }
     }
 
     function saveLog(message, type) {
@@ -98,7 +109,9 @@ document.addEventListener('DOMContentLoaded', function() {
         localStorage.setItem(LOG_STORAGE_KEY, JSON.stringify(logs));
     }
     
-    function appendLog(message, type = 'info', persist = true) {
+    // El mensaje puede traer valores de celdas del Excel: siempre se inserta como texto.
+    // Con `enlace` ({ href, nuevaPestana }) el mensaje es el texto del vínculo.
+    function appendLog(message, type = 'info', persist = true, enlace = null) {
         if (!logDisplay || !isReceiptRelated(message)) return;
 
         if (logDisplay.querySelector('.italic')) {
@@ -120,7 +133,20 @@ document.addEventListener('DOMContentLoaded', function() {
             default: colorClass = 'text-indigo-700'; icon = 'ℹ️'; break;
         }
         logItem.className = `${colorClass} py-1 border-b border-gray-100 last:border-0 leading-tight`;
-        logItem.innerHTML = `<span class="opacity-50 text-[8px]">[${timestamp}]</span> ${icon} ${message}`;
+        const hora = document.createElement('span');
+        hora.className = 'opacity-50 text-[8px]';
+        hora.textContent = `[${timestamp}]`;
+        logItem.append(hora, ` ${icon} `);
+        if (enlace) {
+            const vinculo = document.createElement('a');
+            vinculo.href = enlace.href;
+            vinculo.className = 'underline';
+            if (enlace.nuevaPestana) vinculo.target = '_blank';
+            vinculo.textContent = message;
+            logItem.appendChild(vinculo);
+        } else {
+            logItem.appendChild(document.createTextNode(message));
+        }
         wrapper.appendChild(logItem);
         
         logDisplay.scrollTo({ top: logDisplay.scrollHeight, behavior: 'smooth' });
@@ -154,20 +180,74 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     const urlParams = new URLSearchParams(window.location.search);
-    const downloadPks = urlParams.get('download_pks');
-    if (downloadPks) {
-        const pksArray = downloadPks.split(',');
-        let downloadUrl = pksArray.length === 1 
-            ? `/recibos/generar-pdf/${pksArray[0]}/` 
-            : `/recibos/generar-zip/?pks=${downloadPks}`;
+    function descargarArchivo(downloadUrl) {
         const link = document.createElement('a');
         link.href = downloadUrl;
         link.target = '_blank';
         document.body.appendChild(link);
         link.click();
         document.body.removeChild(link);
-        appendLog(pksArray.length === 1 ? 'Recibo descargado.' : 'ZIP descargado.', 'success', true);
+    }
+
+    // Seguimiento de la importación en segundo plano
+    const importacionId = urlParams.get('importacion');
+    if (importacionId) {
         window.history.replaceState({}, document.title, window.location.pathname);
+        if (triggerUploadButton) {
+            triggerUploadButton.disabled = true;
+            triggerUploadButton.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i> Procesando...';
+        }
+        let ultimoAvance = -1;
+
+        const consultarProgreso = function() {
+            fetch(`/recibos/importaciones/${importacionId}/progreso/`, { headers: { 'Accept': 'application/json' } })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        appendLog(`Importación #${importacionId}: ${data.error}`, 'error', true);
+                        resetUploadButton();
+                        return;
+                    }
+                    if (data.filas_leidas !== ultimoAvance && data.filas_leidas > 0) {
+                        ultimoAvance = data.filas_leidas;
+                        if (generationStatus) generationStatus.textContent = `Filas procesadas: ${data.filas_leidas}`;
+                        appendLog(`Importación #${data.id}: ${data.filas_leidas} filas leídas, ${data.filas_insertadas} recibos preparados.`, 'info', false);
+                    }
+                    if (!data.finalizada) {
+                        setTimeout(consultarProgreso, 2000);
+                        return;
+                    }
+                    if (data.estado === 'COMPLETADA' && data.solo_validacion) {
+                        appendLog(data.mensaje, data.total_errores ? 'warning' : 'success', true);
+                        data.errores.forEach(e => appendLog(`Importación #${data.id} - Fila ${e.fila}: ${e.error}`, 'error', false));
+                        if (data.url_errores) {
+                            descargarArchivo(data.url_errores);
+                            appendLog('Reporte de errores de importación descargado (EXCEL).', 'warning', true);
+                        }
+                    } else if (data.estado === 'COMPLETADA') {
+                        appendLog(data.mensaje, 'success', true);
+                        if (data.url_descarga) {
+                            descargarArchivo(data.url_descarga);
+                            appendLog(data.filas_insertadas === 1 ? 'Recibo descargado.' : 'ZIP descargado.', 'success', true);
+                        }
+                        if (data.url_impresion) {
+                            appendLog('Imprimir lote: todos los recibos en un solo PDF', 'action', false, { href: data.url_impresion, nuevaPestana: true });
+                        }
+                        if (data.filas_insertadas > 1) {
+                            appendLog(`Ver los recibos de la importación #${data.id}`, 'info', false, { href: `/recibos/?lote=${encodeURIComponent(data.id)}` });
+                        }
+                    } else {
+                        appendLog(`Fallo en la carga: ${data.mensaje}`, 'error', true);
+                    }
+                    if (generationStatus) generationStatus.textContent = 'Proceso completado.';
+                    resetUploadButton();
+                })
+                .catch(() => {
+                    appendLog(`Importación #${importacionId}: reintentando consulta de progreso...`, 'warning', false);
+                    setTimeout(consultarProgreso, 5000);
+                });
+        };
+        consultarProgreso();
     }
 
     if (excelFileInput) {
@@ -179,8 +259,19 @@ document.addEventListener('DOMContentLoaded', function() {
                 setInitialUploadButtonState();
             }
         });
+        if (triggerValidateButton) {
+            triggerValidateButton.addEventListener('click', function() {
+                appendLog('Iniciando validación de archivo Excel (sin guardar recibos)...', 'action', true);
+                if (uploadAction) uploadAction.value = 'validate';
+                this.disabled = true;
+                triggerUploadButton.disabled = true;
+                this.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i> Validando...';
+                setTimeout(() => { uploadForm.submit(); }, 150);
+            });
+        }
         triggerUploadButton.addEventListener('click', function() {
             appendLog('Iniciando procesamiento de archivo...', 'action', true);
+            if (uploadAction) uploadAction.value = 'upload';
             this.disabled = true;
             this.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i> Procesando...';
             setTimeout(() => { uploadForm.submit(); }, 150);
@@ -0,0 +1,277 @@
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from datetime import timedelta
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ImportacionRecibos, alias_autonomo
+from .utils import (
+    importar_recibos_desde_excel, validar_recibos_desde_excel, ruta_pdf_recibo, ruta_pdf_en_cache
+)
+
+log_rec = logging.getLogger('CH_RECIBOS')
+
+# Hilos dedicados a las importaciones en segundo plano. Con
+# RECIBOS_IMPORTACION_EN_PROCESO = False los trabajos quedan PENDIENTES y los
+# atiende el comando `procesar_importaciones` desde un proceso aparte.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _obtener_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RECIBOS_IMPORTACION_WORKERS', 2),
+                thread_name_prefix='importacion_recibos'
+            )
+        return _executor
+
+
+def encolar_importacion(importacion):
+    """Programa el procesamiento de la importación una vez confirmado su registro."""
+    if not getattr(settings, 'RECIBOS_IMPORTACION_EN_PROCESO', True):
+        return
+    transaction.on_commit(lambda: _obtener_executor().submit(procesar_importacion, importacion.pk))
+
+
+def _registrar_avance(pk, filas_leidas, filas_insertadas):
+    """Publica el avance fuera de la transacción de importación para que el endpoint lo vea.
+
+    Se escribe por la conexión 'autonomo' (alias_autonomo), que confirma de inmediato. Sin
+    ella (SQLite) el avance sólo se vuelve visible al confirmar la transacción.
+    """
+    ImportacionRecibos.objects.using(alias_autonomo()).filter(pk=pk).update(
+        filas_leidas=filas_leidas, filas_insertadas=filas_insertadas
+    )
+
+
+def _importar_archivo(importacion):
+    pk = importacion.pk
+    try:
+        with importacion.archivo.open('rb') as archivo:
+            success, message, pks = importar_recibos_desde_excel(
+                archivo, importacion.usuario,
+                progreso=lambda leidas, insertadas: _registrar_avance(pk, leidas, insertadas),
+                importacion=importacion
+            )
+    except Exception as e:
+        log_rec.error(f"Importación #{pk} sin acceso al archivo: {e}", exc_info=True)
+        success, message, pks = False, "No se pudo leer el archivo cargado.", None
+
+    importacion.refresh_from_db(fields=['filas_leidas'])
+    importacion.mensaje = message
+    importacion.fecha_fin = timezone.now()
+    if success:
+        importacion.estado = ImportacionRecibos.COMPLETADA
+        importacion.filas_insertadas = len(pks or [])
+    else:
+        # La transacción de la carga se revirtió: no quedó ningún recibo insertado
+        importacion.estado = ImportacionRecibos.FALLIDA
+        importacion.filas_insertadas = 0
+    importacion.save()
+
+
+def _validar_archivo(importacion):
+    pk = importacion.pk
+    try:
+        with importacion.archivo.open('rb') as archivo:
+            filas_leidas, errores = validar_recibos_desde_excel(
+                archivo, progreso=lambda leidas, _: _registrar_avance(pk, leidas, 0)
+            )
+    except ValueError as ve:
+        importacion.estado = ImportacionRecibos.FALLIDA
+        importacion.mensaje = str(ve)
+    else:
+        importacion.estado = ImportacionRecibos.COMPLETADA
+        importacion.filas_leidas = filas_leidas
+        importacion.errores = errores
+        importacion.mensaje = (
+            f"Validación con {len(errores)} error(es) en {filas_leidas} filas. Descargue el reporte de errores."
+            if errores else f"Validación exitosa: {filas_leidas} filas listas para importar."
+        )
+    importacion.fecha_fin = timezone.now()
+    importacion.save()
+
+
+def procesar_importacion(pk):
+    """Ejecuta una importación PENDIENTE. Devuelve False si otro worker ya la tomó."""
+    close_old_connections()
+    try:
+        # Reclamo atómico: sólo un worker pasa la importación a PROCESANDO
+        tomada = ImportacionRecibos.objects.filter(
+            pk=pk, estado=ImportacionRecibos.PENDIENTE
+        ).update(estado=ImportacionRecibos.PROCESANDO, fecha_inicio=timezone.now())
+        if not tomada:
+            return False
+
+        importacion = ImportacionRecibos.objects.select_related('usuario').get(pk=pk)
+        log_rec.info(f"Importación #{pk} ({importacion.nombre_archivo}) iniciada.")
+
+        if importacion.solo_validacion:
+            _validar_archivo(importacion)
+        else:
+            _importar_archivo(importacion)
+
+        log_rec.info(f"Importación #{pk} finalizada ({importacion.estado}): {importacion.mensaje}")
+        return True
+    except Exception as e:
+        log_rec.error(f"FALLO FATAL en importación #{pk}: {e}", exc_info=True)
+        ImportacionRecibos.objects.filter(pk=pk).update(
+            estado=ImportacionRecibos.FALLIDA, fecha_fin=timezone.now(),
+            mensaje="Fallo en la carga: Error desconocido en el procesamiento."
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+# Mensaje de las importaciones devueltas a PENDIENTE por reclamar_vencidas
+MENSAJE_REINTENTO = "Reintento: el procesamiento anterior se interrumpió."
+
+
+def reclamar_vencidas():
+    """Devuelve a PENDIENTE las importaciones que siguen PROCESANDO pasado el límite.
+
+    Su worker terminó (reinicio, falta de memoria) sin registrar el resultado. La carga
+    corre en una sola transacción, así que no dejó recibos y puede repetirse. Una que ya
+    era un reintento se marca FALLIDA. Devuelve cuántas reclamó.
+    """
+    limite = timezone.now() - timedelta(minutes=getattr(settings, 'RECIBOS_IMPORTACION_MINUTOS_MAXIMOS', 120))
+    vencidas = ImportacionRecibos.objects.filter(estado=ImportacionRecibos.PROCESANDO, fecha_inicio__lt=limite)
+    fallidas = vencidas.filter(mensaje=MENSAJE_REINTENTO).update(
+        estado=ImportacionRecibos.FALLIDA, fecha_fin=timezone.now(),
+        mensaje="La importación se interrumpió dos veces. Revise el archivo y vuelva a cargarlo."
+    )
+    reintentos = vencidas.exclude(mensaje=MENSAJE_REINTENTO).update(
+        estado=ImportacionRecibos.PENDIENTE, fecha_inicio=None, filas_leidas=0, filas_insertadas=0,
+        mensaje=MENSAJE_REINTENTO
+    )
+    if fallidas or reintentos:
+        log_rec.warning(f"Importaciones interrumpidas: {reintentos} devueltas a PENDIENTE, {fallidas} marcadas FALLIDA.")
+    return fallidas + reintentos
+
+
+def procesar_pendientes():
+    """Atiende en orden de llegada todas las importaciones PENDIENTES. Devuelve cuántas procesó.
+
+    Antes reclama las que quedaron PROCESANDO por un worker que ya no existe.
+    """
+    reclamar_vencidas()
+    pendientes = ImportacionRecibos.objects.filter(
+        estado=ImportacionRecibos.PENDIENTE
+    ).order_by('fecha_creacion').values_list('pk', flat=True)
+    return sum(1 for pk in list(pendientes) if procesar_importacion(pk))
+
+
+# --- Renderizado de PDF de recibos en paralelo ---
+# Procesos (no hilos): reportlab es Python puro y el GIL serializaría el dibujo.
+# Cada proceso escribe el PDF en la caché de disco y sólo devuelve la ruta.
+_pool_pdf = None
+_pool_pdf_lock = threading.Lock()
+# Por debajo de esta cantidad de PDF faltantes no compensa despachar al pool
+MINIMO_PDF_EN_PARALELO = 8
+
+
+def _procesos_pdf():
+    return getattr(settings, 'RECIBOS_PDF_PROCESOS', 4)
+
+
+def _obtener_pool_pdf():
+    global _pool_pdf
+    with _pool_pdf_lock:
+        if _pool_pdf is None:
+            # 'spawn': bifurcar un servidor con hilos y conexiones abiertas no es seguro.
+            # El inicializador es django.setup mismo: una función de este módulo obligaría
+            # al proceso nuevo a importar los modelos antes de cargar las aplicaciones.
+            _pool_pdf = ProcessPoolExecutor(
+                max_workers=_procesos_pdf(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+        return _pool_pdf
+
+
+def _descartar_pool_pdf():
+    global _pool_pdf
+    with _pool_pdf_lock:
+        if _pool_pdf is not None:
+            _pool_pdf.shutdown(wait=False, cancel_futures=True)
+        _pool_pdf = None
+
+
+def _ruta_pdf_local(recibo):
+    try:
+        return ruta_pdf_recibo(recibo)
+    except Exception as e:
+        log_rec.error(f"Error en PDF del recibo (PK={recibo.pk}): {e}", exc_info=True)
+        return None
+
+
+def rutas_pdf_recibos(recibos):
+    """Entrega (recibo, ruta) en el orden de `recibos`, a medida que cada PDF está listo.
+
+    `recibos` se recorre una sola vez (puede ser un .iterator()). Los PDF en caché salen
+    de inmediato y los faltantes se despachan al pool de procesos apenas aparecen, con una
+    ventana acotada de recibos en espera: la memoria depende del tamaño del pool y no del
+    lote. Hasta juntar MINIMO_PDF_EN_PARALELO faltantes se dibujan en el proceso actual.
+    Un recibo que falla se registra y se omite.
+    """
+    procesos = _procesos_pdf()
+    paralelo = procesos > 1
+    pool = None
+    faltantes = 0
+    ventana = deque()   # (recibo, ruta en caché | Future | None: dibujar aquí)
+
+    def descartar_pool():
+        nonlocal pool, paralelo
+        if pool is not None:
+            # Un proceso murió: se rehace el pool y lo que queda se dibuja aquí
+            log_rec.error("Pool de PDF caído; se continúa en el proceso actual.")
+            _descartar_pool_pdf()
+        pool, paralelo = None, False
+
+    def resolver(recibo, pendiente):
+        if isinstance(pendiente, Future):
+            try:
+                return pendiente.result()
+            except BrokenProcessPool:
+                descartar_pool()
+            except Exception as e:
+                log_rec.error(f"Error en PDF del recibo (PK={recibo.pk}): {e}", exc_info=True)
+                return None
+        elif pendiente is not None:
+            return pendiente
+        return _ruta_pdf_local(recibo)
+
+    for recibo in recibos:
+        pendiente = ruta_pdf_en_cache(recibo)
+        if pendiente is None:
+            faltantes += 1
+            if paralelo and pool is None and faltantes >= MINIMO_PDF_EN_PARALELO:
+                pool = _obtener_pool_pdf()
+            if pool is not None:
+                try:
+                    pendiente = pool.submit(ruta_pdf_recibo, recibo)
+                except BrokenProcessPool:
+                    descartar_pool()
+        ventana.append((recibo, pendiente))
+        # Sale lo que no espera al pool, o lo más antiguo cuando la ventana se llena
+        while ventana and (not isinstance(ventana[0][1], Future) or len(ventana) > procesos * 2):
+            listo, ruta = ventana.popleft()
+            ruta = resolver(listo, ruta)
+            if ruta:
+                yield listo, ruta
+
+    while ventana:
+        listo, ruta = ventana.popleft()
+        ruta = resolver(listo, ruta)
+        if ruta:
+            yield listo, ruta
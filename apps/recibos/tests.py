@@ -0,0 +1,655 @@
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from functools import partial
+from unittest import mock, skipUnless
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+from django.db import IntegrityError, connection, connections, transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .busqueda import q_busqueda
+from .constants import BITS_CATEGORIAS
+from .filtros import FiltroRecibos
+from .management.commands.migrar_sql import Command as MigrarSql
+from .management.commands.verificar_indices_recibos import casos, usa_indice
+from .models import ConsecutivoRecibo, ImportacionRecibos, Recibo, ResumenDiario
+from .paginacion import paginar_por_cursor
+from .parquet import EscritorParquetArrow, EscritorParquetLocal, pq
+from .resumen import reconstruir_resumen
+from .tareas import _registrar_avance
+from . import utils
+from .utils import (
+    COLUMNAS_CANONICAS, COLUMNAS_MONTO_IMPORTACION, PRIMERA_FILA_DATOS,
+    CAMPOS_EXPORTACION, _bloque_a_dataframe, importar_recibos_desde_excel, parquet_en_streaming, limpiar_y_convertir_decimal,
+    nombre_archivo_pdf_recibo, ruta_pdf_en_cache,
+    normalizar_columnas_importacion, preparar_bloque_recibos, serie_a_fecha, to_boolean, validar_bloque_recibos,
+)
+
+COLUMNAS_BOOLEANAS = [f'categoria{i}' for i in range(1, 11)] + ['conciliado']
+
+MONTOS_MIXTOS = ['1.234,56', '12,5', '$ 45.00', '1.234.567', '€ 7,25', 'n/a', '-', ' ',
+                 100, 36.5, Decimal('10.10'), np.nan, True, '  2 000,75 ']
+BANDERAS_MIXTAS = ['Sí', 'si', ' X ', 'y', 'TRUE', '1', 'no', '', '0', 1, 0, 1.0, True, False, np.nan]
+
+
+def fila_excel(**valores):
+    """Fila cruda de 'Hoja2' en el orden de COLUMNAS_CANONICAS (celdas vacías por defecto)."""
+    base = {
+        'estado': 'Mérida ', 'nombre': ' josé pérez ', 'rif_cedula_identidad': 'V-12.345.678',
+        'fecha': '2024-03-25 00:00:00', 'total_monto_bs': '1.234,56',
+    }
+    base.update(valores)
+    return [base.get(columna, np.nan) for columna in COLUMNAS_CANONICAS]
+
+
+def hoja(filas, primera_fila=PRIMERA_FILA_DATOS):
+    """Bloque como lo entrega leer_hoja_recibos_por_bloques (fila de Excel = índice + PRIMERA_FILA_DATOS)."""
+    return _bloque_a_dataframe(filas, range(primera_fila, primera_fila + len(filas)))
+
+
+def libro_excel(filas):
+    """Archivo .xlsx con las filas en 'Hoja2' (encabezado en la fila 4), como el de la carga masiva."""
+    archivo = io.BytesIO()
+    with pd.ExcelWriter(archivo) as escritor:
+        pd.DataFrame([['']]).to_excel(escritor, sheet_name='Hoja1')
+        pd.DataFrame(filas, columns=COLUMNAS_CANONICAS).to_excel(escritor, sheet_name='Hoja2', startrow=3, index=False)
+    archivo.seek(0)
+    return archivo
+
+
+def importar_por_bloques(filas, tamano_bloque, **opciones):
+    """importar_recibos_desde_excel en streaming con bloques de `tamano_bloque` filas."""
+    lector = partial(utils.leer_hoja_recibos_por_bloques, tamano_bloque=tamano_bloque)
+    with mock.patch.object(utils, 'leer_hoja_recibos_por_bloques', lector):
+        return importar_recibos_desde_excel(libro_excel(filas), None, streaming=True, **opciones)
+
+
+def normalizar_fila(fila):
+    """Normalización celda a celda de la importación original (apply + iterrows)."""
+    transferencia = str(fila['numero_transferencia']).strip().upper()
+    datos = {
+        'estado': unidecode(str(fila['estado']).strip()).upper(),
+        'nombre': str(fila['nombre']).strip().title(),
+        'rif_cedula_identidad': str(fila['rif_cedula_identidad']).strip().replace('.', '').replace('-', '').replace(' ', '').upper(),
+        'direccion_inmueble': str(fila['direccion_inmueble']).strip().title(),
+        'ente_liquidado': str(fila['ente_liquidado']).strip().title(),
+        'concepto': str(fila['concepto']).strip().title(),
+        'numero_transferencia': transferencia if transferencia not in ['NAN', ''] else None,
+    }
+    datos.update({columna: limpiar_y_convertir_decimal(fila[columna]) for columna in COLUMNAS_MONTO_IMPORTACION})
+    datos.update({columna: to_boolean(fila[columna]) for columna in COLUMNAS_BOOLEANAS})
+    return datos
+
+
+class NormalizacionImportacionTests(TestCase):
+    """La normalización por columnas debe dar, celda por celda, lo mismo que la original fila por fila."""
+
+    def assertMismosValores(self, obtenido, esperado, contexto):
+        self.assertEqual(set(obtenido), set(esperado), contexto)
+        for columna, valor in esperado.items():
+            # Las banderas pueden llegar como numpy.bool_ (columna bool de pandas)
+            recibido = bool(obtenido[columna]) if isinstance(valor, bool) else obtenido[columna]
+            self.assertEqual(recibido, valor, f'{contexto}, {columna}')
+            self.assertIs(type(recibido), type(valor), f'{contexto}, {columna}')
+
+    def test_columnas_igual_que_fila_por_fila(self):
+        filas = [
+            fila_excel(
+                total_monto_bs=monto, gastos_administrativos=MONTOS_MIXTOS[-1 - i % len(MONTOS_MIXTOS)],
+                tasa_dia=MONTOS_MIXTOS[(i * 3) % len(MONTOS_MIXTOS)],
+                categoria1=BANDERAS_MIXTAS[i % len(BANDERAS_MIXTAS)],
+                categoria7=BANDERAS_MIXTAS[-1 - i % len(BANDERAS_MIXTAS)],
+                conciliado=BANDERAS_MIXTAS[(i * 5) % len(BANDERAS_MIXTAS)],
+                estado=['Mérida ', 'zulia', 'TÁCHIRA', np.nan][i % 4],
+                rif_cedula_identidad=['V-12.345.678', 'j 40123456-7', np.nan][i % 3],
+                numero_transferencia=['ref1', ' nan ', '', np.nan, 'N/A'][i % 5],
+                direccion_inmueble=['calle 5, casa 2', np.nan][i % 2],
+            )
+            for i, monto in enumerate(MONTOS_MIXTOS * 2)
+        ]
+        crudo = hoja(filas)
+        esperados = [normalizar_fila(fila) for _, fila in crudo.iterrows()]
+        obtenido = normalizar_columnas_importacion(crudo.copy())
+
+        for posicion, esperado in enumerate(esperados):
+            fila = obtenido.iloc[posicion]
+            self.assertMismosValores({columna: fila[columna] for columna in esperado}, esperado, f'fila {posicion}')
+
+    def test_fechas_iso_y_dia_primero(self):
+        fechas = pd.Series(['2024-03-25 00:00:00', '25/03/2024', '05/04/2024', '2024-04-05', 'ayer', np.nan], dtype=object)
+        obtenido = serie_a_fecha(fechas)
+        self.assertEqual(list(obtenido[:4]), [date(2024, 3, 25), date(2024, 3, 25), date(2024, 4, 5), date(2024, 4, 5)])
+        self.assertTrue(pd.isna(obtenido[4]) and pd.isna(obtenido[5]))
+
+    def test_preparar_bloque_igual_que_fila_por_fila(self):
+        filas = [
+            fila_excel(numero_transferencia='ref1', categoria2='X', conciliado='si'),
+            fila_excel(fecha='05/04/2024', total_monto_bs=36.5, tasa_dia='12,5', numero_transferencia=' ref2 '),
+            fila_excel(fecha=np.nan, nombre='TOTALES', rif_cedula_identidad=np.nan),    # sin fecha: se omite
+            fila_excel(nombre=np.nan, rif_cedula_identidad='  '),                        # sin RIF ni nombre: se omite
+            fila_excel(nombre=np.nan, total_monto_bs=np.nan, categoria10=1.0),
+        ]
+        crudo = hoja(filas)
+        registros = preparar_bloque_recibos(crudo.copy(), None, {})
+
+        importadas = crudo.drop(index=[2, 3])
+        self.assertEqual(len(registros), len(importadas))
+        for registro, (_, fila) in zip(registros, importadas.iterrows()):
+            esperado = normalizar_fila(fila)
+            esperado['fecha'] = serie_a_fecha(pd.Series([fila['fecha']], dtype=object))[0]
+            self.assertMismosValores({columna: registro[columna] for columna in esperado}, esperado, f"fila {fila.name}")
+            self.assertEqual(set(registro), set(COLUMNAS_CANONICAS) | {'usuario', 'importacion'})
+
+    def test_validar_bloque_reporta_celdas_invalidas(self):
+        Recibo.objects.create(
+            numero_recibo=1, estado='ZULIA', nombre='Registrado', rif_cedula_identidad='V1',
+            numero_transferencia='REF9', fecha=date(2024, 1, 1),
+            gastos_administrativos=Decimal('0'), tasa_dia=Decimal('1'), total_monto_bs=Decimal('1'),
+        )
+        filas = [
+            fila_excel(numero_transferencia='ref1'),
+            fila_excel(fecha='ayer'),
+            fila_excel(rif_cedula_identidad=np.nan),
+            fila_excel(total_monto_bs='abc', tasa_dia='1,2,3x'),
+            fila_excel(numero_transferencia='REF1'),
+            fila_excel(numero_transferencia='ref9'),
+            fila_excel(fecha=np.nan, total_monto_bs='abc'),    # sin fecha: no se valida
+        ]
+        errores, filas_a_importar = validar_bloque_recibos(hoja(filas), {})
+
+        self.assertEqual(
+            [(error['fila'], error['columna'], error['error']) for error in errores],
+            [
+                (6, 'fecha', "Fecha no reconocida."),
+                (7, 'rif_cedula_identidad', "RIF/Cédula es obligatorio."),
+                (8, 'tasa_dia', "Monto '1,2,3x' no es numérico."),
+                (8, 'total_monto_bs', "Monto 'abc' no es numérico."),
+                (9, 'numero_transferencia', "Transferencia 'REF1' repetida en el archivo (fila 5)."),
+                (10, 'numero_transferencia', "Transferencia 'REF9' ya registrada."),
+            ]
+        )
+        self.assertEqual(list(filas_a_importar), [True, True, True, True, True, True, False])
+
+    def test_transferencias_repetidas_entre_bloques(self):
+        vistas = {}
+        validar_bloque_recibos(hoja([fila_excel(numero_transferencia='ref1')]), vistas)
+        errores, _ = validar_bloque_recibos(hoja([fila_excel(numero_transferencia='ref1')], primera_fila=5005), vistas)
+        self.assertEqual([error['error'] for error in errores], ["Transferencia 'REF1' repetida en el archivo (fila 5)."])
+
+    def test_preparar_bloque_lanza_el_primer_error(self):
+        filas = [fila_excel(), fila_excel(total_monto_bs='abc'), fila_excel(rif_cedula_identidad=np.nan)]
+        with self.assertRaisesMessage(ValueError, "Fila 6: Monto 'abc' no es numérico. Hay 1 problema(s) más"):
+            preparar_bloque_recibos(hoja(filas), None, {})
+
+
+DATOS_RECIBO = {
+    'estado': 'ZULIA', 'nombre': 'Registrado', 'fecha': date(2024, 1, 1),
+    'gastos_administrativos': Decimal('0'), 'tasa_dia': Decimal('1'), 'total_monto_bs': Decimal('1'),
+}
+
+
+def crear_recibo(numero, **valores):
+    datos = {**DATOS_RECIBO, 'rif_cedula_identidad': f'V{numero}'}
+    datos.update(valores)
+    return Recibo.objects.create(numero_recibo=numero, **datos)
+
+
+class ImportacionMasivaTests(TestCase):
+    """La carga por bulk_create numera, vincula y valida igual que el alta recibo por recibo."""
+
+    def setUp(self):
+        self.previo = Recibo.objects.create(**DATOS_RECIBO, rif_cedula_identidad='V0', numero_transferencia='REF9')
+
+    def filas(self, cantidad, **valores):
+        return [fila_excel(numero_transferencia=f'ref{i}', categoria3='si' if i % 2 else 'no', **valores)
+                for i in range(1, cantidad + 1)]
+
+    def assertSinCambios(self):
+        self.assertEqual(list(Recibo.objects.all()), [self.previo])
+        self.assertEqual(ResumenDiario.objects.filter(estado='MERIDA').count(), 0)
+
+    def test_pks_y_numeros_consecutivos(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                Recibo.objects.exclude(pk=self.previo.pk).delete()
+                importacion = ImportacionRecibos.objects.create(nombre_archivo='carga.xlsx')
+                ultimo = ConsecutivoRecibo.objects.get().ultimo_numero
+                if streaming:
+                    ok, mensaje, pks = importar_por_bloques(self.filas(5), 2, importacion=importacion)
+                else:
+                    ok, mensaje, pks = importar_recibos_desde_excel(libro_excel(self.filas(5)), None, importacion=importacion)
+
+                self.assertTrue(ok, mensaje)
+                creados = Recibo.objects.exclude(pk=self.previo.pk).order_by('numero_recibo')
+                self.assertEqual(pks, [recibo.pk for recibo in creados])
+                self.assertEqual([recibo.numero_recibo for recibo in creados], list(range(ultimo + 1, ultimo + 6)))
+                self.assertEqual([recibo.numero_transferencia for recibo in creados], [f'REF{i}' for i in range(1, 6)])
+                self.assertEqual(set(importacion.recibos.values_list('pk', flat=True)), set(pks))
+                self.assertEqual([recibo.categorias for recibo in creados], [BITS_CATEGORIAS['categoria3'] if i % 2 else 0
+                                                                             for i in range(1, 6)])
+                self.assertEqual(ResumenDiario.objects.filter(estado='MERIDA').aggregate(total=Sum('total'))['total'], 5)
+
+    def test_transferencia_repetida_en_el_archivo(self):
+        filas = self.filas(4)
+        filas[3] = fila_excel(numero_transferencia=' REF2')
+        ok, mensaje, pks = importar_por_bloques(filas, 2)
+        self.assertFalse(ok)
+        self.assertIsNone(pks)
+        self.assertIn("Transferencia 'REF2' repetida en el archivo (fila 6)", mensaje)
+        self.assertSinCambios()
+
+    def test_transferencia_ya_registrada(self):
+        filas = self.filas(3)
+        filas[2] = fila_excel(numero_transferencia='ref9')
+        ok, mensaje, _ = importar_recibos_desde_excel(libro_excel(filas), None)
+        self.assertFalse(ok)
+        self.assertIn("Transferencia 'REF9' ya registrada", mensaje)
+        self.assertSinCambios()
+
+    def test_no_guarda_nada_si_un_bloque_falla(self):
+        # Los dos primeros bloques son válidos e insertan; el tercero falla y se revierte todo
+        filas = self.filas(5)
+        filas[4] = fila_excel(numero_transferencia='ref5', total_monto_bs='abc')
+        avance = []
+        ok, mensaje, _ = importar_por_bloques(filas, 2, progreso=lambda leidas, insertadas: avance.append(insertadas))
+        self.assertFalse(ok)
+        self.assertIn("Monto 'abc' no es numérico", mensaje)
+        self.assertEqual(avance, [2, 4])
+        self.assertSinCambios()
+
+
+@override_settings(RECIBOS_PDF_PROCESOS=1)
+class DescargasImportacionTests(TestCase):
+    """El ZIP y el PDF de un lote traen sólo los recibos de esa importación (por la FK)."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        self.usuario = get_user_model().objects.create_user(username='ana', password='x')
+        self.client.force_login(self.usuario)
+        self.primera, self.segunda = (
+            ImportacionRecibos.objects.create(nombre_archivo=f'carga{i}.xlsx', usuario=self.usuario) for i in (1, 2)
+        )
+        # Dos cargas del mismo usuario al mismo tiempo: la segunda inserta entre los bloques de la primera
+        segunda = iter([[fila_excel(rif_cedula_identidad=f'V2{i}') for i in range(2)], [fila_excel(rif_cedula_identidad='V22')]])
+
+        def intercalar(leidas, insertadas):
+            filas = next(segunda, None)
+            if filas:
+                self.assertTrue(importar_por_bloques(filas, 1, importacion=self.segunda)[0])
+
+        filas = [fila_excel(rif_cedula_identidad=f'V1{i}') for i in range(3)]
+        self.assertTrue(importar_por_bloques(filas, 2, importacion=self.primera, progreso=intercalar)[0])
+
+    def test_numeros_intercalados(self):
+        numeros = [set(importacion.recibos.values_list('numero_recibo', flat=True)) for importacion in (self.primera, self.segunda)]
+        self.assertLess(min(numeros[1]), max(numeros[0]))
+
+    def test_zip_de_la_importacion(self):
+        for importacion in (self.primera, self.segunda):
+            with self.subTest(importacion.nombre_archivo):
+                respuesta = self.client.get(reverse('recibos:generar_zip_recibos', args=[importacion.pk]))
+                self.assertEqual(respuesta['Content-Type'], 'application/zip')
+                with zipfile.ZipFile(io.BytesIO(b''.join(respuesta.streaming_content))) as archivo:
+                    self.assertEqual(
+                        archivo.namelist(),
+                        [nombre_archivo_pdf_recibo(recibo) for recibo in importacion.recibos.order_by('numero_recibo')]
+                    )
+
+    def test_pdf_del_lote(self):
+        for importacion in (self.primera, self.segunda):
+            with self.subTest(importacion.nombre_archivo), \
+                    mock.patch.object(utils, 'dibujar_recibo_pdf', wraps=utils.dibujar_recibo_pdf) as dibujar:
+                respuesta = self.client.get(reverse('recibos:generar_pdf_lote_recibos', args=[importacion.pk]))
+                self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+                self.assertTrue(b''.join(respuesta.streaming_content).startswith(b'%PDF'))
+                self.assertEqual(
+                    [llamada.args[1].pk for llamada in dibujar.call_args_list],
+                    list(importacion.recibos.order_by('numero_recibo').values_list('pk', flat=True))
+                )
+
+
+class CachePdfReciboTests(TestCase):
+    """El PDF guardado en disco se regenera en cuanto el recibo se edita o se anula."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.renderizar = self.enterContext(mock.patch.object(utils, 'renderizar_pdf_recibo', wraps=utils.renderizar_pdf_recibo))
+
+        self.client.force_login(get_user_model().objects.create_user(username='ana', password='x'))
+        self.recibo = crear_recibo(1)
+
+    def descargar(self):
+        respuesta = self.client.get(reverse('recibos:generar_pdf_recibo', args=[self.recibo.pk]))
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        contenido = b''.join(respuesta.streaming_content)
+        self.recibo.refresh_from_db()
+        return contenido, ruta_pdf_en_cache(self.recibo)
+
+    def test_reimpresion_usa_la_cache(self):
+        primero, ruta = self.descargar()
+        self.assertEqual(self.descargar(), (primero, ruta))
+        self.assertEqual(self.renderizar.call_count, 1)
+
+    def test_edicion_regenera(self):
+        _, anterior = self.descargar()
+        self.recibo.nombre = 'Corregido'
+        self.recibo.save()
+        # La señal post_save descarta el archivo viejo
+        self.assertFalse(os.path.exists(anterior))
+
+        _, ruta = self.descargar()
+        self.assertNotEqual(ruta, anterior)
+        self.assertEqual(self.renderizar.call_count, 2)
+        self.assertEqual(self.renderizar.call_args.args[0].nombre, 'Corregido')
+
+    def test_anulacion_regenera(self):
+        _, anterior = self.descargar()
+        respuesta = self.client.post(reverse('recibos:modificar_recibo', args=[self.recibo.pk]), {'action': 'anular'})
+        self.assertRedirects(respuesta, reverse('recibos:dashboard'), fetch_redirect_response=False)
+        self.assertFalse(os.path.exists(anterior))
+
+        _, ruta = self.descargar()
+        self.assertNotEqual(ruta, anterior)
+        self.assertEqual(self.renderizar.call_count, 2)
+        self.assertTrue(self.renderizar.call_args.args[0].anulado)
+
+
+class FiltroCategoriasTests(TestCase):
+    """El filtro por categorías compara bits de la máscara, sin listar sus valores posibles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Una categoría sola, dos juntas, ninguna y todas
+        combinaciones = [{'categoria1': True}, {'categoria2': True, 'categoria5': True}, {}, dict.fromkeys(BITS_CATEGORIAS, True),
+                         {'categoria10': True}, {'categoria5': True}]
+        for numero, categorias in enumerate(combinaciones, start=1):
+            crear_recibo(numero, **categorias)
+
+    def test_igual_que_los_booleanos(self):
+        for marcadas in (['categoria1'], ['categoria2', 'categoria5'], ['categoria10'], ['categoria3', 'categoria4'], list(BITS_CATEGORIAS)):
+            with self.subTest(marcadas):
+                filtro = FiltroRecibos(dict.fromkeys(marcadas, 'on'))
+                esperados = {recibo.numero_recibo for recibo in Recibo.objects.all() if any(getattr(recibo, codigo) for codigo in marcadas)}
+                self.assertEqual(set(Recibo.objects.filter(filtro.q()).values_list('numero_recibo', flat=True)), esperados)
+                self.assertEqual(
+                    ResumenDiario.objects.filter(filtro.q_resumen()).aggregate(total=Sum('total'))['total'] or 0, len(esperados)
+                )
+
+    def test_sin_lista_de_valores(self):
+        sql = str(Recibo.objects.filter(FiltroRecibos(dict.fromkeys(BITS_CATEGORIAS, 'on')).q()).values('pk').query)
+        self.assertNotIn(' IN (', sql)
+        self.assertEqual(sql.count('&'), len(BITS_CATEGORIAS))
+
+    def test_migrar_sql_sincroniza_la_mascara(self):
+        recibo = crear_recibo(90, categoria1=True)
+        defaults = {campo: getattr(recibo, campo) for campo in ('estado', 'nombre', 'rif_cedula_identidad', 'fecha',
+                                                                'gastos_administrativos', 'tasa_dia', 'total_monto_bs')}
+        fila = {
+            'linea': 1, 'numero_recibo': 90, 'numero_transferencia': None, 'fecha_creacion': None, 'fecha_anulacion': None,
+            'defaults': {**defaults, 'categoria1': False, 'categoria3': True, 'categoria7': True},
+        }
+        self.assertEqual(MigrarSql().guardar_bloque([fila], None), (1, []))
+        recibo.refresh_from_db()
+        self.assertEqual(recibo.categorias, BITS_CATEGORIAS['categoria3'] | BITS_CATEGORIAS['categoria7'])
+        self.assertFalse(Recibo.objects.filter(FiltroRecibos({'categoria1': 'on'}).q(), pk=recibo.pk).exists())
+        self.assertTrue(Recibo.objects.filter(FiltroRecibos({'categoria7': 'on'}).q(), pk=recibo.pk).exists())
+
+
+class ResumenDiarioTests(TestCase):
+
+    def test_recibos_sin_usuario_comparten_fila(self):
+        crear_recibo(1)
+        crear_recibo(2)
+        self.assertEqual(list(ResumenDiario.objects.values_list('usuario', 'total')), [(None, 2)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            fila = ResumenDiario.objects.get()
+            ResumenDiario.objects.create(dia=fila.dia, estado=fila.estado, usuario=None, categorias=fila.categorias)
+
+    def test_reconstruir_descarta_filas_vacias(self):
+        recibo = crear_recibo(1, estado='MERIDA')
+        crear_recibo(2)
+        recibo.anulado = True
+        recibo.save()
+        self.assertEqual(ResumenDiario.objects.filter(total=0, monto=0).count(), 1)
+
+        self.assertEqual(reconstruir_resumen(), (1, 0))
+        self.assertEqual(list(ResumenDiario.objects.values_list('estado', 'total')), [('ZULIA', 1)])
+
+        # Fuera del rango reconstruido también se eliminan
+        dia = ResumenDiario.objects.get().dia
+        ResumenDiario.objects.create(dia=dia, estado='TACHIRA')
+        self.assertEqual(reconstruir_resumen(dia + timedelta(days=1)), (0, 1))
+        self.assertEqual(ResumenDiario.objects.count(), 1)
+
+
+class PaginacionCursorTests(TestCase):
+    """El cursor recorre todo el historial sin saltos ni repetidos, en ambos sentidos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        momento = timezone.now()
+        # Fechas repetidas, fechas nulas (antiguos anulados) y números nulos mezclados
+        fechas = [momento, momento, None, momento - timedelta(days=1), None, momento, momento - timedelta(days=2),
+                  momento - timedelta(days=1), None, momento]
+        for numero, fecha in enumerate(fechas, start=1):
+            recibo = crear_recibo(numero)
+            Recibo.objects.filter(pk=recibo.pk).update(
+                fecha_anulacion=fecha, numero_recibo=None if numero % 3 == 0 else numero
+            )
+        # Orden esperado: fecha DESC con los nulos primero y luego id DESC
+        filas = list(Recibo.objects.values_list('fecha_anulacion', 'pk'))
+        cls.esperado = (sorted((pk for fecha, pk in filas if fecha is None), reverse=True)
+                        + [pk for fecha, pk in sorted((fila for fila in filas if fila[0] is not None), reverse=True)])
+
+    def pagina(self, token=None):
+        return paginar_por_cursor(Recibo.objects.all(), 'fecha_anulacion', 'id', token, 3)
+
+    def pks(self, pagina):
+        return [recibo.pk for recibo in pagina.object_list]
+
+    def test_hacia_adelante_y_hacia_atras(self):
+        paginas = [self.pagina()]
+        while paginas[-1].token_siguiente:
+            paginas.append(self.pagina(paginas[-1].token_siguiente))
+        self.assertEqual([pk for pagina in paginas for pk in self.pks(pagina)], self.esperado)
+        self.assertEqual(len(paginas), 4)
+        self.assertIsNone(paginas[0].token_anterior)
+
+        # Volviendo desde la última se obtienen las mismas páginas
+        pagina = paginas[-1]
+        for anterior in reversed(paginas[:-1]):
+            pagina = self.pagina(pagina.token_anterior)
+            self.assertEqual(self.pks(pagina), self.pks(anterior))
+        self.assertIsNone(pagina.token_anterior)
+
+    def test_token_alterado_vuelve_a_la_primera(self):
+        token = self.pagina().token_siguiente
+        for alterado in (token[:-2] + 'xx', 'basura', token.replace(':', '.', 1)):
+            with self.subTest(alterado):
+                self.assertEqual(self.pks(self.pagina(alterado)), self.esperado[:3])
+
+    def test_cuenta_solo_en_la_primera(self):
+        with CaptureQueriesContext(connection) as consultas:
+            primera = self.pagina()
+        self.assertEqual((primera.total, primera.total_estimado), (len(self.esperado), False))
+        self.assertTrue(any('COUNT(' in consulta['sql'] for consulta in consultas.captured_queries))
+
+        with CaptureQueriesContext(connection) as consultas:
+            siguiente = self.pagina(primera.token_siguiente)
+        self.assertEqual(siguiente.total, len(self.esperado))
+        self.assertFalse(any('COUNT(' in consulta['sql'] for consulta in consultas.captured_queries))
+
+
+ESQUEMA_PRUEBA = [
+    ('numero', 'entero'), ('nombre', 'texto'), ('pagado', 'booleano'), ('fecha', 'fecha'),
+    ('creado', 'marca_tiempo'), ('monto', ('decimal', 19, 2)), ('tasa', ('decimal', 19, 4)),
+]
+FILAS_PRUEBA = [
+    (1, 'José Pérez', True, date(2024, 3, 25), datetime(2024, 3, 25, 14, 30, 5, 120, tzinfo=dt_timezone.utc),
+     Decimal('1234.56'), Decimal('36.5000')),
+    (None, None, None, None, None, None, None),
+    (-7, '', False, date(1969, 12, 31), datetime(1970, 1, 1, tzinfo=dt_timezone.utc),
+     Decimal('-0.01'), Decimal('99999999999999.9999')),
+    (2 ** 40, 'ñ' * 300, None, date(2100, 1, 1), None, Decimal('0'), None),
+]
+
+
+@skipUnless(pq is not None, 'Se lee de vuelta con pyarrow')
+class ParquetTests(TestCase):
+    """Lo que escribe cada escritor de parquet.py se lee igual con pyarrow."""
+
+    def leer(self, clase, grupos):
+        destino = io.BytesIO()
+        escritor = clase(destino, ESQUEMA_PRUEBA)
+        for grupo in grupos:
+            escritor.escribir_grupo(grupo)
+        escritor.cerrar()
+        destino.seek(0)
+        return pq.read_table(destino)
+
+    def test_ida_y_vuelta(self):
+        for clase in (EscritorParquetLocal, EscritorParquetArrow):
+            with self.subTest(clase.__name__):
+                # Dos grupos de filas, uno vacío en medio (no se escribe)
+                tabla = self.leer(clase, [FILAS_PRUEBA[:2], [], FILAS_PRUEBA[2:]])
+                self.assertEqual(tabla.column_names, [nombre for nombre, _ in ESQUEMA_PRUEBA])
+                self.assertEqual([tuple(fila.values()) for fila in tabla.to_pylist()], FILAS_PRUEBA)
+                self.assertEqual(str(tabla.schema.field('monto').type), 'decimal128(19, 2)')
+                self.assertEqual(str(tabla.schema.field('creado').type), 'timestamp[us, tz=UTC]')
+
+    def test_sin_filas(self):
+        for clase in (EscritorParquetLocal, EscritorParquetArrow):
+            with self.subTest(clase.__name__):
+                tabla = self.leer(clase, [[]])
+                self.assertEqual(tabla.num_rows, 0)
+                self.assertEqual(tabla.column_names, [nombre for nombre, _ in ESQUEMA_PRUEBA])
+
+    def test_exportacion_de_recibos(self):
+        crear_recibo(7, numero_transferencia='REF7', categoria3=True, total_monto_bs=Decimal('10.25'))
+        crear_recibo(8, gastos_administrativos=Decimal('1.50'))
+        for clase in (EscritorParquetLocal, EscritorParquetArrow):
+            with self.subTest(clase.__name__), mock.patch.object(utils, 'escritor_parquet', clase):
+                contenido = b''.join(parquet_en_streaming(Recibo.objects.order_by('numero_recibo')))
+                filas = pq.read_table(io.BytesIO(contenido)).to_pylist()
+                self.assertEqual(
+                    [tuple(fila.values()) for fila in filas],
+                    list(Recibo.objects.order_by('numero_recibo').values_list(*CAMPOS_EXPORTACION))
+                )
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Los planes (e índices de trigramas) que se verifican son los de PostgreSQL')
+class PlanesFiltrosTests(TestCase):
+    """Cada filtro del listado y de la búsqueda debe poder resolverse por un índice de recibos_pago."""
+
+    def plan(self, queryset):
+        # Con la tabla vacía el planificador siempre elige seq scan: se penaliza para ver si el índice es usable
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.values('pk').explain()
+
+    def assertUsaIndice(self, queryset, columna):
+        plan = self.plan(queryset)
+        self.assertTrue(usa_indice(plan, columna), f'{columna} no usa índice:\n{plan}')
+
+    def test_filtros_y_busqueda_usan_indice(self):
+        for nombre, condicion, columna in casos(timezone.localdate()):
+            with self.subTest(nombre):
+                self.assertUsaIndice(Recibo.objects.filter(anulado=False).filter(condicion), columna)
+
+    def test_aplicar_combina_filtros_con_indice(self):
+        hoy = timezone.localdate()
+        filtro = FiltroRecibos({'fecha_inicio': hoy.isoformat(), 'fecha_fin': hoy.isoformat(), 'estado': 'Mérida'})
+        queryset = filtro.aplicar(Recibo.objects.filter(anulado=False))
+        self.assertUsaIndice(queryset, 'fecha_creacion')
+        # El estado se compara ya normalizado, sin envolver la columna en UPPER()
+        self.assertNotIn('upper(', self.plan(queryset).lower())
+
+    def test_busqueda_aproximada_usa_trigramas(self):
+        for campo in ('nombre', 'estado', 'todos'):
+            with self.subTest(campo):
+                plan = self.plan(Recibo.objects.filter(q_busqueda('perez', campo)))
+                self.assertIn('_trgm', plan)
+                self.assertNotIn('Seq Scan', plan)
+
+    def test_busqueda_exacta_usa_igualdad(self):
+        Recibo.objects.create(
+            numero_recibo=905039, estado='ZULIA', nombre='Registrado', rif_cedula_identidad='V12345678',
+            fecha=date(2024, 1, 1), gastos_administrativos=Decimal('0'), tasa_dia=Decimal('1'), total_monto_bs=Decimal('1'),
+        )
+        self.assertUsaIndice(Recibo.objects.filter(q_busqueda('905039', 'numero_recibo')), 'numero_recibo')
+        self.assertUsaIndice(Recibo.objects.filter(q_busqueda('V-12.345.678')), 'rif_cedula_identidad')
+
+
+@skipUnless(connection.vendor == 'postgresql', "La conexión 'autonomo' no se usa en SQLite")
+class ConexionAutonomaTests(TransactionTestCase):
+    """Lo que se escribe por 'autonomo' se ve desde otras conexiones antes de que la importación confirme."""
+    databases = {'default', 'autonomo'}
+
+    def leer_desde_otra_conexion(self, sql, parametros=()):
+        otra = connections.create_connection('default')
+        try:
+            with otra.cursor() as cursor:
+                cursor.execute(sql, parametros)
+                return cursor.fetchone()[0]
+        finally:
+            otra.close()
+
+    def test_avance_visible_durante_la_importacion(self):
+        importacion = ImportacionRecibos.objects.create(nombre_archivo='carga.xlsx', estado=ImportacionRecibos.PROCESANDO)
+        vistos = []
+
+        def progreso(leidas, insertadas):
+            _registrar_avance(importacion.pk, leidas, insertadas)
+            vistos.append((
+                self.leer_desde_otra_conexion('SELECT filas_leidas FROM recibos_importacion WHERE id = %s', [importacion.pk]),
+                self.leer_desde_otra_conexion('SELECT count(*) FROM recibos_pago'),
+            ))
+
+        filas = [fila_excel(numero_transferencia=f'REF{i}') for i in range(5)]
+        exito, mensaje, _ = importar_por_bloques(filas, 2, progreso=progreso, importacion=importacion)
+
+        self.assertTrue(exito, mensaje)
+        # El avance de cada bloque ya es visible; los recibos, sólo al confirmar la carga
+        self.assertEqual(vistos, [(2, 0), (4, 0), (5, 0)])
+
+    def test_alta_manual_no_espera_a_la_importacion(self):
+        """Los números de una alta manual en medio de la carga no se repiten ni dejan huecos."""
+        resultado = {}
+
+        def alta_manual():
+            try:
+                resultado['numero'] = Recibo.objects.create(**{**DATOS_RECIBO, 'rif_cedula_identidad': 'V1'}).numero_recibo
+            finally:
+                connection.close()
+
+        def progreso(leidas, insertadas):
+            if leidas == 2:
+                # Otra petición, con su propia conexión, mientras la carga sigue abierta
+                hilo = threading.Thread(target=alta_manual)
+                hilo.start()
+                hilo.join(timeout=10)
+                resultado['bloqueada'] = hilo.is_alive()
+
+        filas = [fila_excel(numero_transferencia=f'REF{i}') for i in range(6)]
+        exito, mensaje, _ = importar_por_bloques(filas, 2, progreso=progreso)
+
+        self.assertTrue(exito, mensaje)
+        self.assertFalse(resultado['bloqueada'], 'El alta manual esperó al contador de la importación')
+        self.assertEqual(resultado['numero'], 3)
+        self.assertEqual(sorted(Recibo.objects.values_list('numero_recibo', flat=True)), list(range(1, 8)))
@@ -16,6 +16,9 @@ urlpatterns = [
 
     path('anulados/', views.recibos_anulados, name='recibos_anulados'), 
     path('', PaginaBaseView.as_view(), name='base'),
-    path('generar-zip-recibos/', views.generar_zip_recibos, name='generar_zip_recibos'),
     path('estadisticas/', views.estadisticas_view, name='estadisticas'),
+    path('importaciones/<int:pk>/progreso/', views.progreso_importacion, name='progreso_importacion'),
+    path('importaciones/<int:pk>/errores/', views.errores_importacion, name='errores_importacion'),
+    path('importaciones/<int:pk>/zip/', views.generar_zip_recibos, name='generar_zip_recibos'),
+    path('importaciones/<int:pk>/pdf/', views.generar_pdf_lote_recibos, name='generar_pdf_lote_recibos'),
 ]
\ No newline at end of file
@@ -1,26 +1,44 @@
+import numpy as np
 import pandas as pd
-from django.db import transaction
-from django.db.models import Max, Sum
+import openpyxl
+import xlsxwriter
+from django.db import connection, transaction
+from django.db.models import Q, Sum, Count
+from django.db.models.functions import TruncMonth
 from decimal import Decimal, InvalidOperation
 from datetime import date
 import logging
 import re
 import io
 import os
+import csv
+import zipfile
+import glob
+import hashlib
+import tempfile
+import threading
+import shutil
+from xml.sax.saxutils import escape
 from django.http import HttpResponse
 from django.utils import timezone
+from reportlab import rl_config
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.lib.utils import ImageReader
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Frame, Paragraph, Spacer, Table, TableStyle
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+from reportlab.lib.enums import TA_LEFT, TA_CENTER
 from reportlab.lib.units import inch
 from django.conf import settings
 from unidecode import unidecode
 from .constants import CATEGORY_CHOICES_MAP
-from .models import Recibo
+from .models import Recibo, ConsecutivoRecibo, ResumenDiario, alias_autonomo
+from .filtros import FiltroRecibos
+from .parquet import escritor_parquet
+from .resumen import aplicar_movimientos, movimientos, valores_resumen, estados_registrados
+from apps.reportes.tareas import descartar_pregenerados
 
 # I. FUNCIONES AUXILIARES (Conversión y Formato)
 
@@ -47,7 +65,7 @@ def limpiar_y_convertir_decimal(value):
     
     s_limpio = s.replace(' ', '').replace('$', '').replace('€', '')
     if ',' in s_limpio and '.' in s_limpio:
-        s_limpio = s_limpio.replace('.', '').replace(',', '.')
+        s_final = s_limpio.replace('.', '').replace(',', '.')
     elif ',' in s_limpio:
         s_final = s_limpio.replace(',', '.')
     else:
@@ -72,193 +90,620 @@ def format_currency(amount):
     except Exception:
         return "0,00"
 
-# II. FUNCIÓN CLAVE: IMPORTACIÓN DE EXCEL
-def importar_recibos_desde_excel(archivo_excel, usuario):
-    """Procesa carga masiva desde Excel con validación de integridad."""
+# I.b NORMALIZACIÓN VECTORIZADA (equivalente por columnas de las funciones anteriores)
+
+VALORES_TEXTO_VERDADEROS = ['sí', 'si', 'true', '1', 'x', 'y']
+VALORES_DECIMAL_VACIOS = ['', '-', 'n/a', 'no aplica']
+# Tipos que limpiar_y_convertir_decimal convierte directo con Decimal(value) (isinstance exacto)
+TIPOS_NUMERICOS_NATIVOS = {int, bool, float, np.float64, Decimal}
+
+def por_valores_unicos(serie, funcion):
+    """Aplica `funcion` (operación de columna) solo a los valores distintos y reexpande el resultado.
+
+    Válido cuando valores iguales producen la misma salida; en las hojas reales
+    (estados, banderas, montos repetidos) reduce el trabajo a unas pocas filas.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    valores = funcion(pd.Series(unicos, dtype=object)).to_numpy(dtype=object)
+    return pd.Series(valores[codigos], index=serie.index, dtype=object)
+
+def _booleanos_de_serie(serie):
+    tipos = serie.map(type)
+    es_texto = tipos.map({t: issubclass(t, str) for t in pd.unique(tipos)}).astype(bool) & serie.notna()
+    resultado = pd.Series(False, index=serie.index, dtype=bool)
+
+    resultado[es_texto] = serie[es_texto].str.strip().str.lower().isin(VALORES_TEXTO_VERDADEROS).to_numpy()
+    otros = ~es_texto & serie.notna()
+    if otros.any():
+        resultado[otros] = serie[otros].isin([1]).to_numpy()
+    return resultado
+
+def _texto_monto_limpio(serie):
+    """Texto de las celdas de monto no nativas y no vacías, con separadores ya normalizados a '1234.56'."""
+    no_nulos = serie.notna()
+    es_numero = serie.map(type).isin(TIPOS_NUMERICOS_NATIVOS) & no_nulos
+
+    texto = serie[no_nulos & ~es_numero].map(str).str.strip().str.lower()
+    texto = texto[~texto.isin(VALORES_DECIMAL_VACIOS)]
+    if texto.empty:
+        return es_numero, texto
+
+    limpio = (texto.str.replace(' ', '', regex=False)
+                   .str.replace('$', '', regex=False)
+                   .str.replace('€', '', regex=False))
+    # "1.234,56" -> "1234.56" ; "12,5" -> "12.5" ; "1.234.567" -> "1234.567"
+    con_ambos = limpio.str.contains(',', regex=False) & limpio.str.contains('.', regex=False)
+    limpio = limpio.mask(con_ambos, limpio.str.replace('.', '', regex=False))
+    limpio = limpio.str.replace(',', '.', regex=False)
+    limpio = limpio.mask(limpio.str.count(r'\.') > 1, limpio.str.replace(r'(?s)\.(?=.*\.)', '', regex=True))
+    return es_numero, limpio
+
+def _decimales_de_serie(serie):
     log_rec = logging.getLogger('CH_RECIBOS')
-    RIF_COL = 'rif_cedula_identidad'
-    recibos_creados_pks = []
-    
-    COLUMNAS_CANONICAS = [
-        'estado', 'nombre', RIF_COL, 'direccion_inmueble', 'ente_liquidado',
-        'categoria1', 'categoria2', 'categoria3', 'categoria4', 'categoria5',
-        'categoria6', 'categoria7', 'categoria8', 'categoria9', 'categoria10',
-        'gastos_administrativos', 'tasa_dia', 'total_monto_bs',
-        'numero_transferencia', 'conciliado', 'fecha', 'concepto'
-    ]
+    resultado = pd.Series(Decimal(0), index=serie.index, dtype=object)
+    es_numero, limpio = _texto_monto_limpio(serie)
+    resultado[es_numero] = serie[es_numero].map(Decimal).to_numpy()
+    if limpio.empty:
+        return resultado
 
-    try:
-        # 1. Lectura de hoja específica
+    def convertir(valor):
         try:
-            df = pd.read_excel(
-                archivo_excel,
-                sheet_name='Hoja2',
-                header=3,
-                dtype={'fecha': str, RIF_COL: str, 'numero_transferencia': str} 
-            )
-        except ValueError:
-            return False, "Error de archivo: Asegúrate de que existe la hoja 'Hoja2'.", None
+            return Decimal(valor) if valor else Decimal(0)
+        except InvalidOperation:
+            log_rec.error(f"Error conversión Decimal: '{valor}'")
+            return Decimal(0)
+
+    resultado[limpio.index] = limpio.map(convertir).to_numpy()
+    return resultado
+
+def _es_monto_valido(valor):
+    try:
+        return Decimal(valor).is_finite()
+    except (InvalidOperation, TypeError, ValueError):
+        return False
+
+def _montos_invalidos_de_serie(serie):
+    invalido = pd.Series(False, index=serie.index, dtype=bool)
+    es_numero, limpio = _texto_monto_limpio(serie)
+    if es_numero.any():
+        invalido[es_numero] = ~serie[es_numero].map(_es_monto_valido).astype(bool).to_numpy()
+    if not limpio.empty:
+        invalido[limpio.index] = ~limpio.map(lambda v: not v or _es_monto_valido(v)).astype(bool).to_numpy()
+    return invalido
+
+def serie_a_boolean(serie):
+    """Versión vectorizada de to_boolean para una columna completa."""
+    return por_valores_unicos(serie, _booleanos_de_serie).astype(bool)
+
+def serie_a_decimal(serie):
+    """Versión vectorizada de limpiar_y_convertir_decimal para una columna completa."""
+    return por_valores_unicos(serie, _decimales_de_serie)
+
+def serie_monto_invalido(serie):
+    """Marca las celdas con contenido que limpiar_y_convertir_decimal no logra leer como número."""
+    return por_valores_unicos(serie, _montos_invalidos_de_serie).astype(bool)
+
+def serie_a_texto(serie, transformacion=None):
+    """Equivalente vectorizado de str(valor).strip() (+ transformación opcional) sobre una columna."""
+    def normalizar(unicos):
+        texto = unicos.str.strip()
+        return transformacion(texto) if transformacion else texto
+    return por_valores_unicos(serie.map(str), normalizar)
+
+def _fechas_de_serie(serie):
+    iso = pd.to_datetime(serie, errors='coerce', format='ISO8601')
+    resto = pd.to_datetime(serie.where(iso.isna()), errors='coerce', dayfirst=True, format='mixed')
+    return iso.fillna(resto).dt.date
+
+def serie_a_fecha(serie):
+    """Convierte la columna 'fecha' a date, celda por celda y sin depender del formato de la primera fila.
+
+    Las celdas de fecha de Excel llegan como 'aaaa-mm-dd hh:mm:ss' (ISO) y el texto
+    capturado a mano como dd/mm/aaaa; inferir un único formato con dayfirst=True
+    descartaba las fechas ISO con día > 12.
+    """
+    return por_valores_unicos(serie, _fechas_de_serie)
+
+def normalizar_columnas_importacion(df):
+    """Normaliza en bloque las columnas del Excel de recibos a los valores que se guardan en BD.
+
+    Reemplaza las llamadas celda a celda (apply/iterrows) por operaciones de columna de pandas.
+    Agrega 'rif_crudo' y 'nombre_crudo' (solo strip) para las validaciones de fila.
+    """
+    RIF_COL = 'rif_cedula_identidad'
+
+    df['gastos_administrativos'] = serie_a_decimal(df['gastos_administrativos'])
+    df['tasa_dia'] = serie_a_decimal(df['tasa_dia'])
+    df['total_monto_bs'] = serie_a_decimal(df['total_monto_bs'])
+
+    for i in range(1, 11):
+        df[f'categoria{i}'] = serie_a_boolean(df[f'categoria{i}'])
+    df['conciliado'] = serie_a_boolean(df['conciliado'])
+
+    df['estado'] = serie_a_texto(df['estado'], lambda s: s.map(unidecode).str.upper())
+
+    df['nombre_crudo'] = serie_a_texto(df['nombre'])
+    df['nombre'] = serie_a_texto(df['nombre_crudo'], lambda s: s.str.title())
 
-        df.dropna(how='all', inplace=True)
-        if df.empty: return False, "El archivo Excel está vacío.", None
+    df['rif_crudo'] = serie_a_texto(df[RIF_COL])
+    df[RIF_COL] = serie_a_texto(df['rif_crudo'], lambda s: s.str.replace(r'[.\- ]', '', regex=True).str.upper())
 
+    for col in ('direccion_inmueble', 'ente_liquidado', 'concepto'):
+        df[col] = serie_a_texto(df[col], lambda s: s.str.title())
+
+    transferencia = serie_a_texto(df['numero_transferencia'], lambda s: s.str.upper())
+    df['numero_transferencia'] = transferencia.where(~transferencia.isin(['NAN', '']), None)
+    return df
+
+
+# II. FUNCIÓN CLAVE: IMPORTACIÓN DE EXCEL
+
+# Filas por INSERT en la carga masiva y literales por consulta IN de verificación.
+TAMANO_LOTE_IMPORTACION = 1000
+
+def transferencias_registradas(numeros_transferencia):
+    """Devuelve el subconjunto de transferencias que ya existen en BD (consulta por lotes)."""
+    numeros = list(numeros_transferencia)
+    existentes = set()
+    for inicio in range(0, len(numeros), TAMANO_LOTE_IMPORTACION):
+        lote = numeros[inicio:inicio + TAMANO_LOTE_IMPORTACION]
+        existentes.update(
+            Recibo.objects.filter(numero_transferencia__in=lote).values_list('numero_transferencia', flat=True)
+        )
+    return existentes
+
+def insertar_recibos_en_lotes(recibos):
+    """Inserta instancias Recibo con bulk_create por lotes y devuelve sus PKs en orden."""
+    pks = []
+    for inicio in range(0, len(recibos), TAMANO_LOTE_IMPORTACION):
+        lote = Recibo.objects.bulk_create(recibos[inicio:inicio + TAMANO_LOTE_IMPORTACION])
+        if all(r.pk for r in lote):
+            pks.extend(r.pk for r in lote)
+        else:
+            # Motores sin RETURNING: se resuelven por el número de recibo (único)
+            por_numero = dict(
+                Recibo.objects.filter(numero_recibo__in=[r.numero_recibo for r in lote]).values_list('numero_recibo', 'pk')
+            )
+            pks.extend(por_numero[r.numero_recibo] for r in lote)
+    return pks
+
+COLUMNAS_CANONICAS = [
+    'estado', 'nombre', 'rif_cedula_identidad', 'direccion_inmueble', 'ente_liquidado',
+    'categoria1', 'categoria2', 'categoria3', 'categoria4', 'categoria5',
+    'categoria6', 'categoria7', 'categoria8', 'categoria9', 'categoria10',
+    'gastos_administrativos', 'tasa_dia', 'total_monto_bs',
+    'numero_transferencia', 'conciliado', 'fecha', 'concepto'
+]
+COLUMNAS_TEXTO_CRUDO = ['fecha', 'rif_cedula_identidad', 'numero_transferencia']
+# Primera fila de datos de 'Hoja2' (encabezado en la fila 4)
+PRIMERA_FILA_DATOS = 5
+COLUMNAS_MONTO_IMPORTACION = ['gastos_administrativos', 'tasa_dia', 'total_monto_bs']
+
+# Lectura en streaming: filas por bloque y tamaño a partir del cual se usa
+TAMANO_BLOQUE_LECTURA = 5000
+UMBRAL_STREAMING_BYTES = 5 * 1024 * 1024
+# Mismos textos que pandas.read_excel interpreta como celda vacía
+VALORES_NA_EXCEL = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+def leer_hoja_recibos(archivo_excel):
+    """Lee 'Hoja2' completa con pandas y la devuelve como un único bloque."""
+    try:
+        df = pd.read_excel(
+            archivo_excel,
+            sheet_name='Hoja2',
+            header=3,
+            dtype={col: str for col in COLUMNAS_TEXTO_CRUDO}
+        )
+    except ValueError:
+        raise ValueError("Error de archivo: Asegúrate de que existe la hoja 'Hoja2'.")
+
+    df.dropna(how='all', inplace=True)
+    if not df.empty:
         df = df.iloc[:, :len(COLUMNAS_CANONICAS)]
         df.columns = COLUMNAS_CANONICAS
-        
-        # 2. Pre-procesamiento de datos
-        df['fecha_procesada'] = pd.to_datetime(df['fecha'], errors='coerce', dayfirst=True).dt.date
-        df = df.dropna(subset=['fecha_procesada']) 
-
-        df['gastos_admin_proc'] = df['gastos_administrativos'].apply(limpiar_y_convertir_decimal)
-        df['tasa_dia_proc'] = df['tasa_dia'].apply(limpiar_y_convertir_decimal)
-        df['total_monto_proc'] = df['total_monto_bs'].apply(limpiar_y_convertir_decimal)
-        
-        for i in range(1, 11):
-            df[f'categoria{i}'] = df[f'categoria{i}'].apply(to_boolean)
-        df['conciliado'] = df['conciliado'].apply(to_boolean)
-        
-        # 3. Transacción Atómica
-        with transaction.atomic():
-            ultimo_recibo = Recibo.objects.aggregate(Max('numero_recibo'))['numero_recibo__max']
-            consecutivo_actual = (ultimo_recibo or 0) + 1
-
-            for index, fila_datos in df.iterrows():
-                fila_numero = index + 5
-                rif_cedula_raw = str(fila_datos.get(RIF_COL, '')).strip()
-                nombre_raw = str(fila_datos.get('nombre', '')).strip()
-                num_transf_raw = str(fila_datos.get('numero_transferencia', '')).strip().upper()
-                
-                # Validación de duplicados
-                if num_transf_raw and num_transf_raw not in ['N/A', 'NAN', '']:
-                    if Recibo.objects.filter(numero_transferencia=num_transf_raw).exists():
-                        raise ValueError(f"Fila {fila_numero}: Transferencia '{num_transf_raw}' ya registrada.")
-
-                if not rif_cedula_raw and not nombre_raw: continue
-                if not rif_cedula_raw: raise ValueError(f"Fila {fila_numero}: RIF/Cédula es obligatorio.")
-                
-                data_a_insertar = {
-                    'numero_recibo': consecutivo_actual,
-                    'estado': unidecode(str(fila_datos.get('estado', '')).strip()).upper(),
-                    'nombre': str(nombre_raw).title(),
-                    'rif_cedula_identidad': str(rif_cedula_raw).strip().replace('.', '').replace('-', '').replace(' ', '').upper(),
-                    'direccion_inmueble': str(fila_datos.get('direccion_inmueble', 'DIRECCION NO ESPECIFICADA')).strip().title(),
-                    'ente_liquidado': str(fila_datos.get('ente_liquidado', 'ENTE NO ESPECIFICADO')).strip().title(),
-                    'numero_transferencia': num_transf_raw if num_transf_raw not in ['NAN', ''] else None,
-                    'concepto': str(fila_datos.get('concepto', '')).strip().title(),
-                    'gastos_administrativos': fila_datos['gastos_admin_proc'],
-                    'tasa_dia': fila_datos['tasa_dia_proc'],
-                    'total_monto_bs': fila_datos['total_monto_proc'],
-                    'fecha': fila_datos['fecha_procesada'],
-                    'conciliado': fila_datos['conciliado'],
-                    'usuario': usuario
-                }
-                
-                for i in range(1, 11):
-                    data_a_insertar[f'categoria{i}'] = fila_datos[f'categoria{i}']
-                
-                recibo_creado = Recibo.objects.create(**data_a_insertar)
-                recibos_creados_pks.append(recibo_creado.pk)
-                consecutivo_actual += 1
+        yield df
+
+def _valor_celda_excel(valor):
+    """Convierte una celda de openpyxl igual que pandas.read_excel (NaN, enteros, textos vacíos)."""
+    if valor is None or (isinstance(valor, str) and valor in VALORES_NA_EXCEL):
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+def _bloque_a_dataframe(filas, numeros_fila):
+    df = pd.DataFrame(filas, columns=COLUMNAS_CANONICAS, index=[n - PRIMERA_FILA_DATOS for n in numeros_fila], dtype=object)
+    for col in COLUMNAS_TEXTO_CRUDO:
+        df[col] = df[col].astype(str).where(df[col].notna(), np.nan)
+    return df
+
+def leer_hoja_recibos_por_bloques(archivo_excel, tamano_bloque=TAMANO_BLOQUE_LECTURA):
+    """Recorre 'Hoja2' en modo read-only de openpyxl y entrega DataFrames de `tamano_bloque` filas.
+
+    La memoria queda acotada al bloque en curso. Si Django guardó la subida en un
+    archivo temporal (TemporaryFileUploadHandler) se lee directo desde disco.
+    """
+    origen = archivo_excel.temporary_file_path() if hasattr(archivo_excel, 'temporary_file_path') else archivo_excel
+    libro = openpyxl.load_workbook(origen, read_only=True, data_only=True, keep_links=False)
+    try:
+        if 'Hoja2' not in libro.sheetnames:
+            raise ValueError("Error de archivo: Asegúrate de que existe la hoja 'Hoja2'.")
+
+        ancho = len(COLUMNAS_CANONICAS)
+        filas, numeros_fila = [], []
+        filas_iter = libro['Hoja2'].iter_rows(min_row=PRIMERA_FILA_DATOS, max_col=ancho, values_only=True)
+        for numero_fila, valores in enumerate(filas_iter, start=PRIMERA_FILA_DATOS):
+            fila = [_valor_celda_excel(v) for v in valores]
+            if all(v is np.nan for v in fila):
+                continue
+            filas.append(fila + [np.nan] * (ancho - len(fila)))
+            numeros_fila.append(numero_fila)
+            if len(filas) >= tamano_bloque:
+                yield _bloque_a_dataframe(filas, numeros_fila)
+                filas, numeros_fila = [], []
+        if filas:
+            yield _bloque_a_dataframe(filas, numeros_fila)
+    finally:
+        libro.close()
+
+def _celdas_vacias(serie):
+    return serie.isna() | (serie.map(str).str.strip() == '')
+
+def validar_bloque_recibos(df, transferencias_archivo):
+    """Revisa todas las filas de un bloque crudo (antes de normalizar) en una sola pasada por columna.
+
+    Devuelve (errores, filas_a_importar): la lista de problemas encontrados
+    ({'fila', 'columna', 'valor', 'error'}) y la máscara de filas que se cargan
+    (con fecha y con RIF o nombre). `transferencias_archivo` acumula entre bloques
+    la primera fila en que aparece cada transferencia del archivo.
+    """
+    filas = pd.Series(df.index + PRIMERA_FILA_DATOS, index=df.index)
+    errores = []
+
+    def registrar(mascara, columna, mensaje):
+        mensajes = (mensaje.reindex(mascara.index)[mascara] if isinstance(mensaje, pd.Series)
+                    else [mensaje] * int(mascara.sum()))
+        for fila, valor, texto in zip(filas[mascara], df.loc[mascara, columna], mensajes):
+            errores.append({
+                'fila': int(fila),
+                'columna': columna,
+                'valor': '' if pd.isna(valor) else str(valor),
+                'error': texto,
+            })
+
+    # Filas sin fecha se descartan (renglones de totales o notas); una fecha ilegible es un error
+    sin_fecha = _celdas_vacias(df['fecha'])
+    registrar(serie_a_fecha(df['fecha']).isna() & ~sin_fecha, 'fecha', "Fecha no reconocida.")
+
+    sin_rif = _celdas_vacias(df['rif_cedula_identidad'])
+    sin_nombre = _celdas_vacias(df['nombre'])
+    con_datos = ~sin_fecha & ~(sin_rif & sin_nombre)
+    registrar(con_datos & sin_rif, 'rif_cedula_identidad', "RIF/Cédula es obligatorio.")
+
+    for columna in COLUMNAS_MONTO_IMPORTACION:
+        mensaje = "Monto '" + serie_a_texto(df[columna]) + "' no es numérico."
+        registrar(con_datos & serie_monto_invalido(df[columna]), columna, mensaje)
+
+    # Duplicados de transferencia: dentro del archivo (también entre bloques) y contra BD
+    transferencia = serie_a_texto(df['numero_transferencia'], lambda t: t.str.upper())
+    transferencia = transferencia.where(~sin_fecha & ~transferencia.isin(['NAN', '', 'N/A']))
+    con_transferencia = transferencia.notna()
+
+    primera_fila = filas[con_transferencia].groupby(transferencia[con_transferencia]).transform('first')
+    primera_fila = (transferencia[con_transferencia].map(transferencias_archivo)
+                    .fillna(primera_fila).reindex(df.index))
+    repetida = con_transferencia & (primera_fila != filas)
+    # Armado fila a fila: con pyarrow, pandas guarda los textos convertidos con astype(str) en
+    # otro tipo de columna, que no se concatena con la columna de objetos
+    mensaje = pd.Series([
+        f"Transferencia '{numero}' repetida en el archivo (fila {int(fila)})."
+        for numero, fila in zip(transferencia[repetida], primera_fila[repetida])
+    ], index=transferencia[repetida].index, dtype=object)
+    registrar(repetida, 'numero_transferencia', mensaje)
+
+    unicas = con_transferencia & ~repetida
+    for numero, fila in zip(transferencia[unicas], filas[unicas]):
+        transferencias_archivo.setdefault(numero, int(fila))
+
+    en_bd = unicas & transferencia.isin(transferencias_registradas(set(transferencia[unicas])))
+    registrar(en_bd, 'numero_transferencia', "Transferencia '" + transferencia[en_bd] + "' ya registrada.")
+
+    errores.sort(key=lambda e: e['fila'])
+    return errores, con_datos
+
+def describir_error_importacion(error):
+    return f"Fila {error['fila']}: {error['error']}"
+
+def preparar_bloque_recibos(df, usuario, transferencias_archivo, importacion=None):
+    """Valida y normaliza un bloque de filas; devuelve los dicts listos para crear Recibo.
+
+    `transferencias_archivo` acumula entre bloques las transferencias ya vistas en el archivo.
+    Cada recibo queda vinculado a `importacion` (el lote de la carga), si se indica.
+    Lanza ValueError con el primer problema del bloque (el reporte completo lo da el modo validación).
+    """
+    errores, filas_a_importar = validar_bloque_recibos(df, transferencias_archivo)
+    if errores:
+        mensaje = describir_error_importacion(errores[0])
+        if len(errores) > 1:
+            mensaje += f" Hay {len(errores) - 1} problema(s) más; valide el archivo para obtener el reporte completo."
+        raise ValueError(mensaje)
+
+    df = df[filas_a_importar]
+    if df.empty:
+        return []
+    df['fecha'] = serie_a_fecha(df['fecha'])
+    df = normalizar_columnas_importacion(df)
+
+    registros = df[COLUMNAS_CANONICAS].to_dict('records')
+    for data in registros:
+        data['usuario'] = usuario
+        data['importacion'] = importacion
+    return registros
+
+def importar_recibos_desde_excel(archivo_excel, usuario, streaming=None, progreso=None, importacion=None):
+    """Procesa carga masiva desde Excel con validación de integridad.
+
+    Con `streaming` (por defecto: archivos mayores a UMBRAL_STREAMING_BYTES) la hoja
+    se lee, valida e inserta por bloques sin cargar el libro completo en memoria.
+    `progreso(filas_leidas, filas_insertadas)` se invoca al terminar cada bloque.
+    Los recibos creados quedan vinculados a `importacion` (ImportacionRecibos).
+    """
+    log_rec = logging.getLogger('CH_RECIBOS')
+    if streaming is None:
+        streaming = (getattr(archivo_excel, 'size', 0) or 0) > UMBRAL_STREAMING_BYTES
+    bloques = leer_hoja_recibos_por_bloques(archivo_excel) if streaming else leer_hoja_recibos(archivo_excel)
 
-            return True, f"Importación masiva exitosa. Se generaron {len(recibos_creados_pks)} recibos.", recibos_creados_pks
+    try:
+        recibos_creados_pks = []
+        transferencias_archivo = {}
+        hubo_filas = False
+        filas_leidas = 0
+
+        # Transacción Atómica: inserción por lotes de todos los bloques o de ninguno.
+        # Los números de cada bloque se reservan en una transacción corta aparte (conexión
+        # 'autonomo'), para no bloquear el contador durante toda la carga; si ésta falla,
+        # los números reservados quedan sin usar.
+        with transaction.atomic():
+            for bloque in bloques:
+                hubo_filas = True
+                filas_validas = preparar_bloque_recibos(bloque, usuario, transferencias_archivo, importacion)
+                if filas_validas:
+                    primer_numero = ConsecutivoRecibo.reservar(len(filas_validas), using=alias_autonomo())
+                    recibos = [
+                        Recibo(numero_recibo=primer_numero + desplazamiento, **data)
+                        for desplazamiento, data in enumerate(filas_validas)
+                    ]
+                    # bulk_create no pasa por save(): la máscara de categorías se calcula aquí
+                    for recibo in recibos:
+                        recibo.sincronizar_categorias()
+                    recibos_creados_pks.extend(insertar_recibos_en_lotes(recibos))
+                    # Tampoco dispara señales: el resumen diario se ajusta por bloque
+                    aplicar_movimientos(movimientos(nuevos=[valores_resumen(recibo) for recibo in recibos]))
+                filas_leidas += len(bloque)
+                if progreso:
+                    progreso(filas_leidas, len(recibos_creados_pks))
+
+            if not hubo_filas:
+                raise ValueError("El archivo Excel está vacío.")
+
+        return True, f"Importación masiva exitosa. Se generaron {len(recibos_creados_pks)} recibos.", recibos_creados_pks
 
     except ValueError as ve:
         return False, str(ve), None
     except Exception as e:
         log_rec.error(f"FALLO FATAL: {e}", exc_info=True)
         return False, "Fallo en la carga: Error desconocido en el procesamiento.", None
+    finally:
+        bloques.close()
 
 
-# III. GENERACIÓN DE REPORTES (Excel y PDF)
+def validar_recibos_desde_excel(archivo_excel, streaming=None, progreso=None):
+    """Modo verificación: revisa el archivo completo sin guardar nada.
 
-def generar_reporte_excel(request_filters, queryset, filtros_aplicados):
-    """Genera un archivo Excel masivo con los recibos filtrados y hoja de resumen."""
-    log_rec = logging.getLogger('CH_RECIBOS')
-    data = []
+    Devuelve (filas_leidas, errores) con todos los problemas del archivo; lanza
+    ValueError si la hoja no existe o no tiene datos. `progreso(filas_leidas, 0)`
+    se invoca al terminar cada bloque.
+    """
+    if streaming is None:
+        streaming = (getattr(archivo_excel, 'size', 0) or 0) > UMBRAL_STREAMING_BYTES
+    bloques = leer_hoja_recibos_por_bloques(archivo_excel) if streaming else leer_hoja_recibos(archivo_excel)
 
-    headers = [
-        'Número Recibo', 'Nombre', 'Cédula/RIF', 'Fecha', 'Estado',
-        'Monto Total (Bs.)', 'Tasa del Día', 'Gastos Administrativos', 
-        'N° Transferencia', 'Concepto', 'Categorías'
-    ]
+    try:
+        errores = []
+        transferencias_archivo = {}
+        filas_leidas = 0
+        for bloque in bloques:
+            errores_bloque, _ = validar_bloque_recibos(bloque, transferencias_archivo)
+            errores.extend(errores_bloque)
+            filas_leidas += len(bloque)
+            if progreso:
+                progreso(filas_leidas, 0)
+
+        if not filas_leidas:
+            raise ValueError("El archivo Excel está vacío.")
+        return filas_leidas, errores
+    finally:
+        bloques.close()
+
+def generar_excel_errores_importacion(errores, nombre_archivo):
+    """Hoja descargable con todos los problemas encontrados al validar un archivo de recibos."""
+    df_errores = pd.DataFrame(
+        [[e['fila'], e['columna'], e['valor'], e['error']] for e in errores],
+        columns=['Fila', 'Columna', 'Valor', 'Error']
+    )
+    output = io.BytesIO()
 
-    for recibo in queryset:
-        categoria_detalle_nombres = [
-            CATEGORY_CHOICES_MAP.get(f'categoria{i}', f'Categoría {i}')
-            for i in range(1, 11) if getattr(recibo, f'categoria{i}')
-        ]
-        categorias_concatenadas = ','.join(categoria_detalle_nombres)
-
-        row = [
-            "{:04d}".format(recibo.numero_recibo), 
-            recibo.nombre,
-            recibo.rif_cedula_identidad,
-            recibo.fecha.strftime('%Y-%m-%d'),
-            recibo.estado,
-            recibo.total_monto_bs, 
-            recibo.tasa_dia, 
-            recibo.gastos_administrativos, 
-            recibo.numero_transferencia,
-            recibo.concepto.strip() if recibo.concepto else "",
-            categorias_concatenadas
-        ]
-        data.append(row)
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df_errores.to_excel(writer, index=False, sheet_name='Errores')
+        worksheet = writer.sheets['Errores']
+        bold_format = writer.book.add_format({'bold': True, 'bg_color': '#EAEAEA'})
+        worksheet.set_column('A:A', 8)
+        worksheet.set_column('B:B', 25)
+        worksheet.set_column('C:C', 30)
+        worksheet.set_column('D:D', 70)
+        for col_num, value in enumerate(df_errores.columns):
+            worksheet.write(0, col_num, value, bold_format)
+        worksheet.autofilter(0, 0, max(len(df_errores), 1), len(df_errores.columns) - 1)
+        worksheet.freeze_panes(1, 0)
 
-    total_registros = queryset.count()
-    total_monto_bs = queryset.aggregate(total=Sum('total_monto_bs'))['total'] or Decimal(0)
-    
-    # Resumen de filtros aplicados
+    output.seek(0)
+    base = os.path.splitext(os.path.basename(nombre_archivo))[0]
+    filename = f"Errores_{base}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    response = HttpResponse(output, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment;filename="{filename}"'
+    return response
+
+# III. GENERACIÓN DE REPORTES (Excel y PDF)
+
+# Filas por lectura del cursor en los reportes masivos (Excel y PDF)
+FILAS_CONSULTA_REPORTE = 2000
+ENCABEZADO_REPORTE_EXCEL = [
+    'Número Recibo', 'Nombre', 'Cédula/RIF', 'Fecha', 'Estado',
+    'Monto Total (Bs.)', 'Tasa del Día', 'Gastos Administrativos', 
+    'N° Transferencia', 'Concepto', 'Categorías'
+]
+CAMPOS_REPORTE_EXCEL = [
+    'numero_recibo', 'nombre', 'rif_cedula_identidad', 'fecha', 'estado',
+    'total_monto_bs', 'tasa_dia', 'gastos_administrativos', 'numero_transferencia', 'concepto',
+] + [f'categoria{i}' for i in range(1, 11)]
+NOMBRES_CATEGORIAS_EXCEL = [CATEGORY_CHOICES_MAP.get(f'categoria{i}', f'Categoría {i}') for i in range(1, 11)]
+
+def filtrar_recibos_reporte(parametros):
+    """Aplica los filtros del reporte (búsqueda, categorías, fechas y rango de números).
+
+    `parametros` es un mapeo como request.GET o los parámetros guardados de un
+    trabajo de reporte. Devuelve (queryset, filtros_aplicados) para el encabezado.
+    """
+    filtro = FiltroRecibos(parametros)
+    recibos_queryset = Recibo.objects.filter(anulado=False).order_by('-fecha_creacion', '-id')
+    return filtro.aplicar(recibos_queryset), filtro.filtros_aplicados()
+
+
+def recibos_modificados_desde(parametros, momento):
+    """True si desde `momento` se registraron o anularon recibos del período del reporte.
+
+    Las ediciones no dejan marca de tiempo; a ésas las atiende la señal de guardado.
+    """
+    queryset = Recibo.objects.filter(Q(fecha_creacion__gte=momento) | Q(fecha_anulacion__gte=momento))
+    return queryset.filter(FiltroRecibos(parametros).q_fechas()).exists()
+
+
+def escribir_excel_reporte(queryset, filtros_aplicados, destino):
+    """Escribe el libro del reporte (hojas info_reporte y Recibos) sobre `destino`.
+
+    Las filas salen de values_list().iterator() directo a xlsxwriter en modo
+    constant_memory: cada fila se vuelca a disco al pasar a la siguiente, así la
+    memoria no crece con el número de recibos.
+    """
+    totales = queryset.aggregate(registros=Count('pk'), monto=Sum('total_monto_bs'))
+    total_registros = totales['registros']
+    total_monto_bs = totales['monto'] or Decimal(0)
+
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True})
+    # Formatos de celda
+    money_format = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
+    tasa_format = workbook.add_format({'num_format': '#,##0.0000', 'align': 'right'}) 
+    bold_format = workbook.add_format({'bold': True, 'bg_color': '#EAEAEA'})
+
+    # Resumen de filtros aplicados (en constant_memory las filas se escriben en orden)
+    worksheet_info = workbook.add_worksheet('info_reporte')
+    worksheet_info.set_column('A:A', 30)
+    worksheet_info.set_column('B:B', 40)
+    worksheet_info.write_row(0, 0, ['Parámetro', 'Valor'], bold_format)
     info_data = [
         ['Fecha de Generación', timezone.now().strftime('%Y-%m-%d %H:%M:%S')],
         ['Período del Reporte', filtros_aplicados.get('periodo', 'Todos los períodos')],
         ['Estado Filtrado', filtros_aplicados.get('estado', 'Todos los estados')],
         ['Categorías Filtradas', filtros_aplicados.get('categorias', 'Todas las categorías')],
-        ['Total de Registros', total_registros],
-        ['Monto Total (Bs)', total_monto_bs],
+        ['Importación', filtros_aplicados.get('importacion', 'Todas')],
     ]
-    info_df = pd.DataFrame(info_data, columns=['Parámetro', 'Valor'])
-    df_recibos = pd.DataFrame(data, columns=headers)
-    output = io.BytesIO()
+    for fila, (parametro, valor) in enumerate(info_data, start=1):
+        worksheet_info.write_row(fila, 0, [parametro, valor])
+    fila = len(info_data) + 1
+    worksheet_info.write_string(fila, 0, 'Total de Registros')
+    worksheet_info.write_number(fila, 1, total_registros)
+    worksheet_info.write_string(fila + 1, 0, 'Monto Total (Bs)')
+    worksheet_info.write_number(fila + 1, 1, total_monto_bs, money_format)
+
+    worksheet_recibos = workbook.add_worksheet('Recibos')
+    worksheet_recibos.set_column('A:A', 15)
+    worksheet_recibos.set_column('B:C', 25)
+    worksheet_recibos.set_column('D:D', 12)
+    worksheet_recibos.set_column('E:E', 15)
+    worksheet_recibos.set_column('F:F', 18, money_format) 
+    worksheet_recibos.set_column('G:G', 18, tasa_format) 
+    worksheet_recibos.set_column('H:H', 18, money_format) 
+    worksheet_recibos.set_column('I:I', 20)
+    worksheet_recibos.set_column('J:J', 40)
+    worksheet_recibos.set_column('K:K', 50)
+    worksheet_recibos.write_row(0, 0, ENCABEZADO_REPORTE_EXCEL, bold_format)
+
+    filas = queryset.values_list(*CAMPOS_REPORTE_EXCEL).iterator(chunk_size=FILAS_CONSULTA_REPORTE)
+    for fila, valores in enumerate(filas, start=1):
+        numero, nombre, rif, fecha, estado, monto, tasa, gastos, transferencia, concepto = valores[:10]
+        categorias_concatenadas = ','.join(
+            nombre_cat for nombre_cat, marcada in zip(NOMBRES_CATEGORIAS_EXCEL, valores[10:]) if marcada
+        )
+        worksheet_recibos.write_row(fila, 0, [
+            "{:04d}".format(numero) if numero is not None else None,
+            nombre,
+            rif,
+            fecha.strftime('%Y-%m-%d'),
+            estado,
+            monto,
+            tasa,
+            gastos,
+            transferencia,
+            concepto.strip() if concepto else "",
+            categorias_concatenadas
+        ])
 
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        info_df.to_excel(writer, index=False, sheet_name='info_reporte')
-        df_recibos.to_excel(writer, index=False, sheet_name='Recibos', startrow=0, header=True)
-
-        workbook = writer.book
-        worksheet_recibos = writer.sheets['Recibos']
-
-        # Formatos de celda
-        money_format = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
-        tasa_format = workbook.add_format({'num_format': '#,##0.0000', 'align': 'right'}) 
-        bold_format = workbook.add_format({'bold': True, 'bg_color': '#EAEAEA'})
-
-        worksheet_recibos.set_column('A:A', 15)
-        worksheet_recibos.set_column('B:C', 25)
-        worksheet_recibos.set_column('D:D', 12)
-        worksheet_recibos.set_column('E:E', 15)
-        worksheet_recibos.set_column('F:F', 18, money_format) 
-        worksheet_recibos.set_column('G:G', 18, tasa_format) 
-        worksheet_recibos.set_column('H:H', 18, money_format) 
-        worksheet_recibos.set_column('I:I', 20)
-        worksheet_recibos.set_column('J:J', 40)
-        worksheet_recibos.set_column('K:K', 50)
-
-        for col_num, value in enumerate(headers):
-            worksheet_recibos.write(0, col_num, value, bold_format)
-
-        worksheet_info = writer.sheets['info_reporte']
-        worksheet_info.set_column('A:A', 30)
-        worksheet_info.set_column('B:B', 40)
-        worksheet_info.write(0, 0, 'Parámetro', bold_format)
-        worksheet_info.write(0, 1, 'Valor', bold_format)
-        worksheet_info.write_number(5, 1, total_registros)
-        worksheet_info.write_number(6, 1, total_monto_bs, money_format)
-    
-    output.seek(0)
-    filename = f"Reporte_Recibos_Masivo_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response = HttpResponse(output, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment;filename="{filename}"'
-    return response
+    workbook.close()
+    return total_registros
+
+def reporte_recibos_excel(parametros, usuario, destino):
+    """Generador del trabajo de reporte Excel de recibos (ver apps.reportes)."""
+    queryset, filtros_aplicados = filtrar_recibos_reporte(parametros)
+    escribir_excel_reporte(queryset, filtros_aplicados, destino)
+    return f"Reporte_Recibos_Masivo_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+def reporte_recibos_totales_estado(parametros, usuario, destino):
+    """Generador del resumen de recibos y montos por mes y estado (ver apps.reportes)."""
+    queryset, filtros_aplicados = filtrar_recibos_reporte(parametros)
+    totales = queryset.order_by().annotate(
+        mes=TruncMonth('fecha_creacion')
+    ).values('mes', 'estado').annotate(
+        registros=Count('pk'), monto=Sum('total_monto_bs')
+    ).order_by('mes', 'estado')
+
+    workbook = xlsxwriter.Workbook(destino)
+    money_format = workbook.add_format({'num_format': '#,##0.00', 'align': 'right'})
+    bold_format = workbook.add_format({'bold': True, 'bg_color': '#EAEAEA'})
+    total_money_format = workbook.add_format({'bold': True, 'num_format': '#,##0.00', 'align': 'right'})
+
+    worksheet = workbook.add_worksheet('Totales por Estado')
+    worksheet.set_column('A:B', 22)
+    worksheet.set_column('C:D', 20)
+    worksheet.write_row(0, 0, ['Período del Reporte', filtros_aplicados['periodo']])
+    worksheet.write_row(1, 0, ['Categorías Filtradas', filtros_aplicados['categorias']])
+    worksheet.write_row(3, 0, ['Mes', 'Estado', 'Recibos', 'Monto Total (Bs.)'], bold_format)
+
+    fila, total_registros, total_monto = 4, 0, Decimal(0)
+    for item in totales:
+        monto = item['monto'] or Decimal(0)
+        worksheet.write_row(fila, 0, [item['mes'].strftime('%m/%Y'), item['estado'] or 'SIN ESTADO', item['registros']])
+        worksheet.write_number(fila, 3, monto, money_format)
+        total_registros += item['registros']
+        total_monto += monto
+        fila += 1
+    worksheet.write_row(fila, 0, ['TOTAL', '', total_registros], bold_format)
+    worksheet.write_number(fila, 3, total_monto, total_money_format)
+    workbook.close()
+    return f"Totales_Estado_Recibos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
 
 # --- CONFIGURACIÓN DE RUTAS Y CONSTANTES DE PDF ---
@@ -288,29 +733,128 @@ def draw_centered_text_right_unit(canvas_obj, y_pos, text, x_start, width, font_
 
 # MÓDULOS DE DIBUJO PARA PDF UNITARIO
 
+# --- PLANTILLA PRECOMPILADA DEL RECIBO ---
+# Lo que no cambia entre recibos (imagen del encabezado ya leída, estilos y
+# párrafos de categorías ya medidos) se construye una sola vez por proceso; cada
+# recibo sólo estampa sus datos variables. En cada documento el encabezado es un
+# form XObject (beginForm/doForm): la imagen se incrusta una vez por PDF.
+
+# Flujos binarios (sólo FlateDecode) en lugar de ASCII85: sin la extensión C de
+# reportlab (rl_accel) esa codificación corre en Python puro y era casi todo el costo
+# de incrustar el encabezado. Vale para todos los PDF del proceso.
+rl_config.useA85 = 0
+
+FORMA_ENCABEZADO_RECIBO = 'ReciboEncabezado'
+ANCHO_CATEGORIAS = 450
+
+CATEGORY_DESCRIPTIONS = {
+    'categoria1': ("TITULO DE TIERRA URBANA - TITULO DE ADJUDICACION EN PROPIEDAD", "Una milésima de Bolívar, Art. 58 de la Ley Especial de Regularización"),
+    'categoria2': ("TITULO DE TIERRA URBANA - TITULO DE ADJUDICACION MAS VIVIENDA", "Una milésima de Bolívar, más gastos administrativos (140 unidades BCV)"),
+    'categoria3': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Municipal", "Precio: Gastos Administrativos (140 unidades BCV)"),
+    'categoria4': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Tierra Privada", "Precio: Gastos Administrativos (140 unidades BCV)"),
+    'categoria5': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Tierra INAVI/INTU", "Precio: Gastos Administrativos (140 unidades BCV)"),
+    'categoria6': ("EXCEDENTES: Tierra Urbana hasta 400 mt2", "Según el Art 33 de la Ley Especial de Regularización"),
+    'categoria7': ("Con Título INAVI (Gastos Administrativos):", "140 unidades ancladas a la moneda de mayor valor BCV"),
+    'categoria8': ("ESTUDIOS TÉCNICOS:", "Medición detallada de la parcela para plano"),
+    'categoria9': ("ARRENDAMIENTOS DE LOCALES COMERCIALES:", "Unidades establecidas en contrato (BCV)"),
+    'categoria10': ("ARRENDAMIENTOS DE TERRENOS", "Unidades establecidas en contrato (BCV)"),
+}
+
+FIRMANTE_INSTITUCION = ("PRESLEY ORTEGA", "GERENTE DE ADMINISTRACIÓN Y SERVICIOS")
+TEXTOS_LEGALES_FIRMA = [
+    "Designado según Gaceta Oficial N° 43.062,",
+    "de fecha 16 de febrero de 2025 y",
+    "Providencia N° 016-2024 de fecha",
+    "16 de diciembre de 2024"
+]
+
+_plantilla_recibo = None
+_plantilla_lock = threading.Lock()
+# Los Paragraph guardan el canvas mientras se dibujan: una copia por hilo
+_parrafos_por_hilo = threading.local()
+
+
+def _imagen_encabezado():
+    """Lee una sola vez la imagen del encabezado y sus dimensiones."""
+    if not os.path.exists(HEADER_IMAGE):
+        return None
+    try:
+        lector = ImageReader(HEADER_IMAGE)
+        img_width, img_height = lector.getSize()
+        return {'lector': lector, 'ancho': img_width, 'alto': img_height}
+    except Exception as e:
+        logging.getLogger('CH_RECIBOS').error(f"⚠️ Error cargando encabezado PDF: {e}")
+        return None
+
+
+def obtener_plantilla_recibo():
+    """Partes estáticas del recibo compartidas por todos los PDF del proceso."""
+    global _plantilla_recibo
+    if _plantilla_recibo is None:
+        with _plantilla_lock:
+            if _plantilla_recibo is None:
+                styles = getSampleStyleSheet()
+                _plantilla_recibo = {
+                    'imagen': _imagen_encabezado(),
+                    'style_dato': ParagraphStyle('DatoStyle', parent=styles['Normal'], fontName='Helvetica', fontSize=8, leading=9, alignment=TA_LEFT),
+                    'style_titulo_cat': ParagraphStyle('CatTitulo', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=8, leading=9),
+                    'style_detalle_cat': ParagraphStyle('CatDetalle', parent=styles['Normal'], fontName='Helvetica', fontSize=7, leading=9, leftIndent=10),
+                    'style_nombre': ParagraphStyle('NombreStyle', fontName='Helvetica-Bold', fontSize=9, leading=10, alignment=TA_CENTER),
+                }
+    return _plantilla_recibo
+
+
+def _parrafos_categorias():
+    """Párrafos de las categorías ya maquetados: {clave: (titulo, alto, detalle, alto)}."""
+    parrafos = getattr(_parrafos_por_hilo, 'categorias', None)
+    if parrafos is None:
+        plantilla = obtener_plantilla_recibo()
+        parrafos = {}
+        for key, (title, detail) in CATEGORY_DESCRIPTIONS.items():
+            p_title = Paragraph(title.replace(":", ":<br/>"), plantilla['style_titulo_cat'])
+            w_t, h_t = p_title.wrap(ANCHO_CATEGORIAS, 100)
+            p_detail = Paragraph(detail, plantilla['style_detalle_cat'])
+            w_d, h_d = p_detail.wrap(ANCHO_CATEGORIAS - 10, 100)
+            parrafos[key] = (p_title, h_t, p_detail, h_d)
+        _parrafos_por_hilo.categorias = parrafos
+    return parrafos
+
+
+def limpiar_plantilla_recibo():
+    """Descarta las partes precompiladas (p. ej. tras cambiar la imagen del encabezado)."""
+    global _plantilla_recibo
+    with _plantilla_lock:
+        _plantilla_recibo = None
+    _parrafos_por_hilo.__dict__.clear()
+
+
 def _draw_recibo_header(c, width, height):
-    """Dibuja el encabezado gráfico y el título del documento."""
-    log_rec = logging.getLogger('CH_RECIBOS')
-    current_y = height - 50
+    """Dibuja el encabezado gráfico y el título del documento.
 
-    if os.path.exists(HEADER_IMAGE):
-        try:
-            img = ImageReader(HEADER_IMAGE)
-            img_width, img_height = img.getSize()
-            scale = min(1.0, 480 / img_width) 
-            draw_width = img_width * scale
-            draw_height = img_height * scale
-            x_center = (width - draw_width) / 2
-            y_top = height - draw_height - 20
-            c.drawImage(HEADER_IMAGE, x=x_center, y=y_top, width=draw_width, height=draw_height)
-            current_y = y_top - 25
-        except Exception as e:
-            log_rec.error(f"⚠️ Error cargando encabezado PDF: {e}")
+    Se define una vez por documento como form XObject; las páginas siguientes
+    (lotes de varios recibos) sólo lo referencian.
+    """
+    imagen = obtener_plantilla_recibo()['imagen']
+    current_y = height - 50
 
-    c.setFont("Helvetica-Bold", 13)
-    titulo_texto = "RECIBO DE PAGO"
-    titulo_x = (width - c.stringWidth(titulo_texto, "Helvetica-Bold", 13)) / 2
-    c.drawString(titulo_x, current_y, titulo_texto)
+    if imagen:
+        scale = min(1.0, 480 / imagen['ancho'])
+        draw_width = imagen['ancho'] * scale
+        draw_height = imagen['alto'] * scale
+        y_top = height - draw_height - 20
+        current_y = y_top - 25
+
+    if not c.hasForm(FORMA_ENCABEZADO_RECIBO):
+        c.beginForm(FORMA_ENCABEZADO_RECIBO)
+        if imagen:
+            c.drawImage(imagen['lector'], x=(width - draw_width) / 2, y=y_top, width=draw_width, height=draw_height)
+        c.setFont("Helvetica-Bold", 13)
+        titulo_texto = "RECIBO DE PAGO"
+        titulo_x = (width - c.stringWidth(titulo_texto, "Helvetica-Bold", 13)) / 2
+        c.drawString(titulo_x, current_y, titulo_texto)
+        c.endForm()
+
+    c.doForm(FORMA_ENCABEZADO_RECIBO)
     return current_y - 25
 
 def _draw_recibo_body_data(c, recibo_obj, y_start, X1_TITLE, X1_DATA, X2_TITLE, X2_DATA):
@@ -320,8 +864,7 @@ def _draw_recibo_body_data(c, recibo_obj, y_start, X1_TITLE, X1_DATA, X2_TITLE,
     fecha_str = recibo_obj.fecha.strftime("%d/%m/%Y")
     num_transf = recibo_obj.numero_transferencia if recibo_obj.numero_transferencia else 'N/A'
 
-    styles = getSampleStyleSheet()
-    style_dato = ParagraphStyle('DatoStyle', parent=styles['Normal'], fontName='Helvetica', fontSize=8, leading=9, alignment=TA_LEFT)
+    style_dato = obtener_plantilla_recibo()['style_dato']
     
     ancho_col1 = X2_TITLE - X1_DATA - 10 
     ancho_col2 = 550 - X2_DATA
@@ -356,10 +899,6 @@ def _draw_recibo_body_data(c, recibo_obj, y_start, X1_TITLE, X1_DATA, X2_TITLE,
 
 def _draw_categorias_section(c, recibo_obj, y_start, X1_TITLE):
     """Dibuja la sección descriptiva de las categorías de regularización."""
-    styles = getSampleStyleSheet()
-    style_titulo_cat = ParagraphStyle('CatTitulo', parent=styles['Normal'], fontName='Helvetica-Bold', fontSize=8, leading=9)
-    style_detalle_cat = ParagraphStyle('CatDetalle', parent=styles['Normal'], fontName='Helvetica', fontSize=7, leading=9, leftIndent=10)
-
     categorias = {f'categoria{i}': getattr(recibo_obj, f'categoria{i}') for i in range(1, 11)}
     current_y = y_start
 
@@ -368,26 +907,8 @@ def _draw_categorias_section(c, recibo_obj, y_start, X1_TITLE):
         c.drawString(X1_TITLE, current_y, "FORMA DE PAGO Y DESCRIPCIÓN DE LA REGULARIZACIÓN")
         current_y -= 20
 
-        CATEGORY_DESCRIPTIONS = {
-            'categoria1': ("TITULO DE TIERRA URBANA - TITULO DE ADJUDICACION EN PROPIEDAD", "Una milésima de Bolívar, Art. 58 de la Ley Especial de Regularización"),
-            'categoria2': ("TITULO DE TIERRA URBANA - TITULO DE ADJUDICACION MAS VIVIENDA", "Una milésima de Bolívar, más gastos administrativos (140 unidades BCV)"),
-            'categoria3': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Municipal", "Precio: Gastos Administrativos (140 unidades BCV)"),
-            'categoria4': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Tierra Privada", "Precio: Gastos Administrativos (140 unidades BCV)"),
-            'categoria5': ("VIVIENDA UNIFAMILIAR Y MULTIFAMILIAR (EDIFICIOS) TIERRA: Tierra INAVI/INTU", "Precio: Gastos Administrativos (140 unidades BCV)"),
-            'categoria6': ("EXCEDENTES: Tierra Urbana hasta 400 mt2", "Según el Art 33 de la Ley Especial de Regularización"),
-            'categoria7': ("Con Título INAVI (Gastos Administrativos):", "140 unidades ancladas a la moneda de mayor valor BCV"),
-            'categoria8': ("ESTUDIOS TÉCNICOS:", "Medición detallada de la parcela para plano"),
-            'categoria9': ("ARRENDAMIENTOS DE LOCALES COMERCIALES:", "Unidades establecidas en contrato (BCV)"),
-            'categoria10': ("ARRENDAMIENTOS DE TERRENOS", "Unidades establecidas en contrato (BCV)"),
-        }
-        
-        ancho_disponible = 450 
-
-        for key, (title, detail) in CATEGORY_DESCRIPTIONS.items():
+        for key, (p_title, h_t, p_detail, h_d) in _parrafos_categorias().items():
             if categorias.get(key, False):
-                p_title = Paragraph(title.replace(":", ":<br/>"), style_titulo_cat)
-                w_t, h_t = p_title.wrap(ancho_disponible, 100)
-                
                 if current_y - h_t < 100:
                     c.showPage()
                     current_y = 750 
@@ -397,9 +918,6 @@ def _draw_categorias_section(c, recibo_obj, y_start, X1_TITLE):
                 c.drawString(520, current_y - 8, "X")
                 current_y -= (h_t + 2)
 
-                p_detail = Paragraph(detail, style_detalle_cat)
-                w_d, h_d = p_detail.wrap(ancho_disponible - 10, 100)
-                
                 if current_y - h_d < 50:
                     c.showPage()
                     current_y = 750
@@ -426,10 +944,7 @@ def _draw_signatures_section(c, recibo_obj, y_start, width):
     y_sig = current_y - 12
     draw_centered_text_right_unit(c, y_sig, "Firma", left_line_x, line_width, font_size=8)
     
-    styles = getSampleStyleSheet()
-    nombre_style = ParagraphStyle('NombreStyle', fontName='Helvetica-Bold', fontSize=9, leading=10, alignment=TA_CENTER)
-    
-    p_nombre = Paragraph(recibo_obj.nombre.upper(), nombre_style)
+    p_nombre = Paragraph(recibo_obj.nombre.upper(), obtener_plantilla_recibo()['style_nombre'])
     w_p, h_p = p_nombre.wrap(line_width, 100) 
     y_pos_nombre = y_sig - h_p - 5 
     p_nombre.drawOn(c, left_line_x, y_pos_nombre)
@@ -442,61 +957,261 @@ def _draw_signatures_section(c, recibo_obj, y_start, width):
     draw_centered_text_right_unit(c, y_sig_inst, "Recibido por:", right_line_x, line_width, font_size=8)
     
     y_sig_inst -= 14
-    draw_centered_text_right_unit(c, y_sig_inst, "PRESLEY ORTEGA", right_line_x, line_width, is_bold=True, font_size=9)
+    draw_centered_text_right_unit(c, y_sig_inst, FIRMANTE_INSTITUCION[0], right_line_x, line_width, is_bold=True, font_size=9)
     
     y_sig_inst -= 12
-    draw_centered_text_right_unit(c, y_sig_inst, "GERENTE DE ADMINISTRACIÓN Y SERVICIOS", right_line_x, line_width, is_bold=False, font_size=9)
+    draw_centered_text_right_unit(c, y_sig_inst, FIRMANTE_INSTITUCION[1], right_line_x, line_width, is_bold=False, font_size=9)
     
     y_sig_inst -= 14
-    textos_legales = [
-        "Designado según Gaceta Oficial N° 43.062,",
-        "de fecha 16 de febrero de 2025 y",
-        "Providencia N° 016-2024 de fecha",
-        "16 de diciembre de 2024"
-    ]
-    
-    for linea in textos_legales:
+    for linea in TEXTOS_LEGALES_FIRMA:
         draw_centered_text_right_unit(c, y_sig_inst, linea, right_line_x, line_width, font_size=7)
         y_sig_inst -= 9
 
     return current_y
 
 # FUNCIÓN PRINCIPAL DE PDF UNITARIO
-def generar_pdf_recibo_unitario(recibo_obj):
-    """Crea el PDF individual de un recibo con todas sus secciones."""
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
+def dibujar_recibo_pdf(c, recibo_obj):
+    """Dibuja un recibo completo sobre el canvas (una página, o dos si las categorías no caben)."""
     width, height = letter
-    
+
     # Márgenes y coordenadas base
     X1_TITLE, X1_DATA = 60, 160
     X2_TITLE, X2_DATA = 310, 470
-    
+
     current_y = _draw_recibo_header(c, width, height)
     current_y = _draw_recibo_body_data(c, recibo_obj, current_y, X1_TITLE, X1_DATA, X2_TITLE, X2_DATA)
-    
-    if current_y < 350: 
+
+    if current_y < 350:
         logging.getLogger('CH_RECIBOS').warning("Espacio reducido para categorías en PDF unitario.")
-        
+
     current_y = _draw_categorias_section(c, recibo_obj, current_y, X1_TITLE)
-    
+
     if current_y < 150:
         c.showPage()
         current_y = height - 100
-    
-    _draw_signatures_section(c, recibo_obj, current_y, width)
 
+    _draw_signatures_section(c, recibo_obj, current_y, width)
     c.showPage()
+
+def renderizar_pdf_recibo(recibo_obj):
+    """Devuelve los bytes del PDF individual de un recibo."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    dibujar_recibo_pdf(c, recibo_obj)
     c.save()
-    buffer.seek(0)
-    
+    return buffer.getvalue()
+
+def nombre_archivo_pdf_recibo(recibo_obj):
     num_recibo = str(recibo_obj.numero_recibo).zfill(9) if recibo_obj.numero_recibo else 'N_A'
-    filename = f"Recibo_N_{num_recibo}_{recibo_obj.rif_cedula_identidad}.pdf"
-    
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return f"Recibo_N_{num_recibo}_{recibo_obj.rif_cedula_identidad}.pdf"
+
+def generar_pdf_recibo_unitario(recibo_obj):
+    """Crea el PDF individual de un recibo con todas sus secciones."""
+    response = HttpResponse(renderizar_pdf_recibo(recibo_obj), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo_pdf_recibo(recibo_obj)}"'
     return response
 
+def renderizar_pdf_lote_recibos(recibos, destino, titulo="Lote de recibos"):
+    """Dibuja todos los recibos en un único PDF de varias páginas sobre `destino`.
+
+    Un solo canvas para el lote: fuentes, imagen y encabezado (form XObject) se
+    incluyen una vez y cada página sólo los referencia. Devuelve cuántos recibos se dibujaron.
+    """
+    c = canvas.Canvas(destino, pagesize=letter)
+    c.setTitle(titulo)
+    # Listo para imprimir: tamaño real, sin "ajustar a la página"
+    c.setViewerPreference('PrintScaling', 'None')
+    total = 0
+    for recibo in recibos:
+        dibujar_recibo_pdf(c, recibo)
+        total += 1
+    if total:
+        c.save()
+    return total
+
+
+# III.b CACHÉ EN DISCO DE PDF UNITARIOS
+
+# Subir la versión cuando cambie el diseño del recibo: invalida todos los PDF guardados
+VERSION_PLANTILLA_PDF = 1
+DIRECTORIO_CACHE_PDF = 'recibos_pdf'
+# Campos impresos en el PDF (más 'anulado', para que anular también regenere)
+CAMPOS_PDF_RECIBO = [
+    'numero_recibo', 'estado', 'nombre', 'rif_cedula_identidad', 'direccion_inmueble',
+    'total_monto_bs', 'numero_transferencia', 'fecha', 'concepto', 'anulado',
+] + [f'categoria{i}' for i in range(1, 11)]
+
+def huella_pdf_recibo(recibo_obj):
+    """Resumen de los campos impresos; cambia en cuanto cambia algo visible en el PDF."""
+    valores = [str(VERSION_PLANTILLA_PDF)] + [repr(getattr(recibo_obj, campo)) for campo in CAMPOS_PDF_RECIBO]
+    return hashlib.sha1('\x1f'.join(valores).encode('utf-8')).hexdigest()[:16]
+
+def _directorio_cache_pdf(pk):
+    return os.path.join(settings.MEDIA_ROOT, DIRECTORIO_CACHE_PDF, str(pk // 1000))
+
+def _ruta_cache_pdf(recibo_obj):
+    return os.path.join(_directorio_cache_pdf(recibo_obj.pk), f"{recibo_obj.pk}_{huella_pdf_recibo(recibo_obj)}.pdf")
+
+def ruta_pdf_en_cache(recibo_obj):
+    """Ruta del PDF vigente si ya está en caché; None si hay que generarlo."""
+    ruta = _ruta_cache_pdf(recibo_obj)
+    return ruta if os.path.exists(ruta) else None
+
+def ruta_pdf_recibo(recibo_obj):
+    """Devuelve la ruta del PDF en caché, generándolo solo si falta o quedó desactualizado."""
+    directorio = _directorio_cache_pdf(recibo_obj.pk)
+    ruta = _ruta_cache_pdf(recibo_obj)
+    if os.path.exists(ruta):
+        return ruta
+
+    os.makedirs(directorio, exist_ok=True)
+    invalidar_pdf_recibo(recibo_obj.pk)
+    # Escritura atómica: un lector concurrente nunca ve un PDF a medias
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(renderizar_pdf_recibo(recibo_obj))
+        os.replace(temporal, ruta)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return ruta
+
+def invalidar_pdf_recibo(pk):
+    """Elimina las versiones en caché del PDF de un recibo."""
+    for ruta in glob.glob(os.path.join(_directorio_cache_pdf(pk), f"{pk}_*.pdf")):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+def vaciar_recibos():
+    """Elimina todos los recibos con un solo DELETE y limpia una vez lo derivado de ellos.
+
+    No pasa por delete() del ORM: las señales por fila (resumen diario, caché de PDF,
+    auditoría) convertirían el vaciado en un borrado recibo por recibo. Devuelve cuántos eliminó.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Recibo._meta.db_table}')
+            eliminados = cursor.rowcount
+            cursor.execute(f'DELETE FROM {ResumenDiario._meta.db_table}')
+        estados_registrados.invalidar()
+        descartar_pregenerados('recibos_')
+        transaction.on_commit(lambda: shutil.rmtree(
+            os.path.join(settings.MEDIA_ROOT, DIRECTORIO_CACHE_PDF), ignore_errors=True
+        ))
+    return eliminados
+
+class _SalidaPorPartes:
+    """Destino de escritura sin seek (zipfile, Parquet): acumula lo escrito hasta que se retira."""
+
+    def __init__(self):
+        self._partes = []
+        self.pendiente = 0
+        self.escrito = 0
+        self.closed = False
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self.pendiente += len(datos)
+        self.escrito += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.escrito
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        self.pendiente = 0
+        return datos
+
+def zip_en_streaming(archivos, tamano_bloque=64 * 1024):
+    """Arma un ZIP a partir de (ruta, nombre) y lo entrega por partes, una por archivo.
+
+    El archivo de cada entrada se lee por bloques, así que la memoria no depende del
+    tamaño del lote. Sin seek, zipfile escribe los tamaños en un descriptor tras cada entrada.
+    """
+    salida = _SalidaPorPartes()
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for ruta, nombre in archivos:
+            with open(ruta, 'rb') as origen, zipf.open(nombre, 'w') as destino:
+                while True:
+                    bloque = origen.read(tamano_bloque)
+                    if not bloque:
+                        break
+                    destino.write(bloque)
+                    if salida.pendiente >= tamano_bloque:
+                        yield salida.retirar()
+            yield salida.retirar()
+    yield salida.retirar()
+
+# EXPORTACIÓN CSV / PARQUET (tabla completa, sin límite de filas de Excel)
+
+# Columnas exportadas y su tipo en Parquet (ver parquet.py)
+ESQUEMA_EXPORTACION = [
+    ('numero_recibo', 'entero'), ('fecha', 'fecha'), ('fecha_creacion', 'marca_tiempo'),
+    ('estado', 'texto'), ('nombre', 'texto'), ('rif_cedula_identidad', 'texto'),
+    ('direccion_inmueble', 'texto'), ('ente_liquidado', 'texto'), ('concepto', 'texto'),
+    ('gastos_administrativos', ('decimal', 19, 2)), ('tasa_dia', ('decimal', 19, 4)),
+    ('total_monto_bs', ('decimal', 19, 2)), ('numero_transferencia', 'texto'), ('conciliado', 'booleano'),
+] + [(f'categoria{i}', 'booleano') for i in range(1, 11)] + [('importacion_id', 'entero')]
+CAMPOS_EXPORTACION = [campo for campo, _ in ESQUEMA_EXPORTACION]
+# Filas por grupo de Parquet: es lo único que se retiene en memoria durante la descarga
+FILAS_GRUPO_PARQUET = 20000
+
+class _LineaCSV:
+    """Destino de csv.writer que devuelve la línea escrita en lugar de guardarla."""
+
+    def write(self, linea):
+        return linea
+
+def csv_en_streaming(queryset):
+    """Entrega el CSV de los recibos por bloques de filas, leyendo con iterator().
+
+    En PostgreSQL iterator() usa un cursor del servidor, así que ni el queryset ni
+    el archivo se materializan en memoria.
+    """
+    escritor = csv.writer(_LineaCSV())
+    creacion = CAMPOS_EXPORTACION.index('fecha_creacion')
+    booleanos = [i for i, (_, tipo) in enumerate(ESQUEMA_EXPORTACION) if tipo == 'booleano']
+
+    yield escritor.writerow(CAMPOS_EXPORTACION).encode('utf-8')
+    lineas = []
+    for fila in queryset.values_list(*CAMPOS_EXPORTACION).iterator(chunk_size=FILAS_CONSULTA_REPORTE):
+        fila = list(fila)
+        fila[creacion] = timezone.localtime(fila[creacion]).isoformat(timespec='seconds')
+        for i in booleanos:
+            fila[i] = int(fila[i])
+        lineas.append(escritor.writerow(fila))
+        if len(lineas) >= FILAS_CONSULTA_REPORTE:
+            yield ''.join(lineas).encode('utf-8')
+            lineas = []
+    yield ''.join(lineas).encode('utf-8')
+
+def parquet_en_streaming(queryset):
+    """Entrega el Parquet de los recibos grupo de filas a grupo de filas.
+
+    Con pyarrow instalado se usa su escritor (comprimido); si no, el escritor local de parquet.py.
+    """
+    salida = _SalidaPorPartes()
+    escritor = escritor_parquet(salida, ESQUEMA_EXPORTACION)
+    grupo = []
+    for fila in queryset.values_list(*CAMPOS_EXPORTACION).iterator(chunk_size=FILAS_CONSULTA_REPORTE):
+        grupo.append(fila)
+        if len(grupo) >= FILAS_GRUPO_PARQUET:
+            escritor.escribir_grupo(grupo)
+            grupo = []
+            yield salida.retirar()
+    escritor.escribir_grupo(grupo)
+    escritor.cerrar()
+    yield salida.retirar()
+
 # FUNCIÓN PRINCIPAL DE PDF REPORTE MASIVO
 
 def draw_report_logo_and_page_number(canvas, doc):
@@ -521,70 +1236,135 @@ def draw_report_logo_and_page_number(canvas, doc):
     canvas.drawString(36, 30, f"Reporte generado el: {timezone.now().strftime('%d/%m/%Y %H:%M')}")
     canvas.restoreState()
 
-def generar_pdf_reporte(queryset, filtros_aplicados):
-    """Genera un reporte tabular en PDF (paisaje) de los recibos filtrados."""
-    def formatear_celda(texto, max_chars, estilo):
-        if not texto: return Paragraph('', estilo)
-        texto = str(texto).strip()
-        if max_chars and len(texto) > max_chars:
-            texto = texto[:max_chars] + "..."
-        return Paragraph(texto, estilo)
+# Reporte tabular por tramos: cada página es una tabla pequeña, así el costo de
+# maquetación crece lineal con las filas y la memoria no depende del total.
+CAMPOS_REPORTE_PDF = ['numero_recibo', 'nombre', 'rif_cedula_identidad', 'total_monto_bs',
+                      'fecha', 'estado', 'numero_transferencia', 'concepto']
+ENCABEZADO_REPORTE_PDF = ['Recibo', 'Nombre', 'Cédula/RIF', 'Monto (Bs)', 'Fecha', 'Estado', 'Transferencia', 'Concepto']
+ANCHOS_REPORTE_PDF = [0.6*inch, 2.1*inch, 1.1*inch, 1.0*inch, 0.8*inch, 0.9*inch, 1.6*inch, 2.1*inch]
+# Relleno de celda por defecto de Table (6 horizontal, 3 arriba y 3 abajo)
+RELLENO_CELDA_H, RELLENO_CELDA_V = 12, 6
+# Alto de una celda de texto simple con el tamaño por defecto de Table (fuente 10, interlineado 12)
+ALTO_LINEA_TABLA = 12
+ESTILO_TABLA_REPORTE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), CUSTOM_BLUE_DARK_TABLE),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, CUSTOM_GREY_VERY_LIGHT]),
+    # Texto simple con la misma letra que los párrafos de celda (8/10)
+    ('FONTSIZE', (1, 1), (3, -1), 8),
+    ('LEADING', (1, 1), (3, -1), 10),
+    ('FONTSIZE', (5, 1), (7, -1), 8),
+    ('LEADING', (5, 1), (7, -1), 10),
+    ('ALIGN', (3, 1), (3, -1), 'RIGHT'),
+])
+
+
+def _celda_reporte(texto, max_chars, ancho, estilo):
+    """Devuelve (celda, alto): texto simple si cabe en una línea; Paragraph sólo si hay que ajustar."""
+    if not texto:
+        return '', estilo.leading
+    texto = str(texto).strip()
+    if max_chars and len(texto) > max_chars:
+        texto = texto[:max_chars] + "..."
+    ancho_util = ancho - RELLENO_CELDA_H
+    if stringWidth(texto, estilo.fontName, estilo.fontSize) <= ancho_util:
+        return texto, estilo.leading
+    parrafo = Paragraph(escape(texto), estilo)
+    return parrafo, parrafo.wrap(ancho_util, 10 ** 6)[1]
+
+
+def _fila_reporte_pdf(fila, estilos):
+    """Convierte una fila de values_list en celdas de tabla y calcula su alto."""
+    numero, nombre, rif, monto, fecha, estado, transferencia, concepto = fila
+    celdas = [
+        (nombre, 60, ANCHOS_REPORTE_PDF[1]), (rif, None, ANCHOS_REPORTE_PDF[2]),
+        (estado, 15, ANCHOS_REPORTE_PDF[5]), (transferencia, 40, ANCHOS_REPORTE_PDF[6]),
+        (concepto, 70, ANCHOS_REPORTE_PDF[7]),
+    ]
+    (c_nombre, h1), (c_rif, h2), (c_estado, h3), (c_transf, h4), (c_concepto, h5) = [
+        _celda_reporte(texto, max_chars, ancho, estilos['celda']) for texto, max_chars, ancho in celdas
+    ]
+    fila_tabla = [
+        "{:04d}".format(numero) if numero else '', c_nombre, c_rif, format_currency(monto),
+        fecha.strftime('%d/%m/%Y'), c_estado, c_transf, c_concepto,
+    ]
+    return fila_tabla, max(ALTO_LINEA_TABLA, h1, h2, h3, h4, h5) + RELLENO_CELDA_V
+
 
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(letter), leftMargin=30, rightMargin=30, topMargin=110, bottomMargin=40)
+def _tabla_reporte(filas):
+    tabla = Table([ENCABEZADO_REPORTE_PDF] + filas, colWidths=ANCHOS_REPORTE_PDF, repeatRows=1)
+    tabla.setStyle(ESTILO_TABLA_REPORTE)
+    return tabla
+
+
+def escribir_pdf_reporte(filas, total_registros, total_monto_bs, filtros_aplicados, destino):
+    """Escribe el reporte tabular en PDF (paisaje) sobre `destino`.
+
+    `filas` es un iterable de tuplas en el orden de CAMPOS_REPORTE_PDF (p. ej. un
+    values_list().iterator()). Cada página recibe una tabla con las filas que caben y
+    se dibuja en cuanto está completa (Frame sobre el canvas), así platypus nunca
+    maqueta ni parte una tabla gigante y sólo una página vive en memoria.
+    """
+    # Sólo aporta la geometría de página (tamaño, márgenes y marco): las páginas se dibujan abajo
+    doc = SimpleDocTemplate(destino, pagesize=landscape(letter), leftMargin=30, rightMargin=30, topMargin=110, bottomMargin=40)
 
-    Story = []
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name='CenteredTitle', alignment=TA_CENTER, fontSize=16, fontName='Helvetica-Bold'))
     styles.add(ParagraphStyle(name='FilterTextLeft', alignment=TA_LEFT, fontSize=9, leading=12))
-    styles.add(ParagraphStyle(name='CustomCellStyle', fontSize=8, leading=10, wordWrap='LTR'))
-    styles.add(ParagraphStyle(name='AmountCellStyle', fontSize=8, leading=10, alignment=TA_RIGHT))
     styles.add(ParagraphStyle(name='ResumenTitleLeft', alignment=TA_LEFT, fontSize=11, fontName='Helvetica-Bold', spaceBefore=5))
-
-    total_registros = queryset.count()
-    total_monto_bs = queryset.aggregate(total=Sum('total_monto_bs'))['total'] or Decimal(0)
-
-    Story.append(Paragraph("REPORTE DE RECIBOS DE PAGO", styles['CenteredTitle']))
-    Story.append(Spacer(1, 10))
+    estilos = {'celda': ParagraphStyle(name='CustomCellStyle', fontSize=8, leading=10, wordWrap='LTR')}
 
     filtros_linea = f"<b>Período:</b> {filtros_aplicados.get('periodo', 'Todos')} | <b>Estado:</b> {filtros_aplicados.get('estado', 'Todos')} | <b>Categorías:</b> {filtros_aplicados.get('categorias', 'Todas')}"
-    Story.append(Paragraph(filtros_linea, styles['FilterTextLeft']))
-    Story.append(Spacer(1, 8))
-
-    table_data = [['Recibo', 'Nombre', 'Cédula/RIF', 'Monto (Bs)', 'Fecha', 'Estado', 'Transferencia', 'Concepto']]
-    col_widths = [0.6*inch, 2.1*inch, 1.1*inch, 1.0*inch, 0.8*inch, 0.9*inch, 1.6*inch, 2.1*inch]
-
-    for recibo in queryset:
-        table_data.append([
-            "{:04d}".format(recibo.numero_recibo) if recibo.numero_recibo else '', 
-            formatear_celda(recibo.nombre, 60, styles['CustomCellStyle']),
-            formatear_celda(recibo.rif_cedula_identidad, None, styles['CustomCellStyle']), 
-            formatear_celda(format_currency(recibo.total_monto_bs), None, styles['AmountCellStyle']), 
-            recibo.fecha.strftime('%d/%m/%Y'),
-            formatear_celda(recibo.estado, 15, styles['CustomCellStyle']),
-            formatear_celda(recibo.numero_transferencia, 40, styles['CustomCellStyle']),
-            formatear_celda(recibo.concepto, 70, styles['CustomCellStyle']) 
-        ])
+    if filtros_aplicados.get('importacion'):
+        filtros_linea += f" | <b>Lote:</b> {filtros_aplicados['importacion']}"
+    preambulo = [
+        Paragraph("REPORTE DE RECIBOS DE PAGO", styles['CenteredTitle']),
+        Spacer(1, 10),
+        Paragraph(filtros_linea, styles['FilterTextLeft']),
+        Spacer(1, 8),
+    ]
 
-    table = Table(table_data, colWidths=col_widths, repeatRows=1) 
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), CUSTOM_BLUE_DARK_TABLE),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.lightgrey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, CUSTOM_GREY_VERY_LIGHT]),
-    ]))
-
-    Story.append(table)
-    Story.append(Spacer(1, 20))
-    Story.append(Paragraph("RESUMEN DEL REPORTE:", styles['ResumenTitleLeft']))
-    Story.append(Paragraph(f"<b>Total de Recibos:</b> {total_registros}", styles['FilterTextLeft']))
-    Story.append(Paragraph(f"<b>Monto Total Bs:</b> {format_currency(total_monto_bs)}", styles['FilterTextLeft']))
-
-    doc.build(Story, onFirstPage=draw_report_logo_and_page_number, onLaterPages=draw_report_logo_and_page_number)
-    buffer.seek(0)
-    filename = f"Reporte_Recibos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment;filename="{filename}"'
-    return response
\ No newline at end of file
+    lienzo = canvas.Canvas(destino, pagesize=doc.pagesize)
+
+    def dibujar_pagina(historia):
+        # Mismo marco que SimpleDocTemplate; addFromList quita de `historia` lo que dibuja
+        draw_report_logo_and_page_number(lienzo, doc)
+        Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height).addFromList(historia, lienzo)
+        lienzo.showPage()
+
+    # Alto útil del marco (6 pt de relleno arriba y abajo) menos un margen por redondeos
+    alto_pagina = doc.height - 12 - 2
+    disponible = alto_pagina - sum(f.wrap(doc.width, doc.height)[1] for f in preambulo)
+    alto_encabezado = ALTO_LINEA_TABLA + RELLENO_CELDA_V
+    historia, pagina, alto = list(preambulo), [], alto_encabezado
+    for fila in filas:
+        fila_tabla, alto_fila = _fila_reporte_pdf(fila, estilos)
+        if pagina and alto + alto_fila > disponible:
+            historia.append(_tabla_reporte(pagina))
+            dibujar_pagina(historia)
+            pagina, alto, disponible = [], alto_encabezado, alto_pagina
+        pagina.append(fila_tabla)
+        alto += alto_fila
+    if pagina:
+        historia.append(_tabla_reporte(pagina))
+
+    historia += [
+        Spacer(1, 20),
+        Paragraph("RESUMEN DEL REPORTE:", styles['ResumenTitleLeft']),
+        Paragraph(f"<b>Total de Recibos:</b> {total_registros}", styles['FilterTextLeft']),
+        Paragraph(f"<b>Monto Total Bs:</b> {format_currency(total_monto_bs)}", styles['FilterTextLeft']),
+    ]
+    while historia:
+        dibujar_pagina(historia)
+    lienzo.save()
+
+def reporte_recibos_pdf(parametros, usuario, destino):
+    """Generador del trabajo de reporte PDF de recibos (ver apps.reportes)."""
+    queryset, filtros_aplicados = filtrar_recibos_reporte(parametros)
+    totales = queryset.aggregate(registros=Count('pk'), monto=Sum('total_monto_bs'))
+    filas = queryset.values_list(*CAMPOS_REPORTE_PDF).iterator(chunk_size=FILAS_CONSULTA_REPORTE)
+    escribir_pdf_reporte(filas, totales['registros'], totales['monto'] or Decimal(0), filtros_aplicados, destino)
+    return f"Reporte_Recibos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
@@ -1,31 +1,36 @@
-import io
 import os
 import logging
-import zipfile
-import pytz
+import tempfile
 from datetime import datetime
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
-from django.db.models import Q, Sum, Count, Max
+from django.http import JsonResponse, FileResponse, StreamingHttpResponse
+from django.db.models import Sum
 from django.contrib import messages
 from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
 from django.views.generic import ListView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin, PermissionRequiredMixin
-from django.core.paginator import Paginator              
-from django.db.models.functions import TruncDay        
 from django.contrib.auth import get_user_model      
 User = get_user_model()                                  
 
-from .models import Recibo
+from .models import Recibo, ImportacionRecibos, ResumenDiario
 from .forms import ReciboForm
+from .filtros import FiltroRecibos
+from .busqueda import q_busqueda
+from .paginacion import paginar_por_cursor
+from .estadisticas import metricas_estadisticas
+from .resumen import estados_registrados
 from .constants import CATEGORY_CHOICES, ESTADO_CHOICES_MAP
 from .utils import (
-    importar_recibos_desde_excel, generar_reporte_excel, 
-    generar_pdf_reporte, generar_pdf_recibo_unitario
+    generar_excel_errores_importacion,
+    ruta_pdf_recibo, nombre_archivo_pdf_recibo, zip_en_streaming,
+    renderizar_pdf_lote_recibos, filtrar_recibos_reporte, csv_en_streaming, parquet_en_streaming,
+    vaciar_recibos
 )
+from .tareas import encolar_importacion, rutas_pdf_recibos
+from apps.reportes.views import encolar_reporte
 
 # Configuración de rutas para recursos estáticos
 try:
@@ -42,54 +47,126 @@ def generar_pdf_recibo(request, pk):
     log_rec = logging.getLogger('CH_RECIBOS')
     try:
         recibo = get_object_or_404(Recibo, pk=pk)
-        return generar_pdf_recibo_unitario(recibo)
+        # Reimpresiones: se sirve el PDF guardado en disco (se genera solo si falta o cambió)
+        return FileResponse(
+            open(ruta_pdf_recibo(recibo), 'rb'),
+            as_attachment=True,
+            filename=nombre_archivo_pdf_recibo(recibo),
+            content_type='application/pdf'
+        )
     except Exception as e:
         log_rec.error(f"Error al generar PDF unitario para PK={pk}: {e}")
         messages.error(request, f"Error al generar el PDF: {e}")
         return redirect('recibos:dashboard')
 
+def _importacion_autorizada(request, pk):
+    """Importación visible para el usuario (su dueño o un superusuario); None si no lo es."""
+    importacion = get_object_or_404(ImportacionRecibos, pk=pk)
+    if request.user.is_superuser or importacion.usuario_id == request.user.pk:
+        return importacion
+    return None
+
 @login_required
-def generar_zip_recibos(request):
-    """Genera un archivo comprimido con múltiples recibos en PDF."""
+def generar_zip_recibos(request, pk):
+    """Genera un archivo comprimido con los recibos en PDF de una importación."""
+    importacion = _importacion_autorizada(request, pk)
+    if importacion is None:
+        messages.error(request, "No tienes permisos para ver esta importación.")
+        return redirect('recibos:dashboard')
+
+    # Los recibos del lote se resuelven por la FK indexada, no por una lista de IDs
+    recibos = importacion.recibos.order_by('numero_recibo')
+    if not recibos.exists():
+        messages.error(request, f"La importación #{importacion.pk} no tiene recibos para generar el ZIP.")
+        return redirect('recibos:dashboard')
+
+    # Los PDF se renderizan en paralelo y cada entrada se envía apenas está lista
+    archivos = (
+        (ruta, nombre_archivo_pdf_recibo(recibo))
+        for recibo, ruta in rutas_pdf_recibos(recibos.iterator())
+    )
+    filename_zip = f"Recibos_Importacion_{importacion.pk}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    response = StreamingHttpResponse(zip_en_streaming(archivos), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename_zip}"'
+    return response
+
+@login_required
+def generar_pdf_lote_recibos(request, pk):
+    """Genera un único PDF de varias páginas con los recibos de una importación, listo para imprimir."""
     log_rec = logging.getLogger('CH_RECIBOS')
-    pks_str = request.GET.get('pks')
-    if not pks_str:
-        messages.error(request, "No se encontraron IDs de recibos para generar el ZIP.")
+    importacion = _importacion_autorizada(request, pk)
+    if importacion is None:
+        messages.error(request, "No tienes permisos para ver esta importación.")
         return redirect('recibos:dashboard')
 
+    recibos = importacion.recibos.order_by('numero_recibo')
+    # El PDF se arma en un temporal en disco: la respuesta no retiene el documento en memoria
+    archivo = tempfile.TemporaryFile()
     try:
-        pks = [int(pk) for pk in pks_str.split(',') if pk] 
-        recibos = Recibo.objects.filter(pk__in=pks)
-    except (ValueError, Exception) as e:
-        log_rec.error(f"Error al procesar PKS para ZIP: {e}")
-        messages.error(request, "Error en el formato de los IDs o al buscar registros.")
+        total = renderizar_pdf_lote_recibos(recibos.iterator(), archivo, titulo=f"Recibos de la importación #{importacion.pk}")
+    except Exception as e:
+        archivo.close()
+        log_rec.error(f"Error al generar PDF de la importación #{importacion.pk}: {e}", exc_info=True)
+        messages.error(request, "Error al generar el PDF del lote de recibos.")
         return redirect('recibos:dashboard')
 
-    zip_buffer = io.BytesIO()
-    count_success = 0
-
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for recibo in recibos:
-            try:
-                pdf_response = generar_pdf_recibo_unitario(recibo)
-                pdf_buffer_value = pdf_response.content
-                num_recibo_zfill = str(recibo.numero_recibo).zfill(9) if recibo.numero_recibo else '0000'
-                filename = f"Recibo_N_{num_recibo_zfill}_{recibo.rif_cedula_identidad}.pdf"
-                zipf.writestr(filename, pdf_buffer_value)
-                count_success += 1
-            except Exception as e:
-                log_rec.error(f"Error en PDF para ZIP (PK={recibo.pk}): {e}")
-
-    if count_success == 0:
-        messages.error(request, "No se pudo generar ningún PDF. El ZIP está vacío.")
+    if total == 0:
+        archivo.close()
+        messages.error(request, f"La importación #{importacion.pk} no tiene recibos para generar el PDF.")
         return redirect('recibos:dashboard')
 
-    zip_buffer.seek(0)
-    filename_zip = f"Recibos_Masivos_{timezone.now().strftime('%Y%m%d_%H%M%S')}.zip"
-    response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{filename_zip}"'
-    messages.success(request, f"Se generó el ZIP con {count_success} recibo(s) exitosamente.")
-    return response
+    archivo.seek(0)
+    filename_pdf = f"Recibos_Importacion_{importacion.pk}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return FileResponse(archivo, as_attachment=False, filename=filename_pdf, content_type='application/pdf')
+
+@login_required
+def progreso_importacion(request, pk):
+    """Estado de una importación en segundo plano (consultado por el dashboard)."""
+    importacion = _importacion_autorizada(request, pk)
+    if importacion is None:
+        return JsonResponse({'error': 'No autorizado.'}, status=403)
+
+    url_descarga = url_impresion = None
+    if importacion.estado == ImportacionRecibos.COMPLETADA and importacion.filas_insertadas:
+        if importacion.filas_insertadas == 1:
+            recibo_pk = importacion.recibos.values_list('pk', flat=True).first()
+            url_descarga = reverse('recibos:generar_pdf_recibo', args=[recibo_pk]) if recibo_pk else None
+        else:
+            url_descarga = reverse('recibos:generar_zip_recibos', args=[importacion.pk])
+            url_impresion = reverse('recibos:generar_pdf_lote_recibos', args=[importacion.pk])
+
+    url_errores = None
+    if importacion.estado == ImportacionRecibos.COMPLETADA and importacion.errores:
+        url_errores = reverse('recibos:errores_importacion', args=[importacion.pk])
+
+    return JsonResponse({
+        'id': importacion.pk,
+        'estado': importacion.estado,
+        'finalizada': importacion.finalizada,
+        'solo_validacion': importacion.solo_validacion,
+        'archivo': importacion.nombre_archivo,
+        'filas_leidas': importacion.filas_leidas,
+        'filas_insertadas': importacion.filas_insertadas,
+        # Muestra para el log del dashboard; el listado completo va en la hoja de errores
+        'total_errores': len(importacion.errores),
+        'errores': importacion.errores[:20],
+        'mensaje': importacion.mensaje,
+        'url_descarga': url_descarga,
+        'url_impresion': url_impresion,
+        'url_errores': url_errores,
+    })
+
+@login_required
+def errores_importacion(request, pk):
+    """Descarga la hoja con todos los problemas encontrados al validar un archivo."""
+    importacion = _importacion_autorizada(request, pk)
+    if importacion is None:
+        messages.error(request, "No tienes permisos para ver esta importación.")
+        return redirect('recibos:dashboard')
+    if not importacion.errores:
+        messages.info(request, f"La importación #{importacion.pk} no registró errores.")
+        return redirect('recibos:dashboard')
+    return generar_excel_errores_importacion(importacion.errores, importacion.nombre_archivo)
 
 class ReciboListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequiredMixin, ListView):
     model = Recibo
@@ -122,27 +199,32 @@ class ReciboListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequired
 
         elif action == 'clear_logs':
             if request.user.is_superuser:
-                Recibo.objects.all().delete()
-                log_rec.warning(f"VACIADO TOTAL de recibos ejecutado por {request.user}")
+                eliminados = vaciar_recibos()
+                log_rec.warning(f"VACIADO TOTAL de recibos ({eliminados}) ejecutado por {request.user}")
                 messages.success(request, "Todos los recibos han sido eliminados.")
             else:
                 messages.error(request, "No tienes permisos para vaciar la base de datos.")
             return redirect('recibos:dashboard')
 
-        elif action == 'upload':
+        elif action in ('upload', 'validate'):
             archivo_excel = request.FILES.get('archivo_recibo')
             if not archivo_excel:
                 messages.error(request, "Por favor, sube un archivo Excel.")
             else:
                 try:
-                    success, message, pks = importar_recibos_desde_excel(archivo_excel, request.user)
-                    if success:
-                        messages.success(request, message)
-                        if pks:
-                            pks_str = ','.join(map(str, pks))
-                            return redirect(f"{reverse('recibos:dashboard')}?download_pks={pks_str}")
+                    importacion = ImportacionRecibos.objects.create(
+                        archivo=archivo_excel,
+                        nombre_archivo=archivo_excel.name,
+                        usuario=request.user,
+                        solo_validacion=(action == 'validate')
+                    )
+                    encolar_importacion(importacion)
+                    log_rec.info(f"Importación #{importacion.pk} ({archivo_excel.name}) encolada por {request.user}")
+                    if importacion.solo_validacion:
+                        messages.info(request, f"Archivo recibido. Validando importación #{importacion.pk} (sin guardar recibos)...")
                     else:
-                        messages.error(request, f"Fallo en la carga: {message}")
+                        messages.info(request, f"Archivo recibido. Procesando importación #{importacion.pk}...")
+                    return redirect(f"{reverse('recibos:dashboard')}?importacion={importacion.pk}")
                 except Exception as e:
                     log_rec.error(f"Error importación Excel: {e}")
                     messages.error(request, f"Error al ejecutar la importación.")
@@ -151,59 +233,26 @@ class ReciboListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequired
         return redirect('recibos:dashboard')
 
     def get_queryset(self):
-            # 1. Filtro base (No anulados y orden cronológico/numérico inverso)
-            queryset = Recibo.objects.filter(anulado=False).order_by('-fecha_creacion', '-numero_recibo')
-            
-            # 2. Captura de parámetros de búsqueda general
-            search_query = self.request.GET.get('q', '').strip()
-            search_field = self.request.GET.get('field', 'todos')
+        # Filtro base (no anulados, orden cronológico/numérico inverso) y los filtros de la barra
+        queryset = Recibo.objects.filter(anulado=False).order_by('-fecha_creacion', '-id')
+        filtro = FiltroRecibos(self.request.GET)
+        return filtro.ordenar(filtro.aplicar(queryset))
 
-            if search_query:
-                if search_field != 'todos' and hasattr(Recibo, search_field):
-                    queryset = queryset.filter(**{f'{search_field}__icontains': search_query})
-                else:
-                    q_objects = (
-                        Q(nombre__icontains=search_query) | Q(rif_cedula_identidad__icontains=search_query) |
-                        Q(numero_recibo__icontains=search_query) | Q(numero_transferencia__icontains=search_query) |
-                        Q(estado__icontains=search_query)
-                    )
-                    queryset = queryset.filter(q_objects)
-
-            # 3. Filtro por Estado (Ubicación)
-            estado = self.request.GET.get('estado')
-            if estado: 
-                queryset = queryset.filter(estado__iexact=estado)
-
-            # 4. Filtro por Rango de Fechas
-            f_inicio = self.request.GET.get('fecha_inicio')
-            f_fin = self.request.GET.get('fecha_fin')
-            if f_inicio: queryset = queryset.filter(fecha_creacion__date__gte=f_inicio)
-            if f_fin: queryset = queryset.filter(fecha_creacion__date__lte=f_fin)
-
-            # 5. NUEVO: Filtro por Rango de Números de Recibo
-            n_desde = self.request.GET.get('numero_desde')
-            n_hasta = self.request.GET.get('numero_hasta')
-            
-            if n_desde and n_desde.isdigit():
-                queryset = queryset.filter(numero_recibo__gte=int(n_desde))
-            if n_hasta and n_hasta.isdigit():
-                queryset = queryset.filter(numero_recibo__lte=int(n_hasta))
-
-            # 6. Filtro por Categorías (Checkboxes)
-            category_filters = Q()
-            for codigo, _ in CATEGORY_CHOICES:
-                if self.request.GET.get(codigo) == 'on':
-                    category_filters |= Q(**{f'{codigo}': True})
-            
-            if category_filters: 
-                queryset = queryset.filter(category_filters)
-
-            return queryset
+    def get_paginate_by(self, queryset):
+        # Ordenado por relevancia (búsqueda en PostgreSQL) se pagina por número; si no, por cursor
+        return self.paginate_by if 'relevancia' in queryset.query.annotations else None
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['recibos_hoy'] = Recibo.objects.filter(fecha_creacion__date=timezone.now().date(), anulado=False).count()
-        context['estados_db'] = Recibo.objects.filter(anulado=False).exclude(estado__isnull=True).exclude(estado='').values_list('estado', flat=True).distinct().order_by('estado')
+        if context['page_obj'] is None:
+            pagina = paginar_por_cursor(
+                self.object_list, 'fecha_creacion', 'id', self.request.GET.get('cursor'), self.paginate_by
+            )
+            context.update({
+                'recibos': pagina, 'object_list': pagina, 'page_obj': pagina, 'is_paginated': pagina.has_other_pages()
+            })
+        context['recibos_hoy'] = ResumenDiario.objects.filter(dia=timezone.localdate()).aggregate(total=Sum('total'))['total'] or 0
+        context['estados_db'] = estados_registrados()
         context['categorias_list'] = CATEGORY_CHOICES
         context['current_estado'] = self.request.GET.get('estado')
         context['current_start_date'] = self.request.GET.get('fecha_inicio')
@@ -211,6 +260,7 @@ class ReciboListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequired
         
         request_get_copy = self.request.GET.copy()
         request_get_copy.pop('page', None)
+        request_get_copy.pop('cursor', None)
         context['request_get'] = request_get_copy
         return context
     
@@ -220,113 +270,23 @@ class ReciboListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequired
 
 @login_required
 def generar_reporte_view(request):
-    """Genera reportes aplicando filtros dinámicos de búsqueda, categorías y rango de números."""
-    log_rec = logging.getLogger('CH_RECIBOS')
-    recibos_queryset = Recibo.objects.filter(anulado=False).order_by('-fecha_creacion', '-numero_recibo')
-
-    filters = Q()
-    filtros_aplicados = {}
-    periodo_str = 'Todas las fechas'
-
-    # 1. Filtros de Estado y Fecha (Mantenidos)
-    estado_seleccionado = request.GET.get('estado')
-    if estado_seleccionado:
-        filters &= Q(estado__iexact=estado_seleccionado)
-    filtros_aplicados['estado'] = estado_seleccionado if estado_seleccionado else 'Todos los estados'
-
-    fecha_inicio_str = request.GET.get('fecha_inicio')
-    fecha_fin_str = request.GET.get('fecha_fin')
-
-    try:
-        if fecha_inicio_str:
-            filters &= Q(fecha_creacion__date__gte=fecha_inicio_str)
-            periodo_str = f"Desde: {fecha_inicio_str}"
-        if fecha_fin_str:
-            filters &= Q(fecha_creacion__date__lte=fecha_fin_str)
-            periodo_str = f"{periodo_str} Hasta: {fecha_fin_str}" if periodo_str != 'Todas las fechas' else f"Hasta: {fecha_fin_str}"
-    except ValueError:
-        pass
-    
-    filtros_aplicados['periodo'] = periodo_str
-
-    # --- NUEVO: FILTRO POR RANGO DE NÚMEROS DE RECIBO ---
-    n_desde = request.GET.get('numero_desde')
-    n_hasta = request.GET.get('numero_hasta')
-    rango_recibos_str = "Todos"
-
-    if n_desde and n_desde.isdigit():
-        filters &= Q(numero_recibo__gte=int(n_desde))
-        rango_recibos_str = f"Desde Nº {n_desde}"
-    
-    if n_hasta and n_hasta.isdigit():
-        filters &= Q(numero_recibo__lte=int(n_hasta))
-        rango_recibos_str = f"{rango_recibos_str} Hasta Nº {n_hasta}" if rango_recibos_str != "Todos" else f"Hasta Nº {n_hasta}"
-
-    filtros_aplicados['rango_recibos'] = rango_recibos_str
-    # ----------------------------------------------------
-
-    # 2. Filtros de Categorías (Mantenidos)
-    selected_categories_names = []
-    category_filters = Q()
-    for codigo, nombre_display in CATEGORY_CHOICES:
-        if request.GET.get(codigo) == 'on':
-            category_filters |= Q(**{f'{codigo}': True})
-            selected_categories_names.append(nombre_display)
-
-    if category_filters:
-        filters &= category_filters
-        filtros_aplicados['categorias'] = ', '.join(selected_categories_names)
-    else:
-        filtros_aplicados['categorias'] = 'Todas las categorías'
-
-    # 3. Búsqueda textual (Mantenida)
-    search_query = request.GET.get('q')
-    search_field = request.GET.get('field', 'todos')
-
-    if search_query:
-        query_norm = search_query.strip()
-        if search_field != 'todos' and hasattr(Recibo, search_field):
-            q_search = Q(**{f'{search_field}__icontains': query_norm})
+    """Encola el reporte Excel o PDF (o transmite CSV / Parquet) con los filtros de búsqueda, categorías y rango de números."""
+    tipos = {'excel': 'recibos_excel', 'pdf': 'recibos_pdf', 'totales': 'recibos_totales_estado'}
+    action = request.GET.get('action')
+    if action in ('csv', 'parquet'):
+        # Descarga directa: se transmite desde un cursor del servidor sin armar el archivo
+        recibos_filtrados, _ = filtrar_recibos_reporte(request.GET)
+        logging.getLogger('CH_RECIBOS').info(f"Exportación {action.upper()} descargada por {request.user}")
+        if action == 'csv':
+            response = StreamingHttpResponse(csv_en_streaming(recibos_filtrados), content_type='text/csv; charset=utf-8')
         else:
-            q_search = (
-                Q(nombre__icontains=query_norm) | Q(rif_cedula_identidad__icontains=query_norm) |
-                Q(numero_recibo__icontains=query_norm) | Q(numero_transferencia__icontains=query_norm) |
-                Q(estado__icontains=query_norm)
-            )
-            try:
-                q_search |= Q(pk=int(query_norm))
-            except ValueError:
-                pass
-        filters &= q_search
-        filtros_aplicados['busqueda'] = search_query
-    else:
-        filtros_aplicados['busqueda'] = 'Ninguna'
+            response = StreamingHttpResponse(parquet_en_streaming(recibos_filtrados), content_type='application/vnd.apache.parquet')
+        response['Content-Disposition'] = f'attachment; filename="Recibos_{timezone.now().strftime("%Y%m%d_%H%M%S")}.{action}"'
+        return response
+    if action in tipos:
+        logging.getLogger('CH_RECIBOS').info(f"Reporte {action.upper()} solicitado por {request.user}")
+        return encolar_reporte(request, tipos[action])
 
-    # Aplicación final de los filtros acumulados (incluyendo el rango)
-    recibos_filtrados = recibos_queryset.filter(filters)
-    action = request.GET.get('action')
-    
-    # Lógica de Exportación (Excel / PDF)
-    if action == 'excel':
-        try:
-            response = generar_reporte_excel(request.GET, recibos_filtrados, filtros_aplicados)
-            log_rec.info(f"Reporte EXCEL generado por {request.user} - Total: {recibos_filtrados.count()}")
-            return response
-        except Exception as e:
-            log_rec.error(f"Error reporte Excel: {e}")
-            messages.error(request, f"Error al generar Excel: {e}")
-            return redirect(f"{reverse('recibos:dashboard')}?{request.GET.urlencode()}")
-
-    elif action == 'pdf':
-        try:
-            response = generar_pdf_reporte(recibos_filtrados, filtros_aplicados)
-            log_rec.info(f"Reporte PDF generado por {request.user} - Total: {recibos_filtrados.count()}")
-            return response
-        except Exception as e:
-            log_rec.error(f"Error reporte PDF: {e}")
-            messages.error(request, f"Error al generar PDF: {e}")
-            return redirect(f"{reverse('recibos:dashboard')}?{request.GET.urlencode()}")
-            
     messages.error(request, "Acción no válida.")
     return redirect('recibos:dashboard')
 
@@ -372,20 +332,22 @@ def modificar_recibo(request, pk):
 @login_required
 def recibos_anulados(request):
     """Historial de control para recibos marcados como anulados."""
-    queryset = Recibo.objects.filter(anulado=True).order_by('-fecha_anulacion')
+    queryset = Recibo.objects.filter(anulado=True)
     query = request.GET.get('q', '').strip()
     
     if query:
-        queryset = queryset.filter(
-            Q(numero_recibo__icontains=query) | Q(nombre__icontains=query) | Q(rif_cedula_identidad__icontains=query)
-        )
+        queryset = queryset.filter(q_busqueda(query))
 
-    paginator = Paginator(queryset, 20)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    pagina = paginar_por_cursor(queryset, 'fecha_anulacion', 'id', request.GET.get('cursor'), 20)
+    request_get = request.GET.copy()
+    request_get.pop('cursor', None)
 
     return render(request, 'recibos/recibos_anulados.html', {
         'titulo': 'Historial de Anulados',
-        'recibos': page_obj,
+        'recibos': pagina,
+        'page_obj': pagina,
+        'is_paginated': pagina.has_other_pages(),
+        'request_get': request_get,
     })
     
 # ==============================================================================
@@ -399,86 +361,20 @@ def es_administrador(user):
 @user_passes_test(es_administrador, login_url='recibos:dashboard')
 def estadisticas_view(request):
     """Procesa métricas de gestión, rendimiento de usuarios y distribución regional."""
-    log_rec = logging.getLogger('CH_RECIBOS')
-    
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
     estado_filtro = request.GET.get('estado')
-    
-    tz_vzl = pytz.timezone('America/Caracas')
-    hoy = timezone.localtime(timezone.now(), tz_vzl).date()
-    queryset = Recibo.objects.filter(anulado=False)
-
-    if fecha_inicio:
-        queryset = queryset.filter(fecha_creacion__date__gte=fecha_inicio)
-    if fecha_fin:
-        queryset = queryset.filter(fecha_creacion__date__lte=fecha_fin)
-    if estado_filtro and estado_filtro != 'Todos':
-        queryset = queryset.filter(estado__iexact=estado_filtro)
-
-    total_recibos = queryset.count()
-    monto_total = queryset.aggregate(Sum('total_monto_bs'))['total_monto_bs__sum'] or 0
-    
-    recibos_hoy_total = Recibo.objects.filter(fecha_creacion__date=hoy, anulado=False).count()
-    datos_estados_hoy = Recibo.objects.filter(fecha_creacion__date=hoy, anulado=False).values('estado').annotate(total=Count('id')).order_by('-total')
-
-    # Historial Diario para Gráficas
-    datos_historial = queryset.annotate(
-        dia_solo=TruncDay('fecha_creacion', tzinfo=tz_vzl)
-    ).values('dia_solo').annotate(total=Count('id')).order_by('dia_solo')
-
-    max_dia = max([d['total'] for d in datos_historial]) if datos_historial else 0
-    historial_dias = []
-    for item in datos_historial:
-        if item['dia_solo']:
-            porcentaje = (item['total'] / max_dia * 100) if max_dia > 0 else 0
-            historial_dias.append({
-                'fecha': item['dia_solo'].date(),
-                'total': item['total'],
-                'porcentaje': porcentaje
-            })
 
-    # Métricas por Categoría definidas en constants
-    categorias_config = [
-        ('categoria1', 'Título Tierra Urbana'), ('categoria2', 'Título + Vivienda'),
-        ('categoria3', 'Municipal'), ('categoria4', 'Tierra Privada'),
-        ('categoria5', 'Tierra INAVI'), ('categoria6', 'Excedentes Título'),
-        ('categoria7', 'Excedentes INAVI'), ('categoria8', 'Estudio Técnico'),
-        ('categoria9', 'Locales Comerciales'), ('categoria10', 'Arrendamiento Terrenos'),
-    ]
-    estadisticas_categorias = []
-    for campo, nombre_real in categorias_config:
-        count = queryset.filter(**{campo: True}).count()
-        if count > 0:
-            porcentaje_cat = (count / total_recibos * 100) if total_recibos > 0 else 0
-            estadisticas_categorias.append({'nombre': nombre_real, 'total': count, 'porcentaje': porcentaje_cat})
-
-    top_estados = queryset.values('estado').annotate(total=Count('id')).order_by('-total')[:10]
-
-    ranking_raw = queryset.values('usuario').annotate(total=Count('id')).order_by('-total')
-    ranking_usuarios = []
-    for item in ranking_raw:
-        if item['usuario']:
-            try:
-                user_obj = User.objects.get(pk=item['usuario'])
-                ranking_usuarios.append({'usuario': user_obj, 'total': item['total']})
-            except User.DoesNotExist:
-                continue
-
-    estados_disponibles = Recibo.objects.exclude(estado__isnull=True).exclude(estado='').values_list('estado', flat=True).distinct().order_by('estado')
-
-    return render(request, 'recibos/estadisticas.html', {
-        'total_recibos': total_recibos,
-        'recibos_hoy_total': recibos_hoy_total,
-        'monto_total': monto_total,
-        'categorias': estadisticas_categorias,
-        'top_estados': top_estados,
-        'datos_estados_hoy': datos_estados_hoy,
-        'estados_db': estados_disponibles,
-        'historial_dias': historial_dias,
-        'ranking_usuarios': ranking_usuarios,
+    # Todas las métricas salen de pocas consultas agregadas (ver estadisticas.py)
+    metricas, cronometro = metricas_estadisticas(FiltroRecibos(request.GET), timezone.localdate())
+
+    response = render(request, 'recibos/estadisticas.html', {
+        **metricas,
         'filtros': {'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin, 'estado': estado_filtro}
     })
+    # Tiempo de cada consulta, visible en las herramientas de desarrollo del navegador
+    response['Server-Timing'] = cronometro.server_timing()
+    return response
 
 @login_required
 @user_passes_test(es_administrador)
@@ -487,22 +383,21 @@ def rendimiento_usuarios(request):
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
     
-    filtros = Q(anulado=False)
+    # Del resumen diario: una fila por día y usuario en lugar de cada recibo del período
+    resumen = ResumenDiario.objects.exclude(usuario=None)
     if fecha_inicio and fecha_fin:
-        filtros &= Q(fecha_creacion__date__range=[fecha_inicio, fecha_fin])
+        resumen = resumen.filter(FiltroRecibos({'fecha_inicio': fecha_inicio, 'fecha_fin': fecha_fin}).q_resumen())
     
-    ranking = Recibo.objects.filter(filtros).values('usuario').annotate(total=Count('id')).order_by('-total')
+    ranking = resumen.values('usuario').annotate(recibos=Sum('total')).filter(recibos__gt=0).order_by('-recibos')
     
     ranking_data = []
     total_general = 0
+    ranking = list(ranking)
+    usuarios = User.objects.in_bulk([item['usuario'] for item in ranking])
     for item in ranking:
-        if item['usuario']:
-            try:
-                user = User.objects.get(pk=item['usuario'])
-                ranking_data.append({'usuario': user, 'total': item['total']})
-                total_general += item['total']
-            except User.DoesNotExist:
-                continue
+        if item['usuario'] in usuarios:
+            ranking_data.append({'usuario': usuarios[item['usuario']], 'total': item['recibos']})
+            total_general += item['recibos']
             
     return render(request, 'recibos/usuarios_performance.html', {
         'ranking_usuarios': ranking_data,
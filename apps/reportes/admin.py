@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import TrabajoReporte
+
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'usuario', 'estado_resultado', 'origen', 'pregenerado', 'tamano', 'duracion', 'fecha_creacion')
+    list_filter = ('estado', 'tipo', 'pregenerado', 'vigente')
+    list_select_related = ('usuario', 'origen')
+    readonly_fields = ('parametros', 'huella', 'origen', 'pregenerado', 'estado', 'archivo', 'nombre_archivo', 'tamano',
+                       'mensaje', 'fecha_inicio', 'fecha_fin')
+
+    @admin.display(description='Estado')
+    def estado_resultado(self, obj):
+        # Las solicitudes reutilizadas siguen el estado del trabajo que genera el archivo
+        return obj.resultado.get_estado_display()
@@ -0,0 +1,57 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.reportes.models import TrabajoReporte
+from apps.reportes.registro import reportes_estandar
+from apps.reportes.tareas import pregenerar_reporte
+
+
+class Command(BaseCommand):
+    help = 'Pre-genera los reportes estándar del día para servirlos al instante (cron, después de medianoche)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha de referencia AAAA-MM-DD (por defecto, hoy)')
+        parser.add_argument('--historial', type=int, metavar='DIAS',
+                            help='Sólo muestra tiempos y tamaños promedio de las últimas DIAS noches')
+
+    def handle(self, *args, **options):
+        if options['historial']:
+            return self.mostrar_historial(options['historial'])
+
+        try:
+            hoy = date.fromisoformat(options['fecha']) if options['fecha'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('Fecha inválida: use el formato AAAA-MM-DD.')
+
+        self.stdout.write(self.style.WARNING(f'>>> Pre-generando reportes estándar para {hoy:%d/%m/%Y}...'))
+        fallidos = 0
+        for tipo, datos in reportes_estandar(hoy):
+            trabajo = pregenerar_reporte(tipo, datos)
+            if trabajo.estado == TrabajoReporte.COMPLETADA:
+                self.stdout.write(f'- {trabajo.get_tipo_display()}: {trabajo.duracion:.1f} s, '
+                                  f'{trabajo.tamano / 1024:,.0f} KB {trabajo.parametros}')
+            else:
+                fallidos += 1
+                self.stdout.write(self.style.ERROR(f'- {trabajo.get_tipo_display()}: {trabajo.mensaje}'))
+        if fallidos:
+            raise CommandError(f'{fallidos} reporte(s) no se pudieron pre-generar.')
+        self.stdout.write(self.style.SUCCESS('Reportes estándar listos.'))
+
+    def mostrar_historial(self, dias):
+        """Tiempos y tamaños por tipo de reporte, para planificar capacidad."""
+        desde = timezone.now() - timedelta(days=dias)
+        corridas = defaultdict(list)
+        for trabajo in TrabajoReporte.objects.filter(
+            pregenerado=True, estado=TrabajoReporte.COMPLETADA, fecha_inicio__gte=desde
+        ).only('tipo', 'tamano', 'fecha_inicio', 'fecha_fin'):
+            corridas[trabajo.get_tipo_display()].append((trabajo.duracion, trabajo.tamano / 1024))
+
+        self.stdout.write(f'RESUMEN (últimos {dias} días):')
+        for nombre, datos in sorted(corridas.items()):
+            duraciones, tamanos = zip(*datos)
+            self.stdout.write(
+                f'- {nombre}: {len(datos)} corrida(s), '
+                f'{sum(duraciones) / len(datos):.1f} s promedio / {max(duraciones):.1f} s máximo, '
+                f'{sum(tamanos) / len(datos):,.0f} KB promedio / {max(tamanos):,.0f} KB máximo'
+            )
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.reportes.tareas import procesar_pendientes
+
+
+class Command(BaseCommand):
+    """Worker de reportes. Debe quedar corriendo bajo un supervisor o ejecutarse con
+    --una-vez desde cron, aun con REPORTES_EN_PROCESO = True: es lo que retoma los reportes
+    que quedaron PENDIENTES o PROCESANDO cuando se reinició el servidor (ver
+    tareas.reclamar_vencidos).
+    """
+    help = ('Worker de reportes: genera los reportes PENDIENTES y reintenta los interrumpidos. '
+            'Debe correr bajo un supervisor o desde cron (--una-vez).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre consultas')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('>>> Worker de reportes iniciado.'))
+        while True:
+            procesados = procesar_pendientes()
+            if procesados:
+                self.stdout.write(self.style.SUCCESS(f'Reportes generados: {procesados}'))
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
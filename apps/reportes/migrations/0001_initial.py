@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-18 04:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('recibos_excel', 'Recibos (Excel)'), ('recibos_pdf', 'Recibos (PDF)'), ('beneficiarios_excel', 'Beneficiarios y visitas (Excel)'), ('contratos_excel', 'Gestión de contratos (Excel)'), ('auditoria_excel', 'Bitácora de auditoría (Excel)'), ('auditoria_pdf', 'Bitácora de auditoría (PDF)')], max_length=40)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('huella', models.CharField(max_length=64)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADA', 'Completado'), ('FALLIDA', 'Fallido')], db_index=True, default='PENDIENTE', max_length=20)),
+                ('archivo', models.FileField(blank=True, upload_to='reportes/%Y/%m/')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('mensaje', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('origen', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reutilizaciones', to='reportes.trabajoreporte')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reporte',
+                'db_table': 'reportes_trabajo',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['huella', 'fecha_creacion'], name='reportes_tr_huella_a33168_idx')],
+            },
+        ),
+    ]
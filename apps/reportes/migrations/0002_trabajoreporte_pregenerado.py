@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='pregenerado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='vigente',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='trabajoreporte',
+            name='tipo',
+            field=models.CharField(choices=[('recibos_excel', 'Recibos (Excel)'), ('recibos_pdf', 'Recibos (PDF)'), ('recibos_totales_estado', 'Totales mensuales por estado (Excel)'), ('beneficiarios_excel', 'Beneficiarios y visitas (Excel)'), ('contratos_excel', 'Gestión de contratos (Excel)'), ('auditoria_excel', 'Bitácora de auditoría (Excel)'), ('auditoria_pdf', 'Bitácora de auditoría (PDF)')], max_length=40),
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.db import models
+from django.conf import settings
+
+
+class TrabajoReporte(models.Model):
+    """Reporte solicitado por un usuario y generado en segundo plano."""
+    PENDIENTE = 'PENDIENTE'
+    PROCESANDO = 'PROCESANDO'
+    COMPLETADA = 'COMPLETADA'
+    FALLIDA = 'FALLIDA'
+
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (COMPLETADA, 'Completado'),
+        (FALLIDA, 'Fallido'),
+    ]
+
+    TIPOS = [
+        ('recibos_excel', 'Recibos (Excel)'),
+        ('recibos_pdf', 'Recibos (PDF)'),
+        ('recibos_totales_estado', 'Totales mensuales por estado (Excel)'),
+        ('beneficiarios_excel', 'Beneficiarios y visitas (Excel)'),
+        ('contratos_excel', 'Gestión de contratos (Excel)'),
+        ('auditoria_excel', 'Bitácora de auditoría (Excel)'),
+        ('auditoria_pdf', 'Bitácora de auditoría (PDF)'),
+    ]
+
+    tipo = models.CharField(max_length=40, choices=TIPOS)
+    # Filtros normalizados con los que se genera el reporte
+    parametros = models.JSONField(default=dict, blank=True)
+    # Hash de tipo + parámetros: identifica solicitudes equivalentes
+    huella = models.CharField(max_length=64)
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes',
+        verbose_name="Solicitado por"
+    )
+    # Solicitud que reutiliza el archivo de otra idéntica y reciente (no se genera de nuevo)
+    origen = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reutilizaciones'
+    )
+
+    # Generado por la tarea nocturna (`pregenerar_reportes`) y no por un usuario
+    pregenerado = models.BooleanField(default=False)
+    # Un pre-generado deja de servirse cuando sus datos cambian o lo reemplaza otra noche
+    vigente = models.BooleanField(default=True)
+
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, db_index=True)
+    archivo = models.FileField(upload_to='reportes/%Y/%m/', blank=True)
+    nombre_archivo = models.CharField(max_length=255, blank=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    mensaje = models.TextField(blank=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'reportes_trabajo'
+        ordering = ['-fecha_creacion']
+        indexes = [models.Index(fields=['huella', 'fecha_creacion'])]
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reporte"
+
+    def __str__(self):
+        return f"Reporte #{self.pk} - {self.get_tipo_display()} ({self.get_estado_display()})"
+
+    @property
+    def resultado(self):
+        """Trabajo dueño del archivo: el original cuando esta solicitud reutiliza otra."""
+        return self.origen or self
+
+    @property
+    def duracion(self):
+        """Segundos que tomó generar el archivo (None si no ha terminado)."""
+        if self.fecha_inicio and self.fecha_fin:
+            return (self.fecha_fin - self.fecha_inicio).total_seconds()
+        return None
+
+    @property
+    def finalizada(self):
+        return self.resultado.estado in (self.COMPLETADA, self.FALLIDA)
@@ -0,0 +1,116 @@
+import json
+import hashlib
+from datetime import timedelta
+from django.utils.module_loading import import_string
+from apps.recibos.constants import CATEGORY_CHOICES
+
+# Filtros GET que entiende cada reporte; el resto de la consulta se descarta
+PARAMETROS_RECIBOS = (
+    ['estado', 'fecha_inicio', 'fecha_fin', 'numero_desde', 'numero_hasta', 'lote', 'q', 'field']
+    + [codigo for codigo, _ in CATEGORY_CHOICES]
+)
+PARAMETROS_AUDITORIA = ['usuario', 'modulo', 'desde', 'hasta']
+
+# Cada generador recibe (parametros, usuario, destino), escribe el archivo sobre
+# `destino` y devuelve el nombre de descarga. Los filtros iguales a `por_defecto` se
+# omiten (no cambian el resultado). `por_usuario` marca los reportes cuyo contenido
+# depende de quién los pide: ésos sólo se reutilizan entre sus propias solicitudes.
+# `cambios` (parametros, momento) -> bool dice si los datos del reporte cambiaron desde
+# `momento`; sin él un reporte pre-generado nunca se sirve.
+REPORTES = {
+    'recibos_excel': {
+        'generador': 'apps.recibos.utils.reporte_recibos_excel',
+        'cambios': 'apps.recibos.utils.recibos_modificados_desde',
+        'parametros': PARAMETROS_RECIBOS,
+        'por_defecto': {'field': 'todos'},
+        'por_usuario': False,
+    },
+    'recibos_pdf': {
+        'generador': 'apps.recibos.utils.reporte_recibos_pdf',
+        'cambios': 'apps.recibos.utils.recibos_modificados_desde',
+        'parametros': PARAMETROS_RECIBOS,
+        'por_defecto': {'field': 'todos'},
+        'por_usuario': False,
+    },
+    'recibos_totales_estado': {
+        'generador': 'apps.recibos.utils.reporte_recibos_totales_estado',
+        'cambios': 'apps.recibos.utils.recibos_modificados_desde',
+        'parametros': PARAMETROS_RECIBOS,
+        'por_defecto': {'field': 'todos'},
+        'por_usuario': False,
+    },
+    'beneficiarios_excel': {
+        'generador': 'apps.beneficiarios.views.escribir_excel_beneficiarios',
+        'cambios': 'apps.beneficiarios.views.beneficiarios_modificados_desde',
+        'parametros': ['fecha_inicio', 'fecha_fin', 'tipo'],
+        'por_defecto': {'tipo': 'parcial'},
+        'por_usuario': False,
+    },
+    'contratos_excel': {
+        'generador': 'apps.contratos.views.escribir_excel_contratos',
+        'parametros': [],
+        'por_usuario': False,
+    },
+    'auditoria_excel': {
+        'generador': 'apps.auditoria.views.escribir_excel_auditoria',
+        'cambios': 'apps.auditoria.views.bitacora_modificada_desde',
+        'parametros': PARAMETROS_AUDITORIA,
+        'por_usuario': False,
+    },
+    'auditoria_pdf': {
+        # El PDF lleva impreso "Generado por: <usuario>"
+        'generador': 'apps.auditoria.views.escribir_pdf_auditoria',
+        'cambios': 'apps.auditoria.views.bitacora_modificada_desde',
+        'parametros': PARAMETROS_AUDITORIA,
+        'por_usuario': True,
+    },
+}
+
+
+def parametros_reporte(tipo, datos):
+    """Extrae de `datos` (p. ej. request.GET) los filtros del reporte, sin vacíos."""
+    config = REPORTES[tipo]
+    por_defecto = config.get('por_defecto', {})
+    parametros = {}
+    for clave in config['parametros']:
+        valor = (datos.get(clave) or '').strip()
+        if valor and valor != 'None' and valor != por_defecto.get(clave):
+            parametros[clave] = valor
+    return parametros
+
+
+def huella_reporte(tipo, parametros, usuario=None):
+    """Hash estable de la solicitud: el orden de los filtros en la URL no la cambia."""
+    clave = {'tipo': tipo, 'parametros': parametros}
+    if REPORTES[tipo]['por_usuario']:
+        clave['usuario'] = usuario.pk if usuario else None
+    return hashlib.sha256(json.dumps(clave, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def obtener_generador(tipo):
+    return import_string(REPORTES[tipo]['generador'])
+
+
+def hay_cambios(tipo, parametros, momento):
+    """True si los datos del reporte pudieron cambiar desde `momento`."""
+    ruta = REPORTES[tipo].get('cambios')
+    return True if ruta is None else import_string(ruta)(parametros, momento)
+
+
+def reportes_estandar(hoy):
+    """Reportes que se piden a diario, con los filtros que envían los formularios.
+
+    Los genera `manage.py pregenerar_reportes` cada noche para la fecha `hoy`. Sólo
+    rangos cerrados (hasta ayer): lo que se registra durante el día no los invalida.
+    El mes en curso va del 1 a ayer; el día 1, el mes anterior completo. La bitácora
+    no se pre-genera: su formulario no tiene un rango habitual y con "hasta hoy"
+    cualquier acción del día la invalidaría.
+    """
+    ayer = hoy - timedelta(days=1)
+    mes_hasta_ayer = {'fecha_inicio': ayer.replace(day=1).isoformat(), 'fecha_fin': ayer.isoformat()}
+    return [
+        ('recibos_excel', mes_hasta_ayer),
+        ('recibos_pdf', mes_hasta_ayer),
+        ('recibos_totales_estado', mes_hasta_ayer),
+        ('beneficiarios_excel', {'tipo': 'parcial', 'fecha_inicio': ayer.isoformat(), 'fecha_fin': ayer.isoformat()}),
+    ]
@@ -0,0 +1,203 @@
+import logging
+import tempfile
+import threading
+from datetime import datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TrabajoReporte
+from .registro import parametros_reporte, huella_reporte, obtener_generador, hay_cambios
+
+log_rep = logging.getLogger('CH_REPORTES')
+
+# Hilos dedicados a generar reportes fuera de la petición. Con
+# REPORTES_EN_PROCESO = False los trabajos quedan PENDIENTES y los atiende
+# el comando `procesar_reportes` desde un proceso aparte.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _obtener_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORTES_WORKERS', 2),
+                thread_name_prefix='reportes'
+            )
+        return _executor
+
+
+def _limite_procesando():
+    """Inicio a partir del cual un trabajo PROCESANDO todavía puede estar generándose."""
+    return timezone.now() - timedelta(minutes=getattr(settings, 'REPORTES_MINUTOS_MAXIMOS', 30))
+
+
+def _pregenerado_vigente(tipo, parametros, huella):
+    """Reporte de la tarea nocturna de hoy con los mismos filtros y datos sin cambios."""
+    inicio_dia = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    pregenerado = TrabajoReporte.objects.filter(
+        huella=huella, pregenerado=True, vigente=True,
+        estado=TrabajoReporte.COMPLETADA, fecha_inicio__gte=inicio_dia
+    ).order_by('-fecha_inicio').first()
+    if pregenerado is None:
+        return None
+    if hay_cambios(tipo, parametros, pregenerado.fecha_inicio):
+        TrabajoReporte.objects.filter(pk=pregenerado.pk).update(vigente=False)
+        return None
+    return pregenerado
+
+
+def solicitar_reporte(usuario, tipo, datos):
+    """Registra la solicitud de un reporte y la encola. Devuelve (trabajo, reutilizado).
+
+    Si hay un pre-generado de esta noche con los mismos filtros y sus datos no han
+    cambiado, o si en los últimos REPORTES_REUTILIZAR_MINUTOS se pidió el mismo
+    reporte y ya está terminado o generándose (no vencido), no se genera otra vez: la
+    solicitud queda enlazada a ese trabajo y comparte su archivo.
+    """
+    parametros = parametros_reporte(tipo, datos)
+    huella = huella_reporte(tipo, parametros, usuario)
+    ventana = timezone.now() - timedelta(minutes=getattr(settings, 'REPORTES_REUTILIZAR_MINUTOS', 10))
+
+    # Un PENDIENTE o un PROCESANDO vencido puede ser de un worker que ya no existe
+    previo = _pregenerado_vigente(tipo, parametros, huella) or TrabajoReporte.objects.filter(
+        Q(estado=TrabajoReporte.COMPLETADA)
+        | Q(estado=TrabajoReporte.PROCESANDO, fecha_inicio__gte=_limite_procesando()),
+        huella=huella, origen__isnull=True, pregenerado=False, fecha_creacion__gte=ventana
+    ).order_by('-fecha_creacion').first()
+
+    if previo is not None:
+        if previo.usuario_id == usuario.pk:
+            return previo, True
+        trabajo = TrabajoReporte.objects.create(
+            tipo=tipo, parametros=parametros, huella=huella, usuario=usuario, origen=previo
+        )
+        log_rep.info(f"Reporte #{trabajo.pk} ({tipo}) reutiliza el #{previo.pk}.")
+        return trabajo, True
+
+    trabajo = TrabajoReporte.objects.create(tipo=tipo, parametros=parametros, huella=huella, usuario=usuario)
+    if getattr(settings, 'REPORTES_EN_PROCESO', True):
+        transaction.on_commit(lambda: _obtener_executor().submit(procesar_trabajo, trabajo.pk))
+    return trabajo, False
+
+
+def _generar_archivo(trabajo):
+    generar = obtener_generador(trabajo.tipo)
+    with tempfile.TemporaryFile() as destino:
+        nombre = generar(trabajo.parametros, trabajo.usuario, destino)
+        destino.seek(0)
+        trabajo.archivo.save(nombre, File(destino), save=False)
+    trabajo.nombre_archivo = nombre
+    trabajo.tamano = trabajo.archivo.size
+
+
+def _ejecutar_trabajo(trabajo):
+    """Genera el archivo de un trabajo ya tomado (PROCESANDO) y registra el resultado."""
+    log_rep.info(f"Reporte #{trabajo.pk} ({trabajo.tipo}) iniciado para {trabajo.usuario or 'la tarea nocturna'}.")
+    try:
+        _generar_archivo(trabajo)
+    except Exception as e:
+        log_rep.error(f"Reporte #{trabajo.pk} ({trabajo.tipo}) fallido: {e}", exc_info=True)
+        trabajo.estado = TrabajoReporte.FALLIDA
+        trabajo.mensaje = f"Error al generar el reporte: {e}"
+    else:
+        trabajo.estado = TrabajoReporte.COMPLETADA
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save()
+    log_rep.info(f"Reporte #{trabajo.pk} finalizado ({trabajo.estado}) en "
+                 f"{trabajo.duracion:.1f} s, {trabajo.tamano} bytes.")
+
+
+def procesar_trabajo(pk):
+    """Genera un reporte PENDIENTE. Devuelve False si otro worker ya lo tomó."""
+    close_old_connections()
+    try:
+        # Reclamo atómico: sólo un worker pasa el trabajo a PROCESANDO
+        tomado = TrabajoReporte.objects.filter(
+            pk=pk, estado=TrabajoReporte.PENDIENTE, origen__isnull=True
+        ).update(estado=TrabajoReporte.PROCESANDO, fecha_inicio=timezone.now())
+        if not tomado:
+            return False
+
+        _ejecutar_trabajo(TrabajoReporte.objects.select_related('usuario').get(pk=pk))
+        return True
+    except Exception as e:
+        log_rep.error(f"FALLO FATAL en reporte #{pk}: {e}", exc_info=True)
+        TrabajoReporte.objects.filter(pk=pk).update(
+            estado=TrabajoReporte.FALLIDA, fecha_fin=timezone.now(),
+            mensaje="Error desconocido al generar el reporte."
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+def pregenerar_reporte(tipo, datos):
+    """Genera en el proceso actual un reporte estándar para servirlo durante el día.
+
+    El pre-generado anterior con los mismos filtros deja de servirse. Devuelve el
+    trabajo terminado, con su duración y tamaño registrados.
+    """
+    parametros = parametros_reporte(tipo, datos)
+    huella = huella_reporte(tipo, parametros)
+    TrabajoReporte.objects.filter(huella=huella, pregenerado=True, vigente=True).update(vigente=False)
+    # Se crea ya en PROCESANDO para que ningún worker lo tome
+    trabajo = TrabajoReporte.objects.create(
+        tipo=tipo, parametros=parametros, huella=huella, pregenerado=True,
+        estado=TrabajoReporte.PROCESANDO, fecha_inicio=timezone.now()
+    )
+    _ejecutar_trabajo(trabajo)
+    return trabajo
+
+
+def descartar_pregenerados(prefijo):
+    """Deja de servir los pre-generados cuyo tipo empieza con `prefijo` (p. ej. 'recibos_').
+
+    Para cambios que no dejan marca de tiempo: ediciones, borrados y cargas con fechas de legado.
+    """
+    TrabajoReporte.objects.filter(pregenerado=True, vigente=True, tipo__startswith=prefijo).update(vigente=False)
+
+
+# Mensaje de los reportes devueltos a PENDIENTE por reclamar_vencidos
+MENSAJE_REINTENTO = "Reintento: la generación anterior se interrumpió."
+
+
+def reclamar_vencidos():
+    """Devuelve a PENDIENTE los reportes que siguen PROCESANDO pasado REPORTES_MINUTOS_MAXIMOS.
+
+    Su worker terminó (reinicio del servidor) sin registrar el resultado; generar un
+    reporte no escribe nada más que su archivo, así que puede repetirse. Uno que ya era
+    un reintento se marca FALLIDO. Devuelve cuántos reclamó.
+    """
+    vencidos = TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.PROCESANDO, origen__isnull=True, fecha_inicio__lt=_limite_procesando()
+    )
+    fallidos = vencidos.filter(mensaje=MENSAJE_REINTENTO).update(
+        estado=TrabajoReporte.FALLIDA, fecha_fin=timezone.now(),
+        mensaje="La generación se interrumpió dos veces. Vuelva a solicitar el reporte."
+    )
+    reintentos = vencidos.exclude(mensaje=MENSAJE_REINTENTO).update(
+        estado=TrabajoReporte.PENDIENTE, fecha_inicio=None, mensaje=MENSAJE_REINTENTO
+    )
+    if fallidos or reintentos:
+        log_rep.warning(f"Reportes interrumpidos: {reintentos} devueltos a PENDIENTE, {fallidos} marcados FALLIDOS.")
+    return fallidos + reintentos
+
+
+def procesar_pendientes():
+    """Atiende en orden de llegada todos los reportes PENDIENTES. Devuelve cuántos procesó.
+
+    Antes reclama los que quedaron PROCESANDO por un worker que ya no existe. Los
+    PENDIENTES que un reinicio sacó de la cola en memoria (REPORTES_EN_PROCESO) también
+    se atienden aquí.
+    """
+    reclamar_vencidos()
+    pendientes = TrabajoReporte.objects.filter(
+        estado=TrabajoReporte.PENDIENTE, origen__isnull=True
+    ).order_by('fecha_creacion').values_list('pk', flat=True)
+    return sum(1 for pk in list(pendientes) if procesar_trabajo(pk))
@@ -0,0 +1,148 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.recibos.models import Recibo
+from . import tareas
+from .models import TrabajoReporte
+from .registro import reportes_estandar
+from .tareas import MENSAJE_REINTENTO, pregenerar_reporte, procesar_pendientes, reclamar_vencidos, solicitar_reporte
+
+# Sin parámetros ni dependencia del usuario: dos solicitudes cualesquiera son equivalentes
+TIPO = 'contratos_excel'
+
+
+@override_settings(REPORTES_EN_PROCESO=False, REPORTES_REUTILIZAR_MINUTOS=10, REPORTES_MINUTOS_MAXIMOS=30)
+class ColaReportesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Usuario = get_user_model()
+        cls.ana = Usuario.objects.create_user(username='ana', password='x')
+        cls.luis = Usuario.objects.create_user(username='luis', password='x')
+
+    def marcar(self, trabajo, estado, minutos_desde_inicio=0):
+        trabajo.estado = estado
+        trabajo.fecha_inicio = timezone.now() - timedelta(minutes=minutos_desde_inicio)
+        trabajo.save()
+
+    def test_encola_pendiente(self):
+        trabajo, reutilizado = solicitar_reporte(self.ana, TIPO, {})
+        self.assertFalse(reutilizado)
+        self.assertEqual(trabajo.estado, TrabajoReporte.PENDIENTE)
+        self.assertIsNone(trabajo.origen)
+
+    def test_reutiliza_terminado_o_en_curso(self):
+        for estado in (TrabajoReporte.COMPLETADA, TrabajoReporte.PROCESANDO):
+            with self.subTest(estado):
+                TrabajoReporte.objects.all().delete()
+                previo, _ = solicitar_reporte(self.ana, TIPO, {})
+                self.marcar(previo, estado)
+                trabajo, reutilizado = solicitar_reporte(self.ana, TIPO, {})
+                self.assertTrue(reutilizado)
+                self.assertEqual(trabajo, previo)
+
+    def test_otro_usuario_se_enlaza_al_original(self):
+        previo, _ = solicitar_reporte(self.ana, TIPO, {})
+        self.marcar(previo, TrabajoReporte.COMPLETADA)
+        trabajo, reutilizado = solicitar_reporte(self.luis, TIPO, {})
+        self.assertTrue(reutilizado)
+        self.assertNotEqual(trabajo, previo)
+        self.assertEqual((trabajo.usuario, trabajo.origen, trabajo.resultado), (self.luis, previo, previo))
+        # La solicitud enlazada no entra a la cola
+        self.assertEqual(list(TrabajoReporte.objects.filter(origen__isnull=True)), [previo])
+
+    def test_no_reutiliza_pendiente_fallido_ni_vencido(self):
+        casos = [
+            (TrabajoReporte.PENDIENTE, None),
+            (TrabajoReporte.FALLIDA, 0),
+            (TrabajoReporte.PROCESANDO, 31),
+        ]
+        for estado, minutos in casos:
+            with self.subTest(estado):
+                TrabajoReporte.objects.all().delete()
+                previo, _ = solicitar_reporte(self.ana, TIPO, {})
+                if minutos is not None:
+                    self.marcar(previo, estado, minutos)
+                trabajo, reutilizado = solicitar_reporte(self.ana, TIPO, {})
+                self.assertFalse(reutilizado)
+                self.assertNotEqual(trabajo, previo)
+
+    def test_reclamar_vencidos(self):
+        vencido, _ = solicitar_reporte(self.ana, TIPO, {})
+        self.marcar(vencido, TrabajoReporte.PROCESANDO, 31)
+        reciente = TrabajoReporte.objects.create(tipo=TIPO, huella='otra', usuario=self.ana)
+        self.marcar(reciente, TrabajoReporte.PROCESANDO, 5)
+
+        self.assertEqual(reclamar_vencidos(), 1)
+        vencido.refresh_from_db()
+        reciente.refresh_from_db()
+        self.assertEqual((vencido.estado, vencido.fecha_inicio, vencido.mensaje),
+                         (TrabajoReporte.PENDIENTE, None, MENSAJE_REINTENTO))
+        self.assertEqual(reciente.estado, TrabajoReporte.PROCESANDO)
+
+        # Interrumpido por segunda vez: no se reintenta más
+        self.marcar(vencido, TrabajoReporte.PROCESANDO, 31)
+        self.assertEqual(reclamar_vencidos(), 1)
+        vencido.refresh_from_db()
+        self.assertEqual(vencido.estado, TrabajoReporte.FALLIDA)
+
+    def test_procesar_pendientes_retoma_los_interrumpidos(self):
+        vencido, _ = solicitar_reporte(self.ana, TIPO, {})
+        self.marcar(vencido, TrabajoReporte.PROCESANDO, 31)
+        # Mientras tanto, otra solicitud no se enlaza al vencido: se encola aparte
+        nuevo, reutilizado = solicitar_reporte(self.luis, TIPO, {})
+        self.assertFalse(reutilizado)
+
+        with mock.patch.object(tareas, '_generar_archivo') as generar:
+            self.assertEqual(procesar_pendientes(), 2)
+
+        self.assertEqual(generar.call_count, 2)
+        self.assertEqual(
+            set(TrabajoReporte.objects.filter(pk__in=[vencido.pk, nuevo.pk]).values_list('estado', flat=True)),
+            {TrabajoReporte.COMPLETADA}
+        )
+
+
+@override_settings(REPORTES_EN_PROCESO=False)
+class PregeneradosTests(TestCase):
+
+    def test_rangos_cerrados_hasta_ayer(self):
+        casos = [
+            (date(2026, 10, 18), '2026-10-01', '2026-10-17'),
+            # El día 1 se pre-genera el mes anterior completo
+            (date(2026, 10, 1), '2026-09-01', '2026-09-30'),
+            (date(2026, 3, 1), '2026-02-01', '2026-02-28'),
+        ]
+        for hoy, inicio, fin in casos:
+            with self.subTest(hoy):
+                estandar = dict(reportes_estandar(hoy))
+                self.assertNotIn('auditoria_excel', estandar)
+                self.assertEqual(estandar['recibos_excel'], {'fecha_inicio': inicio, 'fecha_fin': fin})
+                for datos in estandar.values():
+                    self.assertLess(date.fromisoformat(datos['fecha_fin']), hoy)
+
+    def test_se_sirve_mientras_su_rango_no_cambia(self):
+        ana = get_user_model().objects.create_user(username='ana', password='x')
+        datos = dict(reportes_estandar(timezone.localdate()))['recibos_excel']
+        with mock.patch.object(tareas, '_generar_archivo'):
+            pregenerado = pregenerar_reporte('recibos_excel', datos)
+
+        # Un recibo registrado hoy queda fuera del rango: el pre-generado sigue vigente
+        recibo = Recibo.objects.create(
+            estado='ZULIA', nombre='Nuevo', rif_cedula_identidad='V1', fecha=timezone.localdate(),
+            gastos_administrativos=Decimal('0'), tasa_dia=Decimal('1'), total_monto_bs=Decimal('1'),
+        )
+        trabajo, reutilizado = solicitar_reporte(ana, 'recibos_excel', datos)
+        self.assertTrue(reutilizado)
+        self.assertEqual(trabajo.origen, pregenerado)
+
+        # Una edición (sin marca de tiempo) lo descarta
+        recibo.nombre = 'Corregido'
+        recibo.save()
+        trabajo, reutilizado = solicitar_reporte(ana, 'recibos_excel', datos)
+        self.assertFalse(reutilizado)
+        self.assertIsNone(trabajo.origen)
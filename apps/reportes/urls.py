@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'reportes'
+
+urlpatterns = [
+    path('', views.mis_reportes, name='mis_reportes'),
+    path('<int:pk>/descargar/', views.descargar_reporte, name='descargar'),
+]
@@ -0,0 +1,40 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import FileResponse
+from django.shortcuts import render, redirect, get_object_or_404
+
+from .models import TrabajoReporte
+from .tareas import solicitar_reporte
+
+
+def encolar_reporte(request, tipo, datos=None):
+    """Encola el reporte pedido en la vista y lleva al usuario a «Mis reportes»."""
+    trabajo, reutilizado = solicitar_reporte(request.user, tipo, request.GET if datos is None else datos)
+    if reutilizado and trabajo.resultado.estado == TrabajoReporte.COMPLETADA:
+        messages.success(request, f"El reporte «{trabajo.get_tipo_display()}» con esos filtros ya estaba listo.")
+    else:
+        messages.info(request, f"Reporte «{trabajo.get_tipo_display()}» en preparación. "
+                               f"Podrá descargarlo desde esta lista al finalizar.")
+    return redirect('reportes:mis_reportes')
+
+
+@login_required
+def mis_reportes(request):
+    """Reportes solicitados por el usuario, con su estado y descarga."""
+    reportes = TrabajoReporte.objects.filter(usuario=request.user).select_related('origen')
+    page_obj = Paginator(reportes, 20).get_page(request.GET.get('page'))
+    return render(request, 'reportes/mis_reportes.html', {
+        'reportes': page_obj,
+        'en_curso': any(not r.finalizada for r in page_obj),
+    })
+
+
+@login_required
+def descargar_reporte(request, pk):
+    trabajo = get_object_or_404(TrabajoReporte.objects.select_related('origen'), pk=pk, usuario=request.user)
+    resultado = trabajo.resultado
+    if resultado.estado != TrabajoReporte.COMPLETADA or not resultado.archivo:
+        messages.error(request, "El reporte todavía no está disponible para descarga.")
+        return redirect('reportes:mis_reportes')
+    return FileResponse(resultado.archivo.open('rb'), as_attachment=True, filename=resultado.nombre_archivo)
@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class RecibosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.territorio' 
\ No newline at end of file
+    name = 'apps.territorio'
+
+    def ready(self):
+        # Conecta la invalidación de los catálogos cacheados (Estado y UnidadAdscrita) también fuera del servidor web
+        import sistema_gestion.cache_consultas
@@ -0,0 +1,67 @@
+import tempfile
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from sistema_gestion.cache_consultas import estados_territorio, unidades_adscritas
+from .models import Estado, UnidadAdscrita
+
+
+class CacheConsultasTests(TestCase):
+    """Las escrituras de los catálogos invalidan su consulta cacheada en la caché de disco compartida."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.enterContext(override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'consultas': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.directorio},
+        }))
+        self.client.force_login(get_user_model().objects.create_user(username='ana', password='x'))
+        Estado.objects.create(nombre='ZULIA')
+
+    def otro_proceso(self, consulta):
+        """Lo que vería otro proceso del servidor: su propia instancia de la caché sobre el mismo directorio."""
+        return FileBasedCache(self.directorio, {}).get(consulta.clave)
+
+    def test_alta_desde_la_vista(self):
+        self.assertEqual([estado.nombre for estado in estados_territorio()], ['ZULIA'])
+        self.assertIsNotNone(self.otro_proceso(estados_territorio))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('territorio:estado_create'), {'nombre': 'mérida'})
+        self.assertIsNone(self.otro_proceso(estados_territorio))
+        self.assertEqual([estado.nombre for estado in estados_territorio()], ['MÉRIDA', 'ZULIA'])
+
+    def test_edicion_y_borrado(self):
+        unidad = UnidadAdscrita.objects.create(nombre='Dirección de Personal')
+        self.assertEqual(unidades_adscritas(), [unidad])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unidad.nombre = 'Dirección de Talento Humano'
+            unidad.save()
+        self.assertEqual([u.nombre for u in unidades_adscritas()], ['Dirección de Talento Humano'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unidad.delete()
+        self.assertEqual(unidades_adscritas(), [])
+
+    def test_sin_commit_no_invalida(self):
+        estados_territorio()
+        # La invalidación espera al commit: una transacción revertida no descarta la caché
+        with self.captureOnCommitCallbacks(execute=False) as pendientes:
+            Estado.objects.create(nombre='TÁCHIRA')
+        self.assertEqual(len(pendientes), 1)
+        self.assertEqual([estado.nombre for estado in estados_territorio()], ['ZULIA'])
+
+    def test_update_sin_senales_invalida_a_mano(self):
+        estados_territorio()
+        with self.captureOnCommitCallbacks(execute=True):
+            Estado.objects.update(nombre='ZULIA (EDITADO)')
+        self.assertEqual([estado.nombre for estado in estados_territorio()], ['ZULIA'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            estados_territorio.invalidar()
+        self.assertEqual([estado.nombre for estado in estados_territorio()], ['ZULIA (EDITADO)'])
@@ -10,6 +10,7 @@ import logging
 
 from .models import Estado, Municipio, Ciudad, Parroquia, Comuna, UnidadAdscrita
 from .forms import UnidadAdscritaForm
+from sistema_gestion.cache_consultas import estados_territorio
 
 logger_territorio = logging.getLogger('CH_TERRITORIO')
 
@@ -17,7 +18,7 @@ logger_territorio = logging.getLogger('CH_TERRITORIO')
 @login_required
 def infraestructura_geografica(request):
     context = {
-        'estados': Estado.objects.all().order_by('nombre'),
+        'estados': estados_territorio(),
         'municipios': Municipio.objects.all().order_by('nombre'),
         'ciudades': Ciudad.objects.all().order_by('nombre'),
         'parroquias': Parroquia.objects.all().order_by('nombre'),
@@ -0,0 +1,121 @@
+"""Consultas de catálogos cacheadas, compartidas por todas las aplicaciones.
+
+Cada consulta se guarda en la caché 'consultas' (settings.CACHES) bajo su nombre y se
+invalida con post_save/post_delete de sus modelos de origen, una vez confirmada la
+transacción que los modificó. Los escritores que no pasan por señales (update(), SQL)
+llaman a `.invalidar()`.
+
+La caché por defecto está en disco y es común a todos los procesos del servidor, así que
+una invalidación vale para todos. Con CACHE_CONSULTAS=local cada proceso tiene su copia en
+memoria y la invalidación sólo alcanza al que hizo el cambio: los demás lo ven al vencer
+CACHE_CONSULTAS_SEGUNDOS.
+
+Los aciertos y fallos se cuentan por consulta (en cada proceso); `estadisticas()` los
+devuelve para ajustar tiempos o decidir qué vale la pena cachear.
+"""
+import threading
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+ALIAS_CACHE = 'consultas'
+_AUSENTE = object()
+
+_contadores = defaultdict(Counter)
+_bloqueo_contadores = threading.Lock()
+_registradas = {}
+
+
+def _contar(nombre, evento):
+    with _bloqueo_contadores:
+        _contadores[nombre][evento] += 1
+
+
+class ConsultaCacheada:
+    """Función sin argumentos cuyo resultado se sirve desde la caché hasta que su origen cambia."""
+
+    def __init__(self, nombre, funcion, modelos=(), segundos=None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.segundos = segundos
+        self.clave = f'consulta:{nombre}'
+        self.__doc__ = funcion.__doc__
+        for modelo in modelos:
+            # Modelos como 'app_label.Modelo': la conexión se resuelve cuando el modelo se carga
+            post_save.connect(self._al_cambiar_origen, sender=modelo, weak=False, dispatch_uid=(self.clave, modelo, 'save'))
+            post_delete.connect(self._al_cambiar_origen, sender=modelo, weak=False, dispatch_uid=(self.clave, modelo, 'delete'))
+
+    def __call__(self):
+        cache = caches[ALIAS_CACHE]
+        valor = cache.get(self.clave, _AUSENTE)
+        if valor is not _AUSENTE:
+            _contar(self.nombre, 'aciertos')
+            return valor
+        _contar(self.nombre, 'fallos')
+        valor = self.funcion()
+        segundos = self.segundos if self.segundos is not None else getattr(settings, 'CACHE_CONSULTAS_SEGUNDOS', 600)
+        cache.set(self.clave, valor, segundos)
+        return valor
+
+    def en_cache(self, defecto=None):
+        """Valor cacheado sin consultar la base ni contar un acierto (`defecto` si no está)."""
+        valor = caches[ALIAS_CACHE].get(self.clave, _AUSENTE)
+        return defecto if valor is _AUSENTE else valor
+
+    def invalidar(self):
+        # Tras el commit: antes, otra petición podría volver a cachear la versión anterior
+        transaction.on_commit(lambda: caches[ALIAS_CACHE].delete(self.clave))
+        _contar(self.nombre, 'invalidaciones')
+
+    def _al_cambiar_origen(self, sender, **kwargs):
+        self.invalidar()
+
+
+def consulta_cacheada(nombre, modelos=(), segundos=None):
+    """Decorador: `@consulta_cacheada('territorio_estados', modelos=['territorio.Estado'])`."""
+    def decorador(funcion):
+        consulta = ConsultaCacheada(nombre, funcion, modelos, segundos)
+        _registradas[nombre] = consulta
+        return consulta
+    return decorador
+
+
+def estadisticas():
+    """{nombre: {'aciertos', 'fallos', 'invalidaciones', 'tasa_aciertos'}} de este proceso."""
+    with _bloqueo_contadores:
+        copia = {nombre: dict(_contadores[nombre]) for nombre in _registradas}
+    resultado = {}
+    for nombre, contador in copia.items():
+        aciertos, fallos = contador.get('aciertos', 0), contador.get('fallos', 0)
+        resultado[nombre] = {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'invalidaciones': contador.get('invalidaciones', 0),
+            'tasa_aciertos': round(aciertos / (aciertos + fallos), 3) if aciertos + fallos else None,
+        }
+    return resultado
+
+
+# --- CATÁLOGOS ---
+
+@consulta_cacheada('territorio_estados', modelos=['territorio.Estado'])
+def estados_territorio():
+    """Estados (territorio.Estado) ordenados por nombre."""
+    from apps.territorio.models import Estado
+    return list(Estado.objects.order_by('nombre'))
+
+
+@consulta_cacheada('territorio_unidades_adscritas', modelos=['territorio.UnidadAdscrita'])
+def unidades_adscritas():
+    """Unidades adscritas ordenadas por nombre."""
+    from apps.territorio.models import UnidadAdscrita
+    return list(UnidadAdscrita.objects.order_by('nombre'))
+
+
+@consulta_cacheada('contratos_configuracion', modelos=['contratos.ConfiguracionInstitucional'])
+def configuracion_institucional():
+    """Configuración institucional vigente (None si no se ha cargado)."""
+    from apps.contratos.models import ConfiguracionInstitucional
+    return ConfiguracionInstitucional.objects.first()
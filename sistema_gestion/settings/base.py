@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,6 +31,7 @@ INSTALLED_APPS = [
     'apps.contratos', 
     'apps.territorio',
     'apps.auditoria', 
+    'apps.reportes',
 ]
 
 MIDDLEWARE = [
@@ -65,7 +67,17 @@ TEMPLATES = [
 WSGI_APPLICATION = 'sistema_gestion.wsgi.application'
 
 # 3. BASE DE DATOS
-DATABASES = {
+def con_conexion_autonoma(databases):
+    """Agrega a `databases` el alias 'autonomo': la misma base que 'default' por una segunda conexión.
+
+    Lo escrito por ella se confirma de inmediato aunque la transacción en curso (p. ej. una
+    importación) siga abierta. Los settings de cada entorno que redefinen DATABASES la llaman.
+    """
+    databases['autonomo'] = {**databases['default'], 'TEST': {'MIRROR': 'default'}}
+    return databases
+
+
+DATABASES = con_conexion_autonoma({
     'default': {
         'ENGINE': 'django.db.backends.postgresql', 
         'NAME': os.environ.get('DB_NAME', 'django_default_db'), 
@@ -74,7 +86,7 @@ DATABASES = {
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
     }
-}
+})
 
 # 4. AUTENTICACIÓN Y LOCALIZACIÓN
 LOGIN_URL = 'login' 
@@ -98,6 +110,48 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Importaciones de recibos en segundo plano (False: las atiende `manage.py procesar_importaciones`)
+RECIBOS_IMPORTACION_EN_PROCESO = True
+RECIBOS_IMPORTACION_WORKERS = 2
+# Una importación que sigue PROCESANDO pasado este tiempo se da por interrumpida y
+# `procesar_importaciones` la reintenta (ese comando debe correr siempre, ver su ayuda)
+RECIBOS_IMPORTACION_MINUTOS_MAXIMOS = 120
+# Procesos que renderizan los PDF de los ZIP masivos (1: en el mismo proceso)
+RECIBOS_PDF_PROCESOS = 4
+# Listados de recibos: por encima de esta cantidad el total mostrado es una estimación
+RECIBOS_CONTEO_EXACTO_MAXIMO = 100000
+# Reportes en segundo plano (False: los atiende `manage.py procesar_reportes`)
+REPORTES_EN_PROCESO = True
+REPORTES_WORKERS = 2
+# Solicitudes idénticas dentro de esta ventana comparten el mismo archivo
+REPORTES_REUTILIZAR_MINUTOS = 10
+# Un reporte que sigue PROCESANDO pasado este tiempo se da por interrumpido: no se
+# reutiliza y `procesar_reportes` lo vuelve a generar
+REPORTES_MINUTOS_MAXIMOS = 30
+
+# Caché de catálogos y listas de búsqueda (sistema_gestion/cache_consultas.py).
+# Por defecto una sola copia en disco para todos los procesos del servidor: la invalidación
+# tras un cambio alcanza a todos. CACHE_CONSULTAS=local: una copia en memoria por proceso
+# (sólo para un servidor de un proceso; los demás verían el cambio al vencer CACHE_CONSULTAS_SEGUNDOS).
+CACHE_CONSULTAS_SEGUNDOS = int(os.getenv('CACHE_CONSULTAS_SEGUNDOS', 600))
+# Fuera del código fuente (en producción, p. ej. /var/cache/sistema_gestion/consultas):
+# el directorio debe ser el mismo y con permiso de escritura para todos los procesos del servidor
+CACHE_CONSULTAS_DIR = os.getenv(
+    'CACHE_CONSULTAS_DIR', os.path.join(tempfile.gettempdir(), 'sistema_gestion', 'consultas')
+)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'consultas': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_CONSULTAS_DIR,
+    } if os.getenv('CACHE_CONSULTAS', 'archivo') != 'local' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'consultas',
+    },
+}
+
 # 6. SEGURIDAD Y SESIÓN
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_AGE = 5 * 60
@@ -127,6 +181,12 @@ LOGGING = {
             'filename': os.path.join(LOGS_DIR, 'recibos.log'),
             'formatter': 'estandar',
         },
+        'h_reportes': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(LOGS_DIR, 'reportes.log'),
+            'formatter': 'estandar',
+        },
         'h_auditoria': {
             'level': 'INFO',
             'class': 'logging.FileHandler',
@@ -146,6 +206,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False, # Detiene el viaje hacia arriba
         },
+        'CH_REPORTES': {
+            'handlers': ['h_reportes'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         # Aseguramos que el logger 'django' no esté capturando tus loggers personalizados
         'django': {
             'handlers': ['console'],
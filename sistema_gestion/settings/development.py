@@ -13,7 +13,7 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # -----------------------------------------------------------------
 # Base de datos PostgreSQL (SOBRESCRITA desde .env)
 # -----------------------------------------------------------------
-DATABASES = {
+DATABASES = con_conexion_autonoma({
     'default': {
         # Motor PostgreSQL
         'ENGINE': 'django.db.backends.postgresql', 
@@ -28,4 +28,4 @@ DATABASES = {
         'HOST': os.environ.get('DB_HOST', 'localhost'), # Si no está en .env, usa 'localhost'
         'PORT': os.environ.get('DB_PORT', '5432'),     # Si no está en .env, usa '5432'
     }
-}
+})
@@ -4,7 +4,7 @@ DEBUG = False
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
 
 # Base de datos PostgreSQL para producción
-DATABASES = {
+DATABASES = con_conexion_autonoma({
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
@@ -13,7 +13,7 @@ DATABASES = {
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT', '5432'),
     }
-}
+})
 
 # Seguridad adicional
 SECURE_SSL_REDIRECT = True
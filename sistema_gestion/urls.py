@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from apps.users.views import DashboardView
+from .views import estadisticas_cache_view
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -25,9 +26,15 @@ urlpatterns = [
     
     # 6. Módulo de Seguridad y Auditoría (NUEVO)
     path('auditoria/', include('apps.auditoria.urls', namespace='auditoria')),
+
+    # Reportes generados en segundo plano ("Mis reportes")
+    path('reportes/', include('apps.reportes.urls', namespace='reportes')),
     
     # 7. Configuración de Infraestructura Geográfica
     path('configuracion-territorio/', include('apps.territorio.urls')),
+
+    # Aciertos y fallos de las consultas cacheadas (sistema_gestion/cache_consultas.py)
+    path('cache/estadisticas/', estadisticas_cache_view, name='estadisticas_cache'),
     
     # Gestor de bienes temporalmente deshabilitado
     # path('bienes/', include('apps.bienes.urls', namespace='bienes')),
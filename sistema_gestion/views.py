@@ -1,6 +1,16 @@
+import os
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse
 from django.shortcuts import render
+from .cache_consultas import estadisticas
 
 def home_view(request):
     # Ahora llamamos a gestores.html
     # Django automáticamente cargará base.html porque gestores.html tiene el {% extends %}
-    return render(request, 'gestores.html', {})
\ No newline at end of file
+    return render(request, 'gestores.html', {})
+
+@login_required
+@user_passes_test(lambda user: user.is_superuser)
+def estadisticas_cache_view(request):
+    # Contadores del proceso que atiende la petición (cada worker lleva los suyos)
+    return JsonResponse({'proceso': os.getpid(), 'consultas': estadisticas()})